@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 """
 Automatically mark all found responses and add new contacts to master CSV
+Reads response_analysis.jsonl written by check_responses.py
+(or run both at once with: python check_responses.py --mark)
 """
 import csv
+import json
 import os
 import subprocess
 import sys
 from datetime import datetime
 
+import _paths  # repo root on sys.path, for lemlist_core
+
 def load_master_contacts(csv_path):
     """Load master contacts"""
     contacts = {}
@@ -42,61 +47,44 @@ def save_master_contacts(csv_path, contacts):
     except Exception as e:
         print(f"❌ Error saving {csv_path}: {e}")
 
-def auto_mark_responses(response_file="response_analysis.txt"):
-    """Automatically mark all responses found in the analysis file"""
-
-    # Read the response analysis file
+def load_results(results_file="response_analysis.jsonl"):
+    """Read check_responses.py results: (emails to mark, new contacts to add)"""
     responses_to_mark = []
     new_contacts_to_add = []
-
-    try:
-        with open(response_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        # Find the section with new responses from existing contacts
-        in_existing_responses = False
-        in_new_contacts = False
-        
-        for line in lines:
+    with open(results_file, 'r', encoding='utf-8') as f:
+        for line in f:
             line = line.strip()
-
-            if "NEW REAL RESPONSES FROM EXISTING CONTACTS" in line:
-                in_existing_responses = True
-                in_new_contacts = False
-                continue
-            elif "NEW CONTACTS WHO RESPONDED" in line:
-                in_existing_responses = False
-                in_new_contacts = True
+            if not line:
                 continue
-            elif "ALREADY MARKED" in line or "AUTOMATIC RESPONSES" in line:
-                in_existing_responses = False
-                in_new_contacts = False
+            record = json.loads(line)
+            email = (record.get('email') or '').strip().lower()
+            if not email or '@' not in email:
                 continue
-
-            if in_existing_responses and line.startswith("• "):
-                # Extract email from line like: "• email@domain.com - Name (Company)"
-                try:
-                    email_part = line.split(" - ")[0].replace("• ", "").strip()
-                    responses_to_mark.append(email_part)
-                except:
-                    continue
-            
-            if in_new_contacts and line.startswith("• "):
-                # Extract email from new contacts section
-                try:
-                    email_part = line.split(" - ")[0].replace("• ", "").strip()
-                    if email_part and "@" in email_part:
-                        new_contacts_to_add.append(email_part)
-                except:
-                    continue
-
+            if record.get('kind') == 'existing_response':
+                responses_to_mark.append(email)
+            elif record.get('kind') == 'new_contact':
+                new_contacts_to_add.append(email)
+    return responses_to_mark, new_contacts_to_add
+
+def auto_mark_responses(results_file="response_analysis.jsonl"):
+    """Automatically mark all responses found by check_responses.py"""
+    try:
+        responses_to_mark, new_contacts_to_add = load_results(results_file)
     except FileNotFoundError:
-        print(f"❌ {response_file} not found. Run check_responses.py first!")
+        print(f"❌ {results_file} not found. Run check_responses.py first!")
         return
     except Exception as e:
-        print(f"❌ Error reading {response_file}: {e}")
+        print(f"❌ Error reading {results_file}: {e}")
         return
 
+    apply_responses("master_contacts_tracking.csv", responses_to_mark, new_contacts_to_add)
+
+def apply_responses(csv_path, responses_to_mark, new_contacts_to_add):
+    """Mark existing responders and add unknown ones to the master CSV"""
+    # Several replies from the same person are marked once
+    responses_to_mark = list(dict.fromkeys(responses_to_mark))
+    new_contacts_to_add = list(dict.fromkeys(new_contacts_to_add))
+
     if not responses_to_mark and not new_contacts_to_add:
         print("❌ No responses found to mark")
         return
@@ -105,7 +93,6 @@ def auto_mark_responses(response_file="response_analysis.txt"):
     print(f"🆕 Found {len(new_contacts_to_add)} new contacts to add")
 
     # Load current contacts
-    csv_path = "master_contacts_tracking.csv"
     contacts = load_master_contacts(csv_path)
     print(f"📊 Loaded {len(contacts)} existing contacts")
 
@@ -174,4 +161,7 @@ def auto_mark_responses(response_file="response_analysis.txt"):
     print("🚀 Ready to run nudges on remaining contacts!")
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('auto_mark_responses', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     auto_mark_responses()
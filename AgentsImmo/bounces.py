@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Parse bounce messages (RFC 3464 delivery status notifications) and suppress
+hard-bounced addresses before the next nudge
+Permanent failures (5.x.x) are marked status=bounced in
+master_contacts_tracking.csv and appended to suppression_list.csv, which
+script.py adds to its exclusion set.
+Usage: python bounces.py [master_contacts_tracking.csv]
+"""
+import csv
+import email
+import os
+import re
+import sys
+from datetime import datetime
+import _paths  # repo root on sys.path, for lemlist_core
+
+from imap_sync import (
+    load_sync_state, save_sync_state, folder_state, reset_folder_state,
+    select_folder, search_new_uids, chunk_message_set, parse_fetch_response,
+)
+from campaign_daemon import update_contacts
+from lemlist_core.csv_io import read_csv_rows_with_dialect
+
+DEFAULT_SUPPRESSION_PATH = os.getenv(
+    "SUPPRESSION_LIST_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'suppression_list.csv'),
+)
+
+# Bounces come from the MTA or carry a multipart/report content type
+BOUNCE_SEARCH = 'OR OR FROM "mailer-daemon" FROM "postmaster" HEADER Content-Type "delivery-status"'
+
+STATUS_RE = re.compile(r'\b([245]\.\d{1,3}\.\d{1,3})\b')
+
+def _field(block, name):
+    """Read a DSN field and drop its type prefix ('rfc822; a@b.c' -> 'a@b.c')"""
+    value = (block.get(name) or '').strip()
+    if ';' in value:
+        value = value.split(';', 1)[1].strip()
+    return value
+
+def parse_dsn(raw_message):
+    """Extract failed recipients from a bounce message
+
+    Returns a list of {'email', 'status', 'action', 'diagnostic'}.
+    """
+    msg = email.message_from_bytes(raw_message) if isinstance(raw_message, bytes) else raw_message
+    failures = []
+
+    for part in msg.walk():
+        if part.get_content_type() != 'message/delivery-status':
+            continue
+        blocks = part.get_payload()
+        if not isinstance(blocks, list):
+            continue
+        # First block holds per-message fields, the following ones one recipient each
+        for block in blocks[1:]:
+            recipient = (_field(block, 'Final-Recipient') or _field(block, 'Original-Recipient')).lower()
+            if '@' not in recipient:
+                continue
+            status = _field(block, 'Status')
+            match = STATUS_RE.search(status)
+            failures.append({
+                'email': recipient.strip('<>'),
+                'status': match.group(1) if match else status,
+                'action': (block.get('Action') or '').strip().lower(),
+                'diagnostic': ' '.join(_field(block, 'Diagnostic-Code').split())[:200],
+            })
+
+    if not failures and msg.get('X-Failed-Recipients'):
+        # Exim-style bounce without a machine-readable report
+        match = STATUS_RE.search(msg.get('Subject', '') or '')
+        for recipient in msg.get('X-Failed-Recipients').split(','):
+            recipient = recipient.strip().lower()
+            if '@' in recipient:
+                failures.append({
+                    'email': recipient,
+                    'status': match.group(1) if match else '',
+                    'action': 'failed',
+                    'diagnostic': '',
+                })
+
+    return failures
+
+def is_permanent_failure(failure):
+    """5.x.x status, or a failed action with no status at all"""
+    if failure['status']:
+        return failure['status'].startswith('5')
+    return failure['action'] == 'failed'
+
+def scan_bounces(mail, imap_cfg, full_resync=False):
+    """Return failures found in bounces received since the last scan (UID-incremental)"""
+    inbox_folder = os.getenv("INBOX_FOLDER", "INBOX")
+    state = load_sync_state(imap_cfg["SYNC_STATE_PATH"])
+    sync = folder_state(state, inbox_folder, 'bounces')
+    if full_resync:
+        # This folder/mode only: the other scans keep their watermarks
+        reset_folder_state(sync, None)
+    before = (sync['uidvalidity'], sync['last_uid'])
+
+    folder_status = select_folder(mail, inbox_folder)
+    uidvalidity = folder_status.get('UIDVALIDITY')
+    if sync['uidvalidity'] != uidvalidity:
+        reset_folder_state(sync, uidvalidity)
+
+    uidnext = folder_status.get('UIDNEXT')
+    if sync['last_uid'] and uidnext is not None and uidnext - 1 <= sync['last_uid']:
+        new_uids = []
+    else:
+        new_uids = search_new_uids(mail, sync['last_uid'], BOUNCE_SEARCH)
+
+    failures = []
+    scanned_uids = []
+    for chunk, uid_set in chunk_message_set(new_uids, imap_cfg["FETCH_BATCH_SIZE"]):
+        typ, data = mail.uid('FETCH', uid_set, '(BODY.PEEK[])')
+        if typ != 'OK':
+            break
+        scanned_uids.extend(chunk)
+        for uid, raw in parse_fetch_response(data, by_uid=True).items():
+            try:
+                found = parse_dsn(raw)
+            except Exception as e:
+                print(f"⚠️ Could not parse bounce {uid.decode()}: {e}")
+                continue
+            # Not cached: each bounce is handled once, when its UID is first scanned
+            failures.extend(found)
+
+    if len(scanned_uids) == len(new_uids):
+        sync['last_uid'] = max([int(uid) for uid in new_uids] + [(uidnext or 1) - 1, sync['last_uid']])
+    else:
+        sync['last_uid'] = max([int(uid) for uid in scanned_uids] + [sync['last_uid']])
+    if sync['messages'] or before != (sync['uidvalidity'], sync['last_uid']):
+        sync['messages'] = {}  # Older states cached every bounce here: the watermark is enough
+        save_sync_state(state, imap_cfg["SYNC_STATE_PATH"])
+    return failures
+
+def load_suppressed(path=DEFAULT_SUPPRESSION_PATH):
+    """Emails already on the suppression list"""
+    if not os.path.exists(path):
+        return set()
+    rows, _, _ = read_csv_rows_with_dialect(path)
+    return {(row.get('email') or '').strip().lower() for row in rows if row.get('email')}
+
+def suppress_bounced(csv_path, failures, suppression_path=DEFAULT_SUPPRESSION_PATH):
+    """Mark permanent failures in the tracking CSV and the suppression list
+
+    Returns the list of newly suppressed emails.
+    """
+    permanent = {}
+    for failure in failures:
+        if is_permanent_failure(failure):
+            permanent[failure['email']] = failure
+    if not permanent:
+        return []
+
+    already = load_suppressed(suppression_path)
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    if os.path.exists(csv_path):
+        rows, _, _ = read_csv_rows_with_dialect(csv_path)
+        updates = {}
+        for row in rows:
+            failure = permanent.get((row.get('email') or '').strip().lower())
+            if failure and (row.get('status') or '') != 'bounced':
+                updates[row['email']] = {
+                    'status': 'bounced',
+                    'notes': f"Hard bounce {failure['status']} ({today}) {failure['diagnostic']}".strip(),
+                }
+        if updates:
+            # Through the daemon when it runs, else merged into the current file (the watcher runs during sends)
+            update_contacts(csv_path, updates)
+
+    new_emails = [addr for addr in permanent if addr not in already]
+    add_to_suppression_list({addr: permanent[addr]['status'] for addr in new_emails}, 'hard_bounce', suppression_path)
+    return new_emails
+
+def add_to_suppression_list(statuses, reason, suppression_path=DEFAULT_SUPPRESSION_PATH):
+    """Append {email: status} entries to the suppression list"""
+    if not statuses:
+        return
+    today = datetime.now().strftime('%Y-%m-%d')
+    write_header = not os.path.exists(suppression_path)
+    with open(suppression_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['email', 'reason', 'status', 'date'], delimiter=';')
+        if write_header:
+            writer.writeheader()
+        for addr, status in statuses.items():
+            writer.writerow({'email': addr, 'reason': reason, 'status': status, 'date': today})
+
+if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('bounces', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
+    from check_responses import load_env, connect_imap
+
+    csv_path = sys.argv[1] if len(sys.argv) >= 2 and not sys.argv[1].startswith('--') else "master_contacts_tracking.csv"
+    imap_cfg = load_env()
+    if not imap_cfg["IMAP_PASS"]:
+        print("❌ No IMAP password found in .env")
+        sys.exit(1)
+
+    print(f"📧 Connecting to {imap_cfg['IMAP_HOST']}...")
+    mail = connect_imap(imap_cfg)
+    failures = scan_bounces(mail, imap_cfg, full_resync='--full-resync' in sys.argv)
+    mail.logout()
+
+    suppressed = suppress_bounced(csv_path, failures)
+    print(f"📭 {len(failures)} failed recipients found in new bounces")
+    print(f"🚫 {len(suppressed)} addresses newly suppressed (hard bounce)")
+    for addr in suppressed[:20]:
+        print(f"• {addr}")
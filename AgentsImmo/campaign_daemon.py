@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Resident campaign service on a local Unix socket
+Keeps master_contacts_tracking.csv, its email index and the compiled
+templates in memory and answers one JSON request per line:
+  {"op": "mark", "email": ..., "answered": "yes", "status": ..., "notes": ...}
+  {"op": "update", "updates": [{"email": ..., "fields": {"nudge1_date": ..., ...}}]}   (campaign_manager.py sends)
+  {"op": "query", "email": ...}
+  {"op": "enqueue", "email": ..., "stage": "nudge1"}   (sent by campaign_manager.py --queued)
+  {"op": "dequeue", "emails": [...], "stage": "nudge1"}  (done by campaign_manager.py --queued)
+  {"op": "stats"}
+mark_answered.py, quick_mark.py, watch_responses.py and campaign_manager.py
+write through it when it is running, so it is the CSV's only writer, and
+fall back to working on the CSV directly otherwise.
+Usage: python campaign_daemon.py [master_contacts_tracking.csv]
+"""
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+import _paths  # repo root on sys.path, for lemlist_core
+
+from lemlist_core.csv_io import atomic_write, read_csv_rows_with_dialect, update_csv_rows, write_csv_rows
+from lemlist_core.templates import load_template
+
+DEFAULT_SOCKET_PATH = os.getenv(
+    "CAMPAIGN_DAEMON_SOCKET",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.campaign_daemon.sock'),
+)
+QUEUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'outbound_queue.jsonl')
+
+STAGE_TEMPLATES = {
+    'initial': 'template.html',
+    'nudge1': 'template_nudge1.html',
+    'nudge2': 'template_nudge2.html',
+}
+
+def daemon_request(op, socket_path=DEFAULT_SOCKET_PATH, timeout=5, **params):
+    """Send one request to the daemon; None when no daemon is listening"""
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            if params.get('csv_path'):
+                params['csv_path'] = os.path.abspath(params['csv_path'])  # The daemon runs in another directory
+            client.sendall(json.dumps({'op': op, **params}).encode('utf-8') + b'\n')
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data.decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+
+class ContactStore:
+    """In-memory view of the tracking CSV, written through on every change"""
+
+    def __init__(self, csv_path):
+        self.csv_path = os.path.abspath(csv_path)
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.templates = self._compile_templates()
+        self._load()
+
+    def _compile_templates(self):
+        templates = {}
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        for stage, name in STAGE_TEMPLATES.items():
+            path = os.path.join(base_dir, name)
+            if os.path.exists(path):
+                templates[stage] = load_template(path)
+        return templates
+
+    def _load(self):
+        self.rows, self.dialect, self.fieldnames = read_csv_rows_with_dialect(self.csv_path)
+        for field in ['answered', 'status', 'notes']:
+            if field not in self.fieldnames:
+                self.fieldnames.append(field)
+        self.index = {}
+        for row in self.rows:
+            email = (row.get('email') or '').strip().lower()
+            if email:
+                self.index.setdefault(email, row)
+        self.mtime = os.path.getmtime(self.csv_path)
+
+    def _refresh(self):
+        # Other tools (campaign_manager, check_responses --mark) write the same file
+        if os.path.getmtime(self.csv_path) != self.mtime:
+            self._load()
+
+    def _save(self):
+        write_csv_rows(self.csv_path, self.rows, self.dialect, self.fieldnames)
+        self.mtime = os.path.getmtime(self.csv_path)
+
+    def handle(self, request):
+        op = request.get('op')
+        with self.lock:
+            self._refresh()
+            if request.get('csv_path') and os.path.abspath(request['csv_path']) != self.csv_path:
+                return {'ok': False, 'error': f"daemon serves {self.csv_path}"}
+            if op == 'mark':
+                return self.mark(request)
+            if op == 'update':
+                return self.update(request)
+            if op == 'query':
+                row = self.index.get((request.get('email') or '').strip().lower())
+                return {'ok': row is not None, 'contact': row}
+            if op == 'enqueue':
+                return self.enqueue(request)
+            if op == 'dequeue':
+                # Under the same lock as enqueue: no append is lost to the rewrite
+                removed = remove_from_queue(request.get('stage') or 'nudge1', request.get('emails') or [])
+                return {'ok': True, 'removed': removed}
+            if op == 'stats':
+                return self.stats()
+        return {'ok': False, 'error': f"unknown op: {op}"}
+
+    def mark(self, request):
+        updates = request.get('updates') or [request]
+        updated, missing = [], []
+        for update in updates:
+            email = (update.get('email') or '').strip().lower()
+            row = self.index.get(email)
+            if row is None:
+                missing.append(email)
+                continue
+            for field in ['answered', 'status', 'notes']:
+                value = (update.get(field) or '').strip()
+                if value:
+                    row[field] = value
+            updated.append(email)
+        if updated:
+            self._save()
+        return {'ok': not missing, 'updated': updated, 'missing': missing}
+
+    def update(self, request):
+        """Set arbitrary fields (send dates, status, notes) on contacts"""
+        updated, missing = [], []
+        for update in request.get('updates') or []:
+            email = (update.get('email') or '').strip().lower()
+            row = self.index.get(email)
+            if row is None:
+                missing.append(email)
+                continue
+            for field, value in (update.get('fields') or {}).items():
+                if field not in self.fieldnames:
+                    self.fieldnames.append(field)
+                row[field] = value
+            updated.append(email)
+        if updated:
+            self._save()
+        return {'ok': not missing, 'updated': updated, 'missing': missing}
+
+    def enqueue(self, request):
+        email = (request.get('email') or '').strip().lower()
+        stage = request.get('stage') or 'nudge1'
+        row = self.index.get(email)
+        if row is None:
+            return {'ok': False, 'error': f"email not found: {email}"}
+        if stage not in self.templates:
+            return {'ok': False, 'error': f"unknown stage: {stage}"}
+        if (row.get('answered') or '').strip().lower() == 'yes':
+            return {'ok': False, 'error': f"{email} already answered"}
+        # Render once so a broken template or contact is reported now, not at send time
+        self.templates[stage].render(
+            first_name=(row.get('first_name') or '').strip(),
+            last_name=(row.get('last_name') or '').strip(),
+            company_name=(row.get('company_name') or '').strip(),
+            video_url=os.getenv("VIDEO_URL", ""),
+        )
+        with open(QUEUE_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'email': email, 'stage': stage,
+                                'enqueued_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) + '\n')
+        return {'ok': True, 'queued': email, 'stage': stage}
+
+    def stats(self):
+        by_status = {}
+        answered = 0
+        queued = load_queue()
+        queued_by_stage = {}
+        for entry in queued:
+            queued_by_stage[entry.get('stage')] = queued_by_stage.get(entry.get('stage'), 0) + 1
+        for row in self.rows:
+            status = (row.get('status') or '').strip() or 'unknown'
+            by_status[status] = by_status.get(status, 0) + 1
+            if (row.get('answered') or '').strip().lower() == 'yes':
+                answered += 1
+        return {
+            'ok': True,
+            'contacts': len(self.index),
+            'answered': answered,
+            'by_status': by_status,
+            'queued': len(queued),
+            'queued_by_stage': queued_by_stage,
+            'uptime_seconds': int(time.time() - self.started_at),
+        }
+
+def load_queue(path=QUEUE_PATH):
+    """Queued (email, stage) send requests"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def save_queue(entries, path=QUEUE_PATH):
+    """Rewrite the queue file with the remaining entries"""
+    with atomic_write(path, encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+
+def remove_from_queue(stage, emails, path=QUEUE_PATH):
+    """Drop the stage entries of emails from the queue, return how many went
+
+    Only the daemon appends to the queue: call this through its 'dequeue' op
+    when it is running (see dequeue_sent), directly otherwise.
+    """
+    emails = {email.strip().lower() for email in emails}
+    entries = load_queue(path)
+    kept = [entry for entry in entries if not (entry.get('stage') == stage and entry['email'] in emails)]
+    if len(kept) != len(entries):
+        save_queue(kept, path)
+    return len(entries) - len(kept)
+
+def dequeue_sent(stage, emails, socket_path=DEFAULT_SOCKET_PATH):
+    """Remove handled emails from the queue, through the daemon when one is listening"""
+    response = daemon_request('dequeue', socket_path=socket_path, stage=stage, emails=sorted(emails))
+    if response is not None and response.get('ok'):
+        return response['removed']
+    return remove_from_queue(stage, emails)
+
+def update_contacts(csv_path, updates, socket_path=DEFAULT_SOCKET_PATH):
+    """Set fields on contacts (email -> {field: value}), through the daemon when it serves csv_path
+
+    Otherwise the CSV is re-read and merged (update_csv_rows), so marks made
+    meanwhile are kept. Returns (updated_emails, missing_emails).
+    """
+    response = daemon_request('update', socket_path=socket_path, csv_path=csv_path,
+                              updates=[{'email': email, 'fields': fields} for email, fields in updates.items()])
+    if response is not None and 'updated' in response:
+        return response['updated'], response['missing']
+    return update_csv_rows(csv_path, updates)
+
+def serve(csv_path, socket_path=DEFAULT_SOCKET_PATH):
+    store = ContactStore(csv_path)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    response = store.handle(json.loads(line))
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+
+    if os.path.exists(socket_path):
+        if daemon_request('stats', socket_path=socket_path) is not None:
+            print(f"❌ A daemon is already listening on {socket_path}")
+            return
+        os.remove(socket_path)  # Stale socket from a crashed run
+
+    server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    server.daemon_threads = True
+    print(f"🟢 Serving {store.csv_path} ({len(store.index)} contacts) on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Daemon stopped")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('campaign_daemon', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
+    csv_path = sys.argv[1] if len(sys.argv) >= 2 else "master_contacts_tracking.csv"
+    if not os.path.exists(csv_path):
+        print(f"❌ Error: File not found: {csv_path}")
+        sys.exit(1)
+    serve(csv_path)
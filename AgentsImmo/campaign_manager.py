@@ -4,129 +4,60 @@ Multi-stage email campaign manager
 Handles: Initial contact → Nudge 1 → Nudge 2
 With intelligent timing and status tracking
 """
-import smtplib, ssl, csv, time, os, sys, logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-from jinja2 import Template
+import os, sys, logging
+import _paths  # repo root on sys.path, for lemlist_core
+from lemlist_core.env import load_env as load_campaign_env
+from lemlist_core.csv_io import read_csv_rows_with_dialect
+from lemlist_core.logs import setup_logging, SkipCounter
+from lemlist_core.dkim_signing import presign
+from lemlist_core.mailer import send_email, prepare_email, send_prepared
+from lemlist_core.progress import format_progress
+from lemlist_core.rate import AIMDRate
+from lemlist_core.scoring import prioritize
+from lemlist_core.scheduling import build_queues, CompanyCap, company_key, recipient_domain
+from lemlist_core.sender import RetryQueue, run_send_loop, PERMANENT
+from lemlist_core.status import start_status_server
+from lemlist_core.templates import load_template
+from lemlist_core.timezones import contact_timezone
+from lemlist_core.tracking import engagement_path, load_engagement
+from thread_index import record_outbound
+from bounces import add_to_suppression_list
+from campaign_daemon import load_queue, dequeue_sent, update_contacts
 from datetime import datetime, timedelta
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
+setup_logging(os.path.dirname(os.path.abspath(__file__)))
 
-def load_env():
-    load_dotenv()
-    parent_env = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-    if os.path.exists(parent_env):
-        load_dotenv(parent_env)
-    return {
-        "SMTP_HOST": os.getenv("SMTP_HOST"),
-        "SMTP_PORT": int(os.getenv("SMTP_PORT", 587)),
-        "SMTP_USER": os.getenv("SMTP_USER"),
-        "SMTP_PASS": os.getenv("SMTP_PASS"),
-        "SENDER_NAME": os.getenv("SENDER_NAME", os.getenv("SMTP_USER")),
-        "REPLY_TO": os.getenv("REPLY_TO", os.getenv("SMTP_USER")),
-        "SMTP_USE_SSL": os.getenv("SMTP_USE_SSL", "false").lower() in ("1", "true", "yes"),
-        "SMTP_ALLOW_INSECURE_TLS": os.getenv("SMTP_ALLOW_INSECURE_TLS", "false").lower() in ("1", "true", "yes"),
-        "SMTP_DEBUG": os.getenv("SMTP_DEBUG", "false").lower() in ("1", "true", "yes"),
-        "VIDEO_URL": os.getenv("VIDEO_URL", "https://www.youtube.com/watch?v=eS6VZm7rzeM"),
-        "BCC_EMAIL": os.getenv("BCC_EMAIL", "valentin.henry-leo@polytechnique.edu"),
-        "DAYS_BEFORE_NUDGE1": int(os.getenv("DAYS_BEFORE_NUDGE1", "3")),
-        "DAYS_BEFORE_NUDGE2": int(os.getenv("DAYS_BEFORE_NUDGE2", "5")),
-        "EMAIL_SUBJECT": os.getenv("EMAIL_SUBJECT", "École Polytechnique - Projet de logiciel pour agences immobilières"),
-        "EMAIL_SUBJECT_NUDGE1": os.getenv("EMAIL_SUBJECT_NUDGE1", "Re: Projet IA pour agences immobilières"),
-        "EMAIL_SUBJECT_NUDGE2": os.getenv("EMAIL_SUBJECT_NUDGE2", "Re: Dernier message - Projet IA immobilier"),
-    }
-
-def read_csv_rows_with_dialect(csv_path):
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        sample = f.read(4096)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames or [])
-        return rows, dialect, fieldnames
-
-def write_csv_rows(csv_path, rows, dialect, fieldnames):
-    delimiter = getattr(dialect, 'delimiter', ';')
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=delimiter)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-
-def format_progress(current: int, total: int, width: int = 30) -> str:
-    if total <= 0:
-        return "[" + ("-" * width) + "] 0/0 (0%)"
-    filled = int(width * current / total)
-    if filled > width:
-        filled = width
-    bar = "#" * filled + "-" * (width - filled)
-    percent = int((current / total) * 100)
-    return f"[{bar}] {current}/{total} ({percent}%)"
-
-def send_email(smtp_cfg, subject, html_body, recipient):
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = f"{smtp_cfg['SENDER_NAME']} <{smtp_cfg['SMTP_USER']}>"
-    msg["To"] = recipient["email"]
-    msg["Reply-To"] = smtp_cfg["REPLY_TO"]
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-    to_addrs = [recipient["email"]]
-    bcc = (smtp_cfg.get("BCC_EMAIL") or "").strip()
-    if bcc:
-        to_addrs.append(bcc)
+# Statuses that take a contact out of every further stage
+SUPPRESSED_STATUSES = ('bounced', 'send_failed')
 
-    try:
-        cert_path = os.getenv("SMTP_CA_CERT", "zimbra_cert.pem")
-        if os.path.exists(cert_path):
-            context = ssl.create_default_context(cafile=cert_path)
-            logging.info(f"Utilisation du certificat local : {cert_path}")
-        else:
-            context = ssl.create_default_context()
-    except Exception as e:
-        logging.warning(f"Impossible de charger le certificat local : {e}")
-        context = ssl.create_default_context()
-
-    if smtp_cfg.get("SMTP_ALLOW_INSECURE_TLS"):
-        logging.warning("⚠️ TLS non vérifié activé : certificat auto-signé accepté")
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
+# Detail line for a sampled skipped row, per reason (see lemlist_core.logs.SkipCounter)
+SKIP_MESSAGES = {
+    'not_queued': "{email} - pas en file d'attente, saut",
+    'answered': "{email} a déjà répondu, saut",
+    'suppressed': "{email} - adresse supprimée ({status}), saut",
+    'already_sent': "{email} - {stage} déjà envoyé, saut",
+    'no_prior_stage': "{email} - pas de {field}, saut",
+    'not_due': "{email} - seulement {days} jours depuis le dernier contact (minimum {minimum}), saut",
+    'company_cap': "{email} - plafond de {limit} contacts atteint pour {company}, saut",
+    'score': "{email} - {cause}, saut",
+}
 
-    try:
-        if smtp_cfg.get("SMTP_USE_SSL") or smtp_cfg.get("SMTP_PORT") == 465:
-            with smtplib.SMTP_SSL(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"], context=context) as server:
-                if smtp_cfg.get("SMTP_DEBUG"):
-                    server.set_debuglevel(1)
-                server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-                server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
-        else:
-            with smtplib.SMTP(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"]) as server:
-                if smtp_cfg.get("SMTP_DEBUG"):
-                    server.set_debuglevel(1)
-                server.starttls(context=context)
-                server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-                server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
-    except ssl.SSLError as ssl_err:
-        logging.error(f"❌ Erreur SSL : {ssl_err}")
-        logging.warning("Tentative de reconnexion avec contexte non vérifié...")
-        insecure_context = ssl._create_unverified_context()
-        with smtplib.SMTP_SSL(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"], context=insecure_context) as server:
-            server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-            server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
+def load_env():
+    return load_campaign_env(
+        os.path.dirname(os.path.abspath(__file__)),
+        VIDEO_URL="https://www.youtube.com/watch?v=eS6VZm7rzeM",
+        BCC_EMAIL="valentin.henry-leo@polytechnique.edu",
+        DAYS_BEFORE_NUDGE1=3,
+        DAYS_BEFORE_NUDGE2=5,
+        EMAIL_SUBJECT="École Polytechnique - Projet de logiciel pour agences immobilières",
+        EMAIL_SUBJECT_NUDGE1="Re: Projet IA pour agences immobilières",
+        EMAIL_SUBJECT_NUDGE2="Re: Dernier message - Projet IA immobilier",
+        CAMPAIGN_NAME="AgentsImmo",
+    )
 
 def read_template(template_name):
-    template_path = os.path.join(os.path.dirname(__file__), template_name)
-    with open(template_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    """Compiled template from the campaign folder (cached per process)"""
+    return load_template(os.path.join(os.path.dirname(os.path.abspath(__file__)), template_name))
 
 def parse_date(date_str):
     """Parse date string, return None if empty or invalid"""
@@ -137,9 +68,16 @@ def parse_date(date_str):
     except:
         return None
 
-def send_nudge_campaign(csv_path, campaign_stage, delay_seconds=150, dry_run=False):
+def send_nudge_campaign(csv_path, campaign_stage, delay_seconds=150, dry_run=False, queued_only=False, adaptive=False,
+                        max_per_company=None):
     """
     campaign_stage: 'nudge1' or 'nudge2'
+    queued_only: only send to contacts enqueued through campaign_daemon.py
+    (the minimum delay since the previous stage is then not enforced)
+    adaptive: start from delay_seconds and let the relay's throttling signals
+    tune the pace within SEND_DELAY_MIN/SEND_DELAY_MAX
+    max_per_company: at most this many contacts per company get this stage
+    (default MAX_PER_COMPANY, 0 = no cap)
     """
     cfg = load_env()
     
@@ -162,42 +100,62 @@ def send_nudge_campaign(csv_path, campaign_stage, delay_seconds=150, dry_run=Fal
         logging.error(f"Unknown campaign stage: {campaign_stage}")
         return
     
-    tpl = Template(read_template(template_file))
-    rows, dialect, fieldnames = read_csv_rows_with_dialect(csv_path)
-    
-    # Ensure required fields exist
-    for field in ['premier_envoi_date', 'nudge1_date', 'nudge2_date', 'answered', 'status']:
-        if field not in fieldnames:
-            fieldnames.append(field)
+    tpl = read_template(template_file)
+    # Written back one contact at a time with update_contacts (missing columns added then)
+    rows, _, _ = read_csv_rows_with_dialect(csv_path)
     
+    cap = CompanyCap(cfg["MAX_PER_COMPANY"] if max_per_company is None else max_per_company)
+    for row in rows:
+        if (row.get(date_field) or '').strip():
+            cap.count(row)
+
     total = len(rows)
     sent_count = 0
+    handled = set()  # Sent or address refused: done with this stage
+    jobs = []
+    skips = SkipCounter(campaign_stage, total, SKIP_MESSAGES)
+
+    # Opens/clicks from tracking_server.py, kept out of the master CSV (scoring only)
+    engagement = load_engagement(engagement_path(csv_path))
+
+    queued = None
+    if queued_only:
+        queued = {entry['email'] for entry in load_queue() if entry.get('stage') == campaign_stage}
+        logging.info(f"📥 {len(queued)} contacts en file d'attente pour {campaign_stage}")
     
     for i, row in enumerate(rows, 1):
         email = (row.get('email') or '').strip()
         if not email:
             continue
+        if queued is not None and email.lower() not in queued:
+            skips.skip('not_queued', i, email)
+            continue
         
         # Check if already answered
         answered = (row.get('answered') or '').strip().lower()
         if answered == 'yes':
-            logging.info(f"{format_progress(i, total)} {email} a déjà répondu, saut")
+            skips.skip('answered', i, email)
             continue
         
+        # Hard-bounced or otherwise suppressed addresses never get a nudge
+        if (row.get('status') or '').strip().lower() in SUPPRESSED_STATUSES:
+            skips.skip('suppressed', i, email, status=row.get('status'))
+            continue
+
         # Check if this stage was already sent
         if (row.get(date_field) or '').strip():
-            logging.info(f"{format_progress(i, total)} {email} - {campaign_stage} déjà envoyé, saut")
+            skips.skip('already_sent', i, email)
             continue
         
         # Check if prior stage exists and enough time has passed
         prior_date = parse_date(row.get(required_prior_field) or '')
         if not prior_date:
-            logging.info(f"{format_progress(i, total)} {email} - pas de {required_prior_field}, saut")
+            skips.skip('no_prior_stage', i, email, field=required_prior_field)
             continue
         
         days_since_prior = (datetime.now() - prior_date).days
-        if days_since_prior < days_delay:
-            logging.info(f"{format_progress(i, total)} {email} - seulement {days_since_prior} jours depuis le dernier contact (minimum {days_delay}), saut")
+        if queued is None and days_since_prior < days_delay:
+            skips.skip('not_due', i, email, days=days_since_prior, minimum=days_delay)
             continue
         
         # Ready to send!
@@ -208,29 +166,82 @@ def send_nudge_campaign(csv_path, campaign_stage, delay_seconds=150, dry_run=Fal
             'company_name': (row.get('company_name') or '').strip(),
         }
         
-        html_body = tpl.render(**r, video_url=cfg["VIDEO_URL"])
-        
-        if dry_run:
-            logging.info(f"{format_progress(i, total)} [DRY RUN] Envoi {campaign_stage} à {email}")
-            sent_count += 1
+        if not cap.allow(row):
+            skips.skip('company_cap', i, email, limit=cap.limit, company=company_key(row))
             continue
-        
+
+        skips.seen(i)
+        jobs.append({'index': i, 'email': email, 'domain': recipient_domain(email),
+                     'tz': contact_timezone(row, cfg["DEFAULT_TIMEZONE"]), 'row': row, 'recipient': r,
+                     'engagement': engagement.get(email.lower())})
+    # Best leads first (then spread over domains and local send windows below)
+    jobs = prioritize(jobs, skips, cfg["SKIP_UNVERIFIED"])
+    skips.summary(final=True)
+
+    if dry_run:
+        for job in jobs:
+            tpl.render(**job['recipient'], stage=campaign_stage, video_url=cfg["VIDEO_URL"])
+            logging.info(f"{format_progress(job['index'], total)} [DRY RUN] Envoi {campaign_stage} à {job['email']} (score {job['score']})")
+        sent_count = len(jobs)
+        jobs = []
+
+    def build_email(job):
+        return prepare_email(cfg, subject, tpl.render(**job['recipient'], stage=campaign_stage, video_url=cfg["VIDEO_URL"]), job['recipient'])
+
+    def send_one(job):
+        if presigned is not None:
+            return send_prepared(cfg, presigned.get(job))
+        html_body = tpl.render(**job['recipient'], stage=campaign_stage, video_url=cfg["VIDEO_URL"])
+        return send_email(cfg, subject, html_body, job['recipient'])
+
+    def on_sent(job, message_id):
+        r = job['recipient']
+        fields = {date_field: datetime.now().strftime('%Y-%m-%d'), 'status': new_status}
+        job['row'].update(fields)
+        # Through the daemon when it runs, else re-read and merged, never rewritten from the rows
+        # loaded at startup: replies marked meanwhile (watch_responses.py, quick_mark.py) survive
+        update_contacts(csv_path, {job['email']: fields})
+        # After the CSV: a failing index write must not lead to a second nudge next run
         try:
-            send_email(cfg, subject, html_body, r)
-            row[date_field] = datetime.now().strftime('%Y-%m-%d')
-            row['status'] = new_status
-            write_csv_rows(csv_path, rows, dialect, fieldnames)
-            sent_count += 1
-            logging.info(f"{format_progress(i, total)} ✅ {campaign_stage} envoyé à {email} ({r.get('first_name','')} {r.get('last_name','')})")
+            record_outbound(message_id, job['email'], cfg["CAMPAIGN_NAME"], campaign_stage)
         except Exception as e:
-            logging.error(f"[{i}] Erreur pour {email}: {e}")
-        
-        logging.info(f"Pause {delay_seconds}s avant le prochain…")
-        time.sleep(delay_seconds)
-    
+            logging.error(f"❌ Index des messages envoyés non mis à jour pour {job['email']} ({message_id}) : {e}")
+        handled.add(job['email'].lower())
+        logging.info(f"{format_progress(job['index'], total)} ✅ {campaign_stage} envoyé à {job['email']} ({r.get('first_name','')} {r.get('last_name','')})")
+
+    def on_failed(job, kind, code, message):
+        logging.error(f"[{job['index']}] Erreur pour {job['email']}: {f'{code} ' if code else ''}{message}")
+        if kind == PERMANENT:
+            # Address refused by the server (5xx at RCPT): recorded so no later stage retries it
+            fields = {'status': 'send_failed',
+                      'notes': f"SMTP {code} {campaign_stage} ({datetime.now().strftime('%Y-%m-%d')}) {message}"[:200].strip()}
+            job['row'].update(fields)
+            update_contacts(csv_path, {job['email']: fields})
+            add_to_suppression_list({job['email'].lower(): str(code)}, 'smtp_rejected')
+            handled.add(job['email'].lower())
+
+    if jobs:
+        rate = AIMDRate.from_config(cfg, delay_seconds) if adaptive else None
+        # DKIM on: every message built now and signed in background batches, best leads first
+        presigned = presign(cfg, jobs, build_email)
+        queues = build_queues(jobs, cfg)
+        status = start_status_server(cfg, cfg["CAMPAIGN_NAME"], campaign_stage, len(jobs), delay_seconds)
+        counts = run_send_loop(queues, send_one, delay_seconds, on_sent, on_failed, RetryQueue.from_config(cfg), rate=rate,
+                               status=status)
+        sent_count = counts['sent']
+        logging.info(f"{counts['permanent']} adresses refusées, {counts['rejected']} messages refusés et {counts['gave_up']} abandonnés après "
+                     f"{cfg['RETRY_MAX_ATTEMPTS']} essais (relancés au prochain passage)")
+
+    if handled and queued_only:
+        # Skipped, message-refused or given-up contacts stay queued for the next run
+        dequeue_sent(campaign_stage, handled)
+
     logging.info(f"\n🎯 Campaign terminée : {sent_count} emails {campaign_stage} envoyés sur {total} contacts")
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('campaign_manager', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     import argparse
     
     parser = argparse.ArgumentParser(description='Multi-stage email campaign manager')
@@ -238,6 +249,9 @@ if __name__ == "__main__":
     parser.add_argument('stage', choices=['nudge1', 'nudge2'], help='Campaign stage to run')
     parser.add_argument('--delay', type=int, default=150, help='Delay in seconds between emails (default: 150 = 2m30s)')
     parser.add_argument('--dry-run', action='store_true', help='Simulate sending without actually sending emails')
+    parser.add_argument('--queued', action='store_true', help='Only send to contacts enqueued via campaign_daemon.py')
+    parser.add_argument('--adaptive', action='store_true', help='Adapt the delay to relay throttling (AIMD, bounded by SEND_DELAY_MIN/MAX)')
+    parser.add_argument('--max-per-company', type=int, default=None, help='Max contacts per company for this stage (default: MAX_PER_COMPANY, 0 = no cap)')
     
     args = parser.parse_args()
     
@@ -249,5 +263,6 @@ if __name__ == "__main__":
     if args.dry_run:
         logging.info("⚠️ MODE DRY RUN - Aucun email ne sera envoyé")
     
-    send_nudge_campaign(args.csv_file, args.stage, delay_seconds=args.delay, dry_run=args.dry_run)
+    send_nudge_campaign(args.csv_file, args.stage, delay_seconds=args.delay, dry_run=args.dry_run, queued_only=args.queued, adaptive=args.adaptive,
+                        max_per_company=args.max_per_company)
 
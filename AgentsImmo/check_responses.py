@@ -2,30 +2,52 @@
 """
 Check email responses by analyzing sent emails vs master_contacts_tracking.csv
 Identifies who hasn't responded yet
+Usage: python check_responses.py [--mark] [--full-resync]
+  --mark         mark responders in the master CSV right away (no auto_mark_responses.py step)
+  --full-resync  ignore the local IMAP sync cache
 """
 import imaplib
 import email
 import email.header
+import email.utils
 import csv
+import json
 import os
 import re
 import unicodedata
-from email.mime.text import MIMEText
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import sys
+import _paths  # repo root on sys.path, for lemlist_core
+from lemlist_core.env import load_dotenv_once, env_flag
+from thread_index import load_thread_index, match_reply, message_id_domain, DEFAULT_INDEX_PATH
+from imap_sync import (
+    load_sync_state, save_sync_state, folder_state, reset_folder_state,
+    select_folder, search_new_uids, chunk_message_set, parse_fetch_response,
+)
+from bounces import scan_bounces, suppress_bounced
+from auto_mark_responses import apply_responses
+
+RESULTS_PATH = "response_analysis.jsonl"
+
+# Window of the default search, and age past which classified messages leave the sync cache
+RECENT_DAYS = 90
+
+CAMPAIGN_SUBJECT = "École Polytechnique - Projet de logiciel pour agences immobilières"
 
 def load_env():
     """Load environment variables"""
-    load_dotenv()
-    parent_env = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-    if os.path.exists(parent_env):
-        load_dotenv(parent_env)
+    load_dotenv_once(os.path.dirname(os.path.abspath(__file__)))
+    use_ssl = env_flag("IMAP_USE_SSL", "true")  # false for a local test server (benchmarks/imap_replay.py)
     return {
         "IMAP_HOST": os.getenv("IMAP_HOST", "webmail.polytechnique.fr"),  # Polytechnique IMAP host
+        "IMAP_PORT": int(os.getenv("IMAP_PORT") or (993 if use_ssl else 143)),
+        "IMAP_USE_SSL": use_ssl,
         "IMAP_USER": os.getenv("SMTP_USER"),  # Reuse SMTP credentials
         "IMAP_PASS": os.getenv("SMTP_PASS"),
         "SENT_FOLDER": os.getenv("SENT_FOLDER", '"Sent"'),
+        "FETCH_BATCH_SIZE": int(os.getenv("IMAP_FETCH_BATCH_SIZE", "300")),
+        "THREAD_INDEX_PATH": DEFAULT_INDEX_PATH,
+        "SYNC_STATE_PATH": os.getenv("IMAP_SYNC_STATE", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'imap_sync_state.json')),
     }
 
 def decode_header(header_str):
@@ -36,7 +58,13 @@ def decode_header(header_str):
     decoded_str = ""
     for part, encoding in decoded_parts:
         if isinstance(part, bytes):
-            decoded_str += part.decode(encoding or 'utf-8', errors='ignore')
+            # Raw 8-bit headers (no RFC 2047) come back as 'unknown-8bit': almost always UTF-8
+            if not encoding or encoding == 'unknown-8bit':
+                encoding = 'utf-8'
+            try:
+                decoded_str += part.decode(encoding, errors='ignore')
+            except LookupError:
+                decoded_str += part.decode('utf-8', errors='ignore')
         else:
             decoded_str += str(part)
     return decoded_str
@@ -58,194 +86,358 @@ def extract_emails_from_header(header_value):
 
     return list(set(emails))  # Remove duplicates
 
+# Filter out system emails
+SYSTEM_SENDER_PATTERNS = [
+    'postmaster',
+    'mailer-daemon',
+    'noreply',
+    'no-reply',
+    'donotreply',
+    'reponse.auto',  # Auto-reply addresses
+    'reponse-auto',
+    'auto-reponse',
+    'invitations.mailinblack.com',  # Email relay system
+    'onmicrosoft.com',  # Microsoft system emails
+    'mailinblack.com',
+    'undeliverable',
+    'bounce',
+    'returned',
+    'delivery failure',
+]
+
+# Common patterns for automatic responses
+AUTO_REPLY_PATTERNS = [
+    "réponse automatique",
+    "automatic reply",
+    "auto-reply",
+    "out of office",
+    "absence",
+    "absent",  # "Absent jusqu'au..."
+    "congés",
+    "vacation",
+    "vacances",
+    "en congé",
+    "away from office",
+    "ne fait plus partie",
+    "no longer with",
+    "has left",
+    "n'est plus",
+    "déménagement",
+    "transfert",
+    "redirection",
+    "forward",
+    "automatique",
+    "automated",
+    "robot",
+    "noreply",
+    "no-reply",
+    "donotreply",
+    "do-not-reply",
+    "undeliverable",  # Delivery failures
+]
+
+# One precompiled alternation per list: a single scan instead of one `in` per pattern
+SYSTEM_SENDER_RE = re.compile("|".join(re.escape(pattern) for pattern in SYSTEM_SENDER_PATTERNS))
+AUTO_REPLY_RE = re.compile("|".join(re.escape(pattern) for pattern in AUTO_REPLY_PATTERNS))
+
+# Headers fetched with FROM/SUBJECT so most auto-replies are classified without a body fetch
+AUTO_HEADER_FIELDS = "AUTO-SUBMITTED X-AUTOREPLY X-AUTORESPOND PRECEDENCE RETURN-PATH CONTENT-TYPE"
+
 def is_system_email(email_address):
     """Check if an email is from a system/non-prospect source"""
     if not email_address:
         return True
-    
-    email_lower = email_address.lower()
-    
-    # Filter out system emails
-    system_patterns = [
-        'postmaster',
-        'mailer-daemon',
-        'noreply',
-        'no-reply',
-        'donotreply',
-        'reponse.auto',  # Auto-reply addresses
-        'reponse-auto',
-        'auto-reponse',
-        'invitations.mailinblack.com',  # Email relay system
-        'onmicrosoft.com',  # Microsoft system emails
-        'mailinblack.com',
-        'undeliverable',
-        'bounce',
-        'returned',
-        'delivery failure',
-    ]
-    
-    for pattern in system_patterns:
-        if pattern in email_lower:
-            return True
-    
-    return False
+    return SYSTEM_SENDER_RE.search(email_address.lower()) is not None
 
 def is_automatic_response(subject, content=""):
     """Check if an email is an automatic response (out of office, etc.)"""
-    # Common patterns for automatic responses
-    auto_patterns = [
-        "réponse automatique",
-        "automatic reply",
-        "auto-reply",
-        "out of office",
-        "absence",
-        "absent",  # "Absent jusqu'au..."
-        "congés",
-        "vacation",
-        "vacances",
-        "en congé",
-        "away from office",
-        "ne fait plus partie",
-        "no longer with",
-        "has left",
-        "n'est plus",
-        "déménagement",
-        "transfert",
-        "redirection",
-        "forward",
-        "automatique",
-        "automated",
-        "robot",
-        "noreply",
-        "no-reply",
-        "donotreply",
-        "do-not-reply",
-        "undeliverable",  # Delivery failures
+    if subject and AUTO_REPLY_RE.search(subject.lower()):
+        return True
+    return bool(content) and AUTO_REPLY_RE.search(content.lower()) is not None
+
+def classify_auto_headers(msg):
+    """Return why the headers alone mark a message as automatic, or None
+
+    Covers RFC 3834 Auto-Submitted, the X-Autoreply/X-Autorespond vendor
+    headers, bulk Precedence, the null Return-Path and DSN reports.
+    """
+    auto_submitted = (msg.get("Auto-Submitted") or "").strip().lower()
+    if auto_submitted and auto_submitted != "no":
+        return f"Auto-Submitted: {auto_submitted}"
+    if msg.get("X-Autoreply") or msg.get("X-Autorespond"):
+        return "X-Autoreply header"
+    precedence = (msg.get("Precedence") or "").strip().lower()
+    if precedence in ("bulk", "junk", "list", "auto_reply"):
+        return f"Precedence: {precedence}"
+    if (msg.get("Return-Path") or "").strip() == "<>":
+        return "Null Return-Path"
+    content_type = (msg.get("Content-Type") or "").lower()
+    if "multipart/report" in content_type or "delivery-status" in content_type:
+        return "Delivery status notification"
+    return None
+
+def parse_campaign_headers(raw_headers, your_email, thread_index=None):
+    """Return sender/subject/date for a prospect reply to the campaign, else None
+
+    Replies whose In-Reply-To/References point at one of our Message-IDs are
+    attributed to the indexed contact directly; the subject keywords are only
+    a fallback for mail sent before the index existed.
+    """
+    msg = email.message_from_bytes(raw_headers)
+
+    # Extract sender
+    from_header = decode_header(msg.get("From", ""))
+    sender_emails = extract_emails_from_header(from_header)
+
+    # Skip emails from yourself
+    sender_emails = [addr for addr in sender_emails if addr.lower() != your_email]
+
+    # Filter out system emails (postmaster, mailinblack, etc.)
+    sender_emails = [addr for addr in sender_emails if not is_system_email(addr)]
+
+    if not sender_emails:  # Only if it's from someone else (prospect response)
+        return None
+
+    subject = decode_header(msg.get("Subject", ""))
+    date_received = decode_header(msg.get("Date", ""))
+
+    # Cheap checks first: headers, then one regex pass over the subject
+    auto_reason = classify_auto_headers(msg)
+    if not auto_reason and is_automatic_response(subject):
+        auto_reason = "Auto-reply subject"
+
+    thread = match_reply(thread_index, msg.get("In-Reply-To", ""), msg.get("References", ""))
+    if thread:
+        return {
+            'sender': thread['email'],  # The contact we wrote to, even if a colleague answered
+            'from': sender_emails[0],
+            'subject': subject,
+            'date': date_received,
+            'campaign': thread.get('campaign', ''),
+            'stage': thread.get('stage', ''),
+            'auto_reason': auto_reason,
+        }
+
+    # FILTER: Only keep emails with the exact campaign subject
+    # The subject should be "École Polytechnique - Projet de logiciel pour agences immobilières"
+    # We check for the key parts to handle encoding variations
+    subject_lower = subject.lower()
+    # Remove accents for comparison (handle "immobilières" vs "immobilieres")
+    subject_normalized = unicodedata.normalize('NFKD', subject_lower)
+    subject_ascii = subject_normalized.encode('ascii', 'ignore').decode('ascii')
+
+    campaign_keywords = [
+        "ecole polytechnique",
+        "projet de logiciel",
+        "agences immobili"  # Match "immobilières" or "immobilieres"
     ]
 
-    subject_lower = subject.lower() if subject else ""
-    content_lower = content.lower() if content else ""
-
-    # Check subject for automatic response indicators
-    for pattern in auto_patterns:
-        if pattern in subject_lower or pattern in content_lower:
-            return True
+    # Check if subject contains all key parts of the campaign
+    if not all(keyword in subject_ascii for keyword in campaign_keywords):
+        # Skip this email - not related to our campaign
+        return None
 
-    return False
+    return {
+        'sender': sender_emails[0],  # Take first sender email
+        'from': sender_emails[0],
+        'subject': subject,
+        'date': date_received,
+        'campaign': '',
+        'stage': '',
+        'auto_reason': auto_reason,
+    }
 
-def get_received_responses(imap_cfg, search_subject=None):
-    """Get all received emails (responses), optionally filtered by subject"""
-    try:
-        mail = imaplib.IMAP4_SSL(imap_cfg["IMAP_HOST"])
-        mail.login(imap_cfg["IMAP_USER"], imap_cfg["IMAP_PASS"])
-
-        # Use INBOX for received emails
-        inbox_folder = os.getenv("INBOX_FOLDER", "INBOX")
-        mail.select(inbox_folder)
-
-        # Search criteria
-        if search_subject:
-            # Search for emails containing key words (IMAP doesn't handle accents well)
-            # We'll filter more precisely after fetching
-            search_criteria = 'OR SUBJECT "Ecole Polytechnique" SUBJECT "Projet de logiciel"'
+def prune_older_than(messages, days):
+    """Drop cached messages whose Date header is older than `days`, return how many went"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    pruned = 0
+    for uid in list(messages):
+        try:
+            received = email.utils.parsedate_to_datetime(messages[uid]['date'])
+        except Exception:
+            continue
+        if received.tzinfo is None:
+            received = received.replace(tzinfo=timezone.utc)
+        if received < cutoff:
+            del messages[uid]
+            pruned += 1
+    return pruned
+
+def connect_imap(imap_cfg):
+    """Open and authenticate an IMAP connection"""
+    if imap_cfg["IMAP_USE_SSL"]:
+        mail = imaplib.IMAP4_SSL(imap_cfg["IMAP_HOST"], imap_cfg["IMAP_PORT"])
+    else:
+        mail = imaplib.IMAP4(imap_cfg["IMAP_HOST"], imap_cfg["IMAP_PORT"])
+    mail.login(imap_cfg["IMAP_USER"], imap_cfg["IMAP_PASS"])
+    return mail
+
+def sync_responses(mail, imap_cfg, search_subject=None, full_resync=False, verbose=True):
+    """Incrementally sync replies over an open IMAP connection
+
+    Only UIDs above the last synced one are fetched; messages classified on a
+    previous run are served from the local sync cache (see imap_sync.py).
+    Returns (responses, automatic_responses, fresh) where fresh holds the
+    messages classified during this call only.
+    """
+    # Use INBOX for received emails
+    inbox_folder = os.getenv("INBOX_FOLDER", "INBOX")
+    thread_index = load_thread_index(imap_cfg["THREAD_INDEX_PATH"])
+
+    # Search criteria
+    if search_subject:
+        # Search for emails containing key words (IMAP doesn't handle accents well)
+        # We'll filter more precisely after fetching
+        sync_mode = 'campaign'
+        search_criteria = 'OR SUBJECT "Ecole Polytechnique" SUBJECT "Projet de logiciel"'
+        if thread_index:
+            # Also catch replies with a rewritten subject that reference our Message-IDs
+            domain = message_id_domain(imap_cfg["IMAP_USER"])
+            search_criteria = f'OR OR {search_criteria} HEADER In-Reply-To "{domain}" HEADER References "{domain}"'
+            sync_mode = 'campaign+threads'
+        if verbose:
             print(f"🔍 Searching for emails with subject: '{search_subject}'")
             print(f"   (Using broad IMAP search, will filter precisely after)")
+    else:
+        # Default: search from last 90 days
+        sync_mode = 'recent'
+        date_since = (datetime.now() - timedelta(days=RECENT_DAYS)).strftime("%d-%b-%Y")
+        search_criteria = f'SINCE {date_since}'
+        if verbose:
+            print(f"🔍 Searching for emails from last {RECENT_DAYS} days")
+
+    state = load_sync_state(imap_cfg["SYNC_STATE_PATH"])
+    sync = folder_state(state, inbox_folder, sync_mode)
+    if full_resync:
+        # This folder/mode only: the other scans keep their watermarks
+        reset_folder_state(sync, None)
+    before = (sync['uidvalidity'], sync['last_uid'], sync['highestmodseq'], len(sync['messages']))
+
+    # UIDVALIDITY/UIDNEXT/HIGHESTMODSEQ come with the SELECT itself
+    folder_status = select_folder(mail, inbox_folder)
+    uidvalidity = folder_status.get('UIDVALIDITY')
+    if sync['uidvalidity'] != uidvalidity:
+        if sync['uidvalidity'] is not None:
+            print(f"♻️  UIDVALIDITY changed for {inbox_folder}, full resync")
+        reset_folder_state(sync, uidvalidity)
+
+    uidnext = folder_status.get('UIDNEXT')
+    modseq = folder_status.get('HIGHESTMODSEQ')
+    if sync['last_uid'] and (
+        (modseq is not None and modseq == sync['highestmodseq'])
+        or (uidnext is not None and uidnext - 1 <= sync['last_uid'])
+    ):
+        new_uids = []
+    else:
+        new_uids = search_new_uids(mail, sync['last_uid'], search_criteria)
+
+    if verbose:
+        print(f"📧 Found {len(new_uids)} new emails matching criteria "
+              f"({len(sync['messages'])} already classified in cache)")
+
+    your_email = imap_cfg["IMAP_USER"].lower()
+    fetch_failed = False
+    scanned_uids = []
+
+    # Pass 1: headers only, fetched over UID ranges
+    candidates = []
+    for chunk, uid_set in chunk_message_set(new_uids, imap_cfg["FETCH_BATCH_SIZE"]):
+        try:
+            typ, msg_data = mail.uid('FETCH', uid_set, '(BODY[HEADER.FIELDS (FROM SUBJECT DATE IN-REPLY-TO REFERENCES ' + AUTO_HEADER_FIELDS + ')])')
+        except Exception as e:
+            print(f"⚠️ Error fetching headers for {uid_set.decode()}: {e}")
+            typ = 'NO'
+        if typ != 'OK':
+            fetch_failed = True
+            break
+        scanned_uids.extend(chunk)
+
+        headers_by_uid = parse_fetch_response(msg_data, by_uid=True)
+        for uid in chunk:
+            raw_headers = headers_by_uid.get(uid)
+            if raw_headers is None:
+                continue
+            try:
+                candidate = parse_campaign_headers(raw_headers, your_email, thread_index)
+            except Exception as e:
+                print(f"⚠️ Error processing email {uid.decode()}: {e}")
+                continue
+            if candidate:
+                candidate['uid'] = uid
+                candidates.append(candidate)
+
+    # Pass 2: body previews, only for campaign matches the headers left ambiguous
+    previews = {}
+    candidate_uids = [candidate['uid'] for candidate in candidates if not candidate['auto_reason']]
+    for chunk, uid_set in chunk_message_set(candidate_uids, imap_cfg["FETCH_BATCH_SIZE"]):
+        try:
+            typ, body_data = mail.uid('FETCH', uid_set, '(BODY[TEXT]<0.1000>)')
+        except Exception:
+            continue
+        if typ == 'OK':
+            for uid, body in parse_fetch_response(body_data, by_uid=True).items():
+                previews[uid] = body.decode('utf-8', errors='ignore')[:500]
+
+    fresh = []
+    for candidate in candidates:
+        uid = candidate['uid']
+        content_preview = previews.get(uid, "")
+
+        # Check if this is an automatic response
+        auto_reason = candidate['auto_reason']
+        if not auto_reason and is_automatic_response("", content_preview):
+            auto_reason = "Auto-reply content"
+        is_auto = bool(auto_reason)
+
+        response_data = {
+            'sender': candidate['sender'],
+            'from': candidate['from'],
+            'campaign': candidate['campaign'],
+            'stage': candidate['stage'],
+            'subject': candidate['subject'],
+            'date': candidate['date'],
+            'is_automatic': is_auto,
+            'auto_reason': auto_reason,
+            'content_preview': content_preview[:100] + "..." if len(content_preview) > 100 else content_preview
+        }
+        sync['messages'][uid.decode()] = response_data
+        fresh.append(response_data)
+
+    # Advance the sync point only over what was actually scanned
+    if fetch_failed:
+        sync['last_uid'] = max([int(uid) for uid in scanned_uids] + [sync['last_uid']])
+        print("⚠️ Header fetch interrupted, the remaining emails will be rescanned next run")
+    else:
+        sync['last_uid'] = max([int(uid) for uid in new_uids] + [(uidnext or 1) - 1, sync['last_uid']])
+        sync['highestmodseq'] = modseq
+    # Every mode, not just 'recent': the cache (loaded on each run) stays bounded by the window
+    pruned = prune_older_than(sync['messages'], days=RECENT_DAYS)
+    if fresh or pruned or before != (sync['uidvalidity'], sync['last_uid'], sync['highestmodseq'], len(sync['messages'])):
+        save_sync_state(state, imap_cfg["SYNC_STATE_PATH"])
+
+    responses = []
+    automatic_responses = []
+    for uid in sorted(sync['messages'], key=int):
+        response_data = sync['messages'][uid]
+        if response_data['is_automatic']:
+            automatic_responses.append(response_data)
         else:
-            # Default: search from last 90 days
-            date_since = (datetime.now() - timedelta(days=90)).strftime("%d-%b-%Y")
-            search_criteria = f'SINCE {date_since}'
-            print(f"🔍 Searching for emails from last 90 days")
-
-        status, data = mail.search(None, search_criteria)
-
-        responses = []
-        automatic_responses = []
-        if status == 'OK' and data[0]:
-            email_nums = data[0].split()
-            print(f"📧 Found {len(email_nums)} emails matching criteria")
-
-            for num in email_nums:  # Process all matching emails
-                try:
-                    # Get headers first
-                    typ, msg_data = mail.fetch(num, '(BODY[HEADER.FIELDS (FROM SUBJECT DATE)])')
-                    if typ != 'OK':
-                        continue
-                    
-                    msg = email.message_from_bytes(msg_data[0][1])
-
-                    # Extract sender
-                    from_header = decode_header(msg.get("From", ""))
-                    sender_emails = extract_emails_from_header(from_header)
-
-                    # Skip emails from yourself
-                    your_email = imap_cfg["IMAP_USER"].lower()
-                    sender_emails = [email for email in sender_emails if email.lower() != your_email]
-                    
-                    # Filter out system emails (postmaster, mailinblack, etc.)
-                    sender_emails = [email for email in sender_emails if not is_system_email(email)]
-
-                    if sender_emails:  # Only if it's from someone else (prospect response)
-                        subject = decode_header(msg.get("Subject", ""))
-                        date_received = decode_header(msg.get("Date", ""))
-
-                        # FILTER: Only keep emails with the exact campaign subject
-                        # The subject should be "École Polytechnique - Projet de logiciel pour agences immobilières"
-                        # We check for the key parts to handle encoding variations
-                        subject_lower = subject.lower()
-                        # Remove accents for comparison (handle "immobilières" vs "immobilieres")
-                        subject_normalized = unicodedata.normalize('NFKD', subject_lower)
-                        subject_ascii = subject_normalized.encode('ascii', 'ignore').decode('ascii')
-                        
-                        campaign_keywords = [
-                            "ecole polytechnique",
-                            "projet de logiciel",
-                            "agences immobili"  # Match "immobilières" or "immobilieres"
-                        ]
-                        
-                        # Check if subject contains all key parts of the campaign
-                        is_campaign_email = all(keyword in subject_ascii for keyword in campaign_keywords)
-                        
-                        if not is_campaign_email:
-                            # Skip this email - not related to our campaign
-                            continue
-
-                        # Try to get a bit of content to check for automatic responses
-                        content_preview = ""
-                        try:
-                            # Fetch body preview
-                            typ2, body_data = mail.fetch(num, '(BODY[TEXT]<0.1000>)')
-                            if typ2 == 'OK' and body_data[0]:
-                                if isinstance(body_data[0][1], bytes):
-                                    content_preview = body_data[0][1].decode('utf-8', errors='ignore')[:500]
-                        except:
-                            pass
-
-                        # Check if this is an automatic response
-                        is_auto = is_automatic_response(subject, content_preview)
-
-                        response_data = {
-                            'sender': sender_emails[0],  # Take first sender email
-                            'subject': subject,
-                            'date': date_received,
-                            'is_automatic': is_auto,
-                            'content_preview': content_preview[:100] + "..." if len(content_preview) > 100 else content_preview
-                        }
-
-                        if is_auto:
-                            automatic_responses.append(response_data)
-                        else:
-                            responses.append(response_data)
-
-                except Exception as e:
-                    print(f"⚠️ Error processing email {num}: {e}")
-                    continue
-
-        mail.logout()
+            responses.append(response_data)
 
+    if verbose:
         print(f"✅ Found {len(responses)} real responses from prospects")
         print(f"🤖 Found {len(automatic_responses)} automatic responses (filtered out)")
 
-        # Return both real responses and automatic ones for reporting
+    # Return both real responses and automatic ones for reporting
+    return responses, automatic_responses, fresh
+
+
+def get_received_responses(imap_cfg, search_subject=None, full_resync=False):
+    """Get all received emails (responses), optionally filtered by subject"""
+    try:
+        mail = connect_imap(imap_cfg)
+        responses, automatic_responses, _ = sync_responses(mail, imap_cfg, search_subject, full_resync)
+        mail.logout()
         return responses, automatic_responses
 
     except Exception as e:
@@ -279,6 +471,22 @@ def load_master_contacts(csv_path):
 
     return contacts
 
+def write_results_jsonl(path, response_details, new_contacts_to_add, auto_responses):
+    """One JSON object per line, tagged by kind, consumed by auto_mark_responses.py"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for response in response_details:
+            f.write(json.dumps({'kind': 'existing_response', **response}, ensure_ascii=False) + "\n")
+        for contact in new_contacts_to_add:
+            f.write(json.dumps({'kind': 'new_contact', **contact}, ensure_ascii=False) + "\n")
+        for response in auto_responses:
+            f.write(json.dumps({
+                'kind': 'automatic',
+                'email': response['sender'],
+                'subject': response['subject'],
+                'date': response['date'],
+                'reason': response.get('auto_reason') or '',
+            }, ensure_ascii=False) + "\n")
+
 def main():
     print("🔍 Checking received email responses...")
     print("=" * 50)
@@ -289,15 +497,33 @@ def main():
         print("❌ No IMAP password found in .env")
         return
 
-    # Load master contacts
+    full_resync = '--full-resync' in sys.argv
+    mark_now = '--mark' in sys.argv
+    if full_resync:
+        print("♻️  Full resync requested, ignoring the local sync cache")
+
     csv_path = "master_contacts_tracking.csv"
+
+    # Hard bounces first: dead addresses are suppressed before anyone plans a nudge
+    try:
+        mail = connect_imap(imap_cfg)
+        bounce_failures = scan_bounces(mail, imap_cfg, full_resync=full_resync)
+        mail.logout()
+    except Exception as e:
+        print(f"⚠️ Bounce scan failed: {e}")
+        bounce_failures = []
+    suppressed = suppress_bounced(csv_path, bounce_failures)
+    if bounce_failures:
+        print(f"📭 {len(bounce_failures)} failed recipients in new bounces, {len(suppressed)} newly suppressed")
+
+    # Load master contacts
     contacts = load_master_contacts(csv_path)
     print(f"📊 Loaded {len(contacts)} contacts from {csv_path}")
 
     # Get received responses - search for campaign emails
-    campaign_subject = "École Polytechnique - Projet de logiciel pour agences immobilières"
+    campaign_subject = CAMPAIGN_SUBJECT
     print(f"📧 Connecting to {imap_cfg['IMAP_HOST']}...")
-    real_responses, auto_responses = get_received_responses(imap_cfg, search_subject=campaign_subject)
+    real_responses, auto_responses = get_received_responses(imap_cfg, search_subject=campaign_subject, full_resync=full_resync)
 
     # Analyze responses - who has really responded (excluding automatic responses)
     responders_in_csv = set()
@@ -387,7 +613,7 @@ def main():
     print("-" * 40)
     for response in auto_responses[:10]:  # Show first 10
         print(f"• {response['sender']} - {response['subject']}")
-        print(f"  🤖 Reason: Automatic response detected")
+        print(f"  🤖 Reason: {response.get('auto_reason') or 'Automatic response detected'}")
     if len(auto_responses) > 10:
         print(f"... and {len(auto_responses) - 10} more")
 
@@ -434,6 +660,7 @@ def main():
         if new_contacts_to_add:
             print(f"\nAdd {len(new_contacts_to_add)} new contacts who responded:")
             print(f"  python auto_mark_responses.py  # Will add them automatically")
+        print("Or run both steps at once: python check_responses.py --mark")
 
     # Save to file
     with open('response_analysis.txt', 'w', encoding='utf-8') as f:
@@ -475,10 +702,25 @@ def main():
             f.write(f"• {contact['email']} - {contact['name']} ({contact['company']}) - Status: {contact['status']}\n")
 
     print("\n💾 Report saved to 'response_analysis.txt'")
-    if response_details:
-        print("🎯 New responses detected - mark them to avoid sending nudges!")
+
+    # Machine-readable handoff for auto_mark_responses.py
+    write_results_jsonl(RESULTS_PATH, response_details, new_contacts_to_add, auto_responses)
+    print(f"💾 Results saved to '{RESULTS_PATH}'")
+
+    if mark_now and (response_details or new_contacts_to_add):
+        # Same process, no file round trip
+        apply_responses(
+            csv_path,
+            [response['email'] for response in response_details],
+            [contact['email'] for contact in new_contacts_to_add],
+        )
+    elif response_details:
+        print("🎯 New responses detected - mark them to avoid sending nudges! (or rerun with --mark)")
     else:
         print("🎯 Ready for nudge campaigns!")
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('check_responses', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     main()
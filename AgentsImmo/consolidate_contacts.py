@@ -11,20 +11,9 @@ import csv
 import os
 from datetime import datetime
 from collections import defaultdict
+import _paths  # repo root on sys.path, for lemlist_core
 
-def read_csv_rows_with_dialect(csv_path):
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        sample = f.read(4096)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames or [])
-        return rows, dialect, fieldnames
+from lemlist_core.csv_io import read_csv_rows_with_dialect
 
 def consolidate_already_contacted(source_dir, output_file):
     """Consolidate all CSVs in source_dir into one master tracking file"""
@@ -88,6 +77,9 @@ def consolidate_already_contacted(source_dir, output_file):
     print(f"📧 Ready for nudge campaigns!")
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('consolidate_contacts', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     source_dir = os.path.join(os.path.dirname(__file__), 'already_contacted_immo')
     output_file = os.path.join(os.path.dirname(__file__), 'master_contacts_tracking.csv')
     
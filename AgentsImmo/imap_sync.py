@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Persisted IMAP sync state for reply checks
+Keeps, per folder and search mode: UIDVALIDITY, the highest UID seen, the
+CONDSTORE HIGHESTMODSEQ (when the server supports it) and a cache of the
+messages already classified, so a routine check only fetches new mail.
+Also holds the IMAP helpers the syncs share: SELECT with the folder status
+read from its own responses, and one IDLE cycle for watch_responses.py.
+"""
+import itertools
+import json
+import os
+import re
+import select
+import _paths  # repo root on sys.path, for lemlist_core
+from lemlist_core.csv_io import atomic_write
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'imap_sync_state.json')
+
+def load_sync_state(path=DEFAULT_STATE_PATH):
+    """Load the sync state file, or an empty state if missing/corrupt"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read {path} ({e}), starting a full resync")
+        return {}
+
+def save_sync_state(state, path=DEFAULT_STATE_PATH):
+    """Write the sync state file"""
+    with atomic_write(path, encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+
+def folder_state(state, folder, mode):
+    """Return (creating if needed) the state entry for a folder/search mode"""
+    key = f"{folder}|{mode}"
+    entry = state.setdefault(key, {})
+    entry.setdefault('uidvalidity', None)
+    entry.setdefault('last_uid', 0)
+    entry.setdefault('highestmodseq', None)
+    entry.setdefault('messages', {})
+    return entry
+
+def reset_folder_state(entry, uidvalidity):
+    """Forget everything cached for a folder (UIDVALIDITY changed)"""
+    entry['uidvalidity'] = uidvalidity
+    entry['last_uid'] = 0
+    entry['highestmodseq'] = None
+    entry['messages'] = {}
+
+def select_folder(mail, folder):
+    """SELECT a folder and return its {'EXISTS', 'UIDVALIDITY', 'UIDNEXT', 'HIGHESTMODSEQ'} ints
+
+    Read from the untagged responses of the SELECT itself (missing keys
+    omitted), so no STATUS is ever sent for the selected mailbox. They are
+    popped, EXISTS included: an EXISTS seen after a later NOOP is new mail.
+    """
+    typ, data = mail.select(folder)
+    if typ != 'OK':
+        raise mail.error(f"SELECT {folder} failed: {data}")
+    status = {}
+    for name in ('EXISTS', 'UIDVALIDITY', 'UIDNEXT', 'HIGHESTMODSEQ'):
+        _, values = mail.response(name)
+        if values and values[-1]:
+            status[name] = int(values[-1])
+    return status
+
+IDLE_TAGS = itertools.count(1)
+
+def idle(mail, timeout):
+    """One IDLE cycle (RFC 2177) on the selected mailbox
+
+    Sends IDLE, checks the '+ idling' continuation, waits up to timeout
+    seconds for the server to push something, then sends DONE and checks the
+    tagged OK. Returns the untagged responses received without their '* '
+    (e.g. [b'23 EXISTS']), empty when nothing happened. Raises mail.error when
+    the server has no IDLE capability (before anything is sent) or refuses
+    the command, mail.abort when the connection drops.
+    """
+    if 'IDLE' not in (mail.capabilities or ()):
+        raise mail.error("server has no IDLE capability")
+    # Lowercase tag: imaplib's own tags are uppercase, the two never collide
+    tag = b'idle%d' % next(IDLE_TAGS)
+    untagged = []
+
+    def read_line():
+        line = mail.readline()
+        if not line:
+            raise mail.abort("connection closed during IDLE")
+        return line.rstrip(b'\r\n')
+
+    def check_tagged(line):
+        status = line[len(tag):].split(None, 1)
+        if not status or status[0].upper() != b'OK':
+            raise mail.error(f"IDLE refused: {line.decode(errors='replace')}")
+
+    mail.send(tag + b' IDLE\r\n')
+    while True:
+        line = read_line()
+        if line.startswith(b'+'):
+            break
+        if line.startswith(tag + b' '):
+            # Tagged reply instead of the continuation: the server refused IDLE
+            raise mail.error(f"IDLE refused: {line.decode(errors='replace')}")
+        if line.startswith(b'* '):
+            untagged.append(line[2:])
+
+    sock = mail.socket()
+    # SSL sockets may already hold decrypted bytes that select() cannot see
+    pending = sock.pending() if hasattr(sock, 'pending') else 0
+    if pending > 0 or select.select([sock], [], [], timeout)[0]:
+        line = read_line()
+        if line.startswith(b'* '):
+            untagged.append(line[2:])
+
+    mail.send(b'DONE\r\n')
+    while True:
+        line = read_line()
+        if line.startswith(tag + b' '):
+            check_tagged(line)
+            return untagged
+        if line.startswith(b'* '):
+            untagged.append(line[2:])
+
+def search_new_uids(mail, last_uid, criteria):
+    """UID SEARCH restricted to UIDs above last_uid, returned as sorted bytes UIDs"""
+    typ, data = mail.uid('SEARCH', None, f'UID {last_uid + 1}:* {criteria}')
+    if typ != 'OK' or not data or not data[0]:
+        return []
+    # "n:*" always matches the highest UID, even when it is below n
+    uids = [uid for uid in data[0].split() if int(uid) > last_uid]
+    return sorted(uids, key=int)
+
+def chunk_message_set(nums, size=300):
+    """Yield (chunk, message_set) pairs covering nums, size messages at a time.
+
+    Consecutive numbers are collapsed into IMAP ranges (b'1:300') so a single
+    FETCH command covers the whole chunk.
+    """
+    for start in range(0, len(nums), size):
+        chunk = nums[start:start + size]
+        ranges = []
+        first = prev = None
+        for num in chunk:
+            value = int(num)
+            if first is None:
+                first = prev = value
+            elif value == prev + 1:
+                prev = value
+            else:
+                ranges.append(f"{first}:{prev}" if first != prev else str(first))
+                first = prev = value
+        if first is not None:
+            ranges.append(f"{first}:{prev}" if first != prev else str(first))
+        yield chunk, ",".join(ranges).encode()
+
+def parse_fetch_response(data, by_uid=False):
+    """Map message number (or UID) -> literal payload from a multi-message FETCH response"""
+    payloads = {}
+    items = list(data or [])
+    for index, item in enumerate(items):
+        # Literals come back as (b'12 (UID 345 BODY[...] {67}', b'...'); closing b')' are skipped
+        if not (isinstance(item, tuple) and len(item) >= 2 and isinstance(item[1], bytes)):
+            continue
+        key = item[0].split(None, 1)[0]
+        if by_uid:
+            match = re.search(rb'UID (\d+)', item[0])
+            if not match and index + 1 < len(items) and isinstance(items[index + 1], bytes):
+                # Some servers send the UID after the literal: b' UID 345)'
+                match = re.search(rb'UID (\d+)', items[index + 1])
+            if not match:
+                continue
+            key = match.group(1)
+        payloads[key] = item[1]
+    return payloads
@@ -1,33 +1,14 @@
 #!/usr/bin/env python3
 """
 Helper script to mark contacts as answered or update their status
-Usage: python mark_answered.py master_contacts_tracking.csv email@example.com --answered yes
+Usage: python mark_answered.py master_contacts_tracking.csv single email@example.com --answered yes
+       python mark_answered.py master_contacts_tracking.csv batch updates.csv   # or updates.jsonl
 """
-import csv
+import json
 import sys
 import os
-
-def read_csv_rows_with_dialect(csv_path):
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        sample = f.read(4096)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames or [])
-        return rows, dialect, fieldnames
-
-def write_csv_rows(csv_path, rows, dialect, fieldnames):
-    delimiter = getattr(dialect, 'delimiter', ';')
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=delimiter)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
+import _paths  # repo root on sys.path, for lemlist_core
+from lemlist_core.csv_io import read_csv_rows_with_dialect, write_csv_rows
 
 def mark_answered(csv_path, email, answered='yes', status=None, notes=None):
     """Mark a contact as answered/not interested"""
@@ -61,19 +42,85 @@ def mark_answered(csv_path, email, answered='yes', status=None, notes=None):
     print(f"💾 Saved to {csv_path}")
     return True
 
+def bulk_update(csv_path, updates):
+    """Apply many updates with one read, an email index and one write
+
+    updates: iterable of dicts with 'email' and optional 'answered', 'status', 'notes'
+    (empty values leave the column untouched).
+    Returns (updated_emails, missing_emails).
+    """
+    rows, dialect, fieldnames = read_csv_rows_with_dialect(csv_path)
+    for field in ['answered', 'status', 'notes']:
+        if field not in fieldnames:
+            fieldnames.append(field)
+
+    index = {}
+    for row in rows:
+        row_email = (row.get('email') or '').strip().lower()
+        if row_email:
+            index.setdefault(row_email, row)
+
+    updated = []
+    missing = []
+    for update in updates:
+        email = (update.get('email') or '').strip().lower()
+        if not email:
+            continue
+        row = index.get(email)
+        if row is None:
+            missing.append(email)
+            continue
+        for field in ['answered', 'status', 'notes']:
+            value = (update.get(field) or '').strip()
+            if value:
+                row[field] = value
+        updated.append(email)
+
+    if updated:
+        write_csv_rows(csv_path, rows, dialect, fieldnames)
+    return updated, missing
+
+def load_updates(path, default_answered='yes'):
+    """Read updates from a .jsonl file or a CSV with email/answered/status/notes columns"""
+    updates = []
+    if path.lower().endswith(('.jsonl', '.ndjson')):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    updates.append(json.loads(line))
+    else:
+        rows, _, _ = read_csv_rows_with_dialect(path)
+        updates = rows
+    for update in updates:
+        if not (update.get('answered') or '').strip():
+            update['answered'] = default_answered
+    return updates
+
+def batch_mark(csv_path, updates_file):
+    """Apply per-row status/notes from a CSV or JSONL file in a single write"""
+    updates = load_updates(updates_file)
+    updated, missing = bulk_update(csv_path, updates)
+    for email in missing:
+        print(f"❌ Email not found: {email}")
+    print(f"💾 Saved to {csv_path}")
+    print(f"\n🎯 Updated {len(updated)}/{len(updates)} contacts")
+
 def bulk_mark_not_interested(csv_path, email_list_file):
     """Mark multiple emails as not interested from a file (one email per line)"""
     with open(email_list_file, 'r') as f:
         emails = [line.strip() for line in f if line.strip()]
-    
-    count = 0
-    for email in emails:
-        if mark_answered(csv_path, email, answered='yes', status='not_interested'):
-            count += 1
-    
-    print(f"\n🎯 Marked {count}/{len(emails)} contacts as not interested")
+
+    updates = [{'email': email, 'answered': 'yes', 'status': 'not_interested'} for email in emails]
+    updated, missing = bulk_update(csv_path, updates)
+    for email in missing:
+        print(f"❌ Email not found: {email}")
+
+    print(f"\n🎯 Marked {len(updated)}/{len(emails)} contacts as not interested")
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('mark_answered', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     import argparse
     
     parser = argparse.ArgumentParser(description='Mark contacts as answered or update status')
@@ -91,6 +138,10 @@ if __name__ == "__main__":
     # Bulk command
     bulk_parser = subparsers.add_parser('bulk', help='Mark multiple emails from file')
     bulk_parser.add_argument('email_list', help='File with emails (one per line)')
+
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Apply per-row answered/status/notes from a CSV or JSONL file')
+    batch_parser.add_argument('updates_file', help='CSV (email;answered;status;notes) or .jsonl file')
     
     args = parser.parse_args()
     
@@ -98,8 +149,24 @@ if __name__ == "__main__":
         print(f"❌ Error: File not found: {args.csv_file}")
         sys.exit(1)
     
-    if args.command == 'single':
-        mark_answered(args.csv_file, args.email, args.answered, args.status, args.notes)
+    if args.command in ('single', 'batch'):
+        # Thin client when campaign_daemon.py is running: no CSV parse/rewrite here
+        from campaign_daemon import daemon_request
+
+        if args.command == 'single':
+            updates = [{'email': args.email, 'answered': args.answered, 'status': args.status, 'notes': args.notes}]
+        else:
+            updates = load_updates(args.updates_file)
+        response = daemon_request('mark', csv_path=args.csv_file, updates=updates)
+        if response is not None and 'updated' in response:
+            for email in response['updated']:
+                print(f"✅ Updated {email} (via campaign daemon)")
+            for email in response['missing']:
+                print(f"❌ Email not found: {email}")
+        elif args.command == 'single':
+            mark_answered(args.csv_file, args.email, args.answered, args.status, args.notes)
+        else:
+            batch_mark(args.csv_file, args.updates_file)
     elif args.command == 'bulk':
         bulk_mark_not_interested(args.csv_file, args.email_list)
     else:
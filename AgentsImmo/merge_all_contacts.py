@@ -8,21 +8,9 @@ import csv
 import os
 from datetime import datetime
 from collections import defaultdict
+import _paths  # repo root on sys.path, for lemlist_core
 
-def read_csv_rows_with_dialect(csv_path):
-    """Read CSV and auto-detect delimiter"""
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        sample = f.read(4096)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames or [])
-        return rows, dialect, fieldnames
+from lemlist_core.csv_io import read_csv_rows_with_dialect
 
 def extract_contact_from_row(row):
     """Extract contact info from a CSV row (handles different column name variations)"""
@@ -162,7 +150,10 @@ def merge_all_contacts(master_path, source_dir, output_path):
     print(f"🎯 Ready to use with check_responses.py and campaign_manager.py")
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+
     script_dir = os.path.dirname(os.path.abspath(__file__))
+    start_profiling('merge_all_contacts', output_dir=script_dir)  # --profile / PROFILE=1
     master_path = os.path.join(script_dir, 'master_contacts_tracking.csv')
     source_dir = os.path.join(script_dir, 'already_contacted_immo')
     output_path = os.path.join(script_dir, 'master_contacts_tracking.csv')  # Overwrite master
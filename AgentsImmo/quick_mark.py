@@ -6,6 +6,10 @@ Usage: python quick_mark.py
 import os
 import sys
 
+import _paths  # repo root on sys.path, for lemlist_core
+from campaign_daemon import daemon_request
+from mark_answered import mark_answered
+
 def mark_response():
     csv_path = "master_contacts_tracking.csv"
     if not os.path.exists(csv_path):
@@ -26,14 +30,19 @@ def mark_response():
         status = input("Status (responded/not_interested/qualified) [responded]: ").strip() or "responded"
         notes = input("Notes (optional): ").strip()
 
-        # Build command
-        cmd = f"python mark_answered.py {csv_path} single {email} --status {status}"
-        if notes:
-            cmd += f' --notes "{notes}"'
-
-        print(f"\n🔧 Running: {cmd}")
-        os.system(cmd)
+        # Resident daemon if running, otherwise update the CSV in this process
+        response = daemon_request('mark', csv_path=csv_path, email=email, answered='yes', status=status, notes=notes)
+        if response is not None and 'updated' in response:
+            if response['updated']:
+                print(f"✅ Updated {email.strip().lower()} (via campaign daemon)")
+            else:
+                print(f"❌ Email not found: {email}")
+        else:
+            mark_answered(csv_path, email, answered='yes', status=status, notes=notes or None)
         print()
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('quick_mark', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     mark_response()
@@ -1,33 +1,43 @@
-import smtplib, ssl, csv, time, os, sys, logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-from jinja2 import Template
+import os, sys, logging
+import _paths  # repo root on sys.path, for lemlist_core
+from lemlist_core.env import load_env as load_campaign_env
+from lemlist_core.csv_io import read_csv_rows_with_dialect as _read_csv_rows, write_csv_rows, load_exclusion_set
+from lemlist_core.logs import setup_logging, SkipCounter
+from lemlist_core.dkim_signing import presign
+from lemlist_core.mailer import send_email, prepare_email, send_prepared
+from lemlist_core.progress import format_progress
+from lemlist_core.rate import AIMDRate
+from lemlist_core.scoring import prioritize
+from lemlist_core.scheduling import build_queues, CompanyCap, company_key, recipient_domain
+from lemlist_core.sender import RetryQueue, run_send_loop, PERMANENT
+from lemlist_core.status import start_status_server
+from lemlist_core.templates import load_template
+from lemlist_core.timezones import contact_timezone
+from thread_index import record_outbound
+from bounces import add_to_suppression_list, DEFAULT_SUPPRESSION_PATH as SUPPRESSION_LIST_PATH
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
+setup_logging(os.path.dirname(os.path.abspath(__file__)))
+
+# Detail line for a sampled skipped row, per reason (see lemlist_core.logs.SkipCounter)
+SKIP_MESSAGES = {
+    'no_email': "Ligne sans email: saut de l'envoi",
+    'excluded': "Email dans la liste exclue: {email}, saut",
+    'already_sent': "Déjà marqué envoyé (sent/status=yes): {email}, saut",
+    'company_cap': "Plafond de {limit} contacts atteint pour {company}: {email}, saut",
+    'score': "Écarté par le score ({cause}): {email}, saut",
+}
 
 def load_env():
-    load_dotenv()
-    parent_env = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-    if os.path.exists(parent_env):
-        load_dotenv(parent_env)
-    return {
-        "SMTP_HOST": os.getenv("SMTP_HOST"),
-        "SMTP_PORT": int(os.getenv("SMTP_PORT", 587)),
-        "SMTP_USER": os.getenv("SMTP_USER"),
-        "SMTP_PASS": os.getenv("SMTP_PASS"),
-        "SENDER_NAME": os.getenv("SENDER_NAME", os.getenv("SMTP_USER")),
-        "REPLY_TO": os.getenv("REPLY_TO", os.getenv("SMTP_USER")),
-        "SMTP_USE_SSL": os.getenv("SMTP_USE_SSL", "false").lower() in ("1", "true", "yes"),
-        "SMTP_ALLOW_INSECURE_TLS": os.getenv("SMTP_ALLOW_INSECURE_TLS", "false").lower() in ("1", "true", "yes"),
-        "SMTP_DEBUG": os.getenv("SMTP_DEBUG", "false").lower() in ("1", "true", "yes"),
-        "EMAIL_SUBJECT": os.getenv("EMAIL_SUBJECT", "École Polytechnique - Projet de logiciel pour agences immobilières"),
-        "VIDEO_URL": os.getenv("VIDEO_URL", "https://www.youtube.com/watch?v=eS6VZm7rzeM"),
-        "BCC_EMAIL": os.getenv("BCC_EMAIL", "valentin.henry-leo@polytechnique.edu"),
-    }
+    return load_campaign_env(
+        os.path.dirname(os.path.abspath(__file__)),
+        EMAIL_SUBJECT="École Polytechnique - Projet de logiciel pour agences immobilières",
+        VIDEO_URL="https://www.youtube.com/watch?v=eS6VZm7rzeM",
+        BCC_EMAIL="valentin.henry-leo@polytechnique.edu",
+        CAMPAIGN_NAME="AgentsImmo",
+    )
+
+def read_csv_rows_with_dialect(csv_path):
+    return _read_csv_rows(csv_path, normalize_headers=True)
 
 def load_recipients(csv_path):
     rows, _, _ = read_csv_rows_with_dialect(csv_path)
@@ -61,148 +71,18 @@ def load_recipients(csv_path):
 def load_recipients_list(csv_path):
     return list(load_recipients(csv_path))
 
-def format_progress(current: int, total: int, width: int = 30) -> str:
-    if total <= 0:
-        return "[" + ("-" * width) + "] 0/0 (0%)"
-    filled = int(width * current / total)
-    if filled > width:
-        filled = width
-    bar = "#" * filled + "-" * (width - filled)
-    percent = int((current / total) * 100)
-    return f"[{bar}] {current}/{total} ({percent}%)"
-
-def read_csv_rows_with_dialect(csv_path):
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        sample = f.read(4096)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames or [])
-
-        # Ensure normalized keys exist when Apollo-style headers are present
-        renamed = False
-        if 'email' not in fieldnames and 'Email' in fieldnames:
-            fieldnames.append('email'); renamed = True
-        if 'first_name' not in fieldnames and 'First Name' in fieldnames:
-            fieldnames.append('first_name'); renamed = True
-        if 'last_name' not in fieldnames and 'Last Name' in fieldnames:
-            fieldnames.append('last_name'); renamed = True
-        if 'company_name' not in fieldnames and 'Company Name' in fieldnames:
-            fieldnames.append('company_name'); renamed = True
-        if renamed:
-            for r in rows:
-                if 'email' not in r and 'Email' in r:
-                    r['email'] = (r.get('Email') or '').strip()
-                if 'first_name' not in r and ('First Name' in r or 'firstName' in r):
-                    r['first_name'] = (r.get('First Name') or r.get('firstName') or '').strip()
-                if 'last_name' not in r and ('Last Name' in r or 'lastName' in r):
-                    r['last_name'] = (r.get('Last Name') or r.get('lastName') or '').strip()
-                if 'company_name' not in r and ('Company Name' in r or 'companyName' in r):
-                    r['company_name'] = (r.get('Company Name') or r.get('companyName') or '').strip()
-        return rows, dialect, fieldnames
-
-def write_csv_rows(csv_path, rows, dialect, fieldnames):
-    delimiter = getattr(dialect, 'delimiter', ';')
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=delimiter)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-
-def load_exclusion_set(path):
-    excluded = set()
-    if not path or not os.path.exists(path):
-        return excluded
-    def add_from_csv(csv_file):
-        try:
-            rows, _, _ = read_csv_rows_with_dialect(csv_file)
-        except Exception:
-            return
-        for row in rows:
-            email = (row.get('email') or '').strip().lower()
-            if email:
-                excluded.add(email)
-    if os.path.isdir(path):
-        for root, _, files in os.walk(path):
-            for name in files:
-                if name.lower().endswith('.csv'):
-                    add_from_csv(os.path.join(root, name))
-    else:
-        add_from_csv(path)
-    return excluded
-
-def send_email(smtp_cfg, subject, html_body, recipient):
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = f"{smtp_cfg['SENDER_NAME']} <{smtp_cfg['SMTP_USER']}>"
-    msg["To"] = recipient["email"]
-    msg["Reply-To"] = smtp_cfg["REPLY_TO"]
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-    to_addrs = [recipient["email"]]
-    bcc = (smtp_cfg.get("BCC_EMAIL") or "").strip()
-    if bcc:
-        to_addrs.append(bcc)
-
-    # ✅ Crée un contexte SSL propre
-    try:
-        # Si tu as un fichier certif local (exporté via openssl)
-        cert_path = os.getenv("SMTP_CA_CERT", "zimbra_cert.pem")
-        if os.path.exists(cert_path):
-            context = ssl.create_default_context(cafile=cert_path)
-            logging.info(f"Utilisation du certificat local : {cert_path}")
-        else:
-            context = ssl.create_default_context()
-    except Exception as e:
-        logging.warning(f"Impossible de charger le certificat local : {e}")
-        context = ssl.create_default_context()
-
-    # ✅ Si on autorise les connexions "faibles" (auto-signées)
-    if smtp_cfg.get("SMTP_ALLOW_INSECURE_TLS"):
-        logging.warning("⚠️ TLS non vérifié activé : certificat auto-signé accepté")
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-
-    try:
-        if smtp_cfg.get("SMTP_USE_SSL") or smtp_cfg.get("SMTP_PORT") == 465:
-            with smtplib.SMTP_SSL(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"], context=context) as server:
-                if smtp_cfg.get("SMTP_DEBUG"):
-                    server.set_debuglevel(1)
-                server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-                server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
-        else:
-            with smtplib.SMTP(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"]) as server:
-                if smtp_cfg.get("SMTP_DEBUG"):
-                    server.set_debuglevel(1)
-                server.starttls(context=context)
-                server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-                server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
-    except ssl.SSLError as ssl_err:
-        logging.error(f"❌ Erreur SSL : {ssl_err}")
-        logging.warning("Tentative de reconnexion avec contexte non vérifié...")
-        insecure_context = ssl._create_unverified_context()
-        with smtplib.SMTP_SSL(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"], context=insecure_context) as server:
-            server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-            server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
-
-def read_template_html():
-    template_path = os.path.join(os.path.dirname(__file__), 'template.html')
-    with open(template_path, 'r', encoding='utf-8') as f:
-        return f.read()
+def template_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.html')
 
 def send_template_to_single(email, first_name="", last_name="", company_name=""):
     cfg = load_env()
     subject = cfg["EMAIL_SUBJECT"]
-    tpl = Template(read_template_html())
+    tpl = load_template(template_path())
     if not (email or "").strip():
         logging.warning("Skip send: empty email provided to send_template_to_single")
         return
-    html_body = tpl.render(first_name=first_name, last_name=last_name, company_name=company_name, video_url=cfg["VIDEO_URL"])
+    html_body = tpl.render(email=email, first_name=first_name, last_name=last_name, company_name=company_name,
+                           stage='initial', video_url=cfg["VIDEO_URL"])
     recipient = {"email": email, "first_name": first_name, "last_name": last_name, "company_name": company_name}
     send_email(cfg, subject, html_body, recipient)
 
@@ -220,29 +100,39 @@ def send_first_from_csv(csv_path):
         return email, r.get('first_name', '')
     raise RuntimeError('No valid recipient row found in CSV')
 
-def main(csv_path, exclude_csv=None):
+def main(csv_path, exclude_csv=None, adaptive=False, max_per_company=None, delay_seconds=150):
     cfg = load_env()
     subject = cfg["EMAIL_SUBJECT"]
-    tpl = Template(read_template_html())
+    tpl = load_template(template_path())
 
     rows, dialect, fieldnames = read_csv_rows_with_dialect(csv_path)
     if 'sent' not in fieldnames:
         fieldnames.append('sent')
 
     excluded = load_exclusion_set(exclude_csv)
+    # Hard bounces (bounces.py) and addresses the server rejected (5xx)
+    excluded |= load_exclusion_set(SUPPRESSION_LIST_PATH)
+
+    # Per-company cap for this stage, counting contacts already reached
+    cap = CompanyCap(cfg["MAX_PER_COMPANY"] if max_per_company is None else max_per_company)
+    for row in rows:
+        if (row.get('sent') or '').strip().lower() == 'yes':
+            cap.count(row)
 
     total = len(rows)
+    jobs = []
+    skips = SkipCounter('initial', total, SKIP_MESSAGES)
     for i, row in enumerate(rows, 1):
         email_value = (row.get('email') or '').strip()
         if not email_value:
-            logging.warning(f"{format_progress(i, total)} Ligne sans email: saut de l'envoi")
+            skips.skip('no_email', i, '')
             continue
         if email_value.lower() in excluded:
-            logging.info(f"{format_progress(i, total)} Email dans la liste exclue: {email_value}, saut")
+            skips.skip('excluded', i, email_value)
             continue
         # Skip if already marked
         if (row.get('sent') or '').strip().lower() == 'yes' or (row.get('status') or '').strip().lower() == 'yes':
-            logging.info(f"{format_progress(i, total)} Déjà marqué envoyé (sent/status=yes): {email_value}, saut")
+            skips.skip('already_sent', i, email_value)
             continue
 
         r = {
@@ -251,18 +141,57 @@ def main(csv_path, exclude_csv=None):
             'last_name': (row.get('last_name') or row.get('lastName') or '').strip(),
             'company_name': (row.get('company_name') or row.get('companyName') or '').strip(),
         }
-        html_body = tpl.render(**r, video_url=cfg["VIDEO_URL"])
+        if not cap.allow(row):
+            skips.skip('company_cap', i, email_value, limit=cap.limit, company=company_key(row))
+            continue
+        skips.seen(i)
+        jobs.append({'index': i, 'email': email_value, 'domain': recipient_domain(email_value),
+                     'tz': contact_timezone(row, cfg["DEFAULT_TIMEZONE"]), 'row': row, 'recipient': r})
+    # Best leads first (then spread over domains and local send windows below)
+    jobs = prioritize(jobs, skips, cfg["SKIP_UNVERIFIED"])
+    skips.summary(final=True)
+
+    def build_email(job):
+        return prepare_email(cfg, subject, tpl.render(**job['recipient'], stage='initial', video_url=cfg["VIDEO_URL"]), job['recipient'])
+
+    def send_one(job):
+        if presigned is not None:
+            return send_prepared(cfg, presigned.get(job))
+        html_body = tpl.render(**job['recipient'], stage='initial', video_url=cfg["VIDEO_URL"])
+        return send_email(cfg, subject, html_body, job['recipient'])
+
+    def on_sent(job, message_id):
+        r = job['recipient']
+        job['row']['sent'] = 'yes'
+        write_csv_rows(csv_path, rows, dialect, fieldnames)
+        # After the CSV: a failing index write must not lead to a second send next run
         try:
-            send_email(cfg, subject, html_body, r)
-            row['sent'] = 'yes'
-            write_csv_rows(csv_path, rows, dialect, fieldnames)
-            logging.info(f"{format_progress(i, total)} Envoyé à {r['email']} ({r.get('first_name','')} {r.get('last_name','')})")
+            record_outbound(message_id, r['email'], cfg["CAMPAIGN_NAME"], 'initial')
         except Exception as e:
-            logging.error(f"[{i}] Erreur pour {email_value}: {e}")
-        logging.info("Pause 2m30s avant le prochain…")
-        time.sleep(150)
+            logging.error(f"❌ Index des messages envoyés non mis à jour pour {r['email']} ({message_id}) : {e}")
+        logging.info(f"{format_progress(job['index'], total)} Envoyé à {r['email']} ({r.get('first_name','')} {r.get('last_name','')})")
+
+    def on_failed(job, kind, code, message):
+        logging.error(f"[{job['index']}] Erreur pour {job['email']}: {f'{code} ' if code else ''}{message}")
+        if kind == PERMANENT:
+            # Address refused by the server (5xx at RCPT): never retried, also excluded from later runs
+            job['row']['sent'] = 'failed'
+            write_csv_rows(csv_path, rows, dialect, fieldnames)
+            add_to_suppression_list({job['email'].lower(): str(code)}, 'smtp_rejected', SUPPRESSION_LIST_PATH)
+
+    # DKIM on: every message built now and signed in background batches, best leads first
+    presigned = presign(cfg, jobs, build_email)
+    queues = build_queues(jobs, cfg)
+    status = start_status_server(cfg, cfg["CAMPAIGN_NAME"], 'initial', len(jobs), delay_seconds)
+    counts = run_send_loop(queues, send_one, delay_seconds, on_sent, on_failed, RetryQueue.from_config(cfg),
+                           rate=AIMDRate.from_config(cfg, delay_seconds) if adaptive else None, status=status)
+    logging.info(f"🎯 {counts['sent']} envoyés, {counts['permanent']} adresses refusées, {counts['rejected']} messages "
+                 f"refusés (relancés au prochain passage), {counts['gave_up']} abandonnés après {cfg['RETRY_MAX_ATTEMPTS']} essais")
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('script', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     if len(sys.argv) >= 2 and sys.argv[1] == "--send-test":
         to_email = ""
         if len(sys.argv) >= 3:
@@ -316,6 +245,8 @@ if __name__ == "__main__":
 
     # Support optional exclusion list: --exclude-csv <path>
     exclude_csv = None
+    adaptive = False
+    max_per_company = None
     args = [a for a in sys.argv[1:] if a]
     if len(args) >= 1 and args[0] not in ("--send-test", "--send-template", "--send-first-from-csv"):
         csv_pos = args[0]
@@ -324,12 +255,18 @@ if __name__ == "__main__":
             if args[i] == "--exclude-csv" and i + 1 < len(args):
                 exclude_csv = args[i+1]
                 i += 2
+            elif args[i] == "--adaptive":
+                adaptive = True
+                i += 1
+            elif args[i] == "--max-per-company" and i + 1 < len(args):
+                max_per_company = int(args[i+1])
+                i += 2
             else:
                 i += 1
-        main(csv_pos, exclude_csv=exclude_csv)
+        main(csv_pos, exclude_csv=exclude_csv, adaptive=adaptive, max_per_company=max_per_company)
         sys.exit(0)
 
-    print("Usage: python script.py AgentsImmo.csv [--exclude-csv already_sent.csv]\n"
+    print("Usage: python script.py AgentsImmo.csv [--exclude-csv already_sent.csv] [--adaptive] [--max-per-company N]\n"
           "       python script.py --send-test <email>\n"
           "       python script.py --send-template <email> [first_name]\n"
           "       python script.py --send-first-from-csv <file.csv>")
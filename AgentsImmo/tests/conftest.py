@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The campaign modules are flat scripts imported by name (bounces, imap_sync, ...)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
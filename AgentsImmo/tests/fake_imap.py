@@ -0,0 +1,115 @@
+"""
+Minimal IMAP4rev1 server on localhost for tests driving a real imaplib client
+One connection, one thread. SELECT answers with EXISTS/UIDVALIDITY/UIDNEXT
+from the mailbox; each NOOP sends the next list of `noop_updates` (nothing
+once exhausted); IDLE pushes `idle_updates` right away, or nothing until DONE.
+UID SEARCH returns every UID above the range start, UID FETCH returns the raw
+messages of the requested set. Commands are logged in `commands`.
+"""
+import imaplib
+import re
+import socket
+import threading
+
+class FakeIMAPServer:
+    def __init__(self, messages=None, capabilities=('IMAP4rev1', 'IDLE'), uidvalidity=42,
+                 noop_updates=(), idle_updates=()):
+        self.messages = dict(messages or {})  # uid -> raw bytes
+        self.capabilities = capabilities
+        self.uidvalidity = uidvalidity
+        self.noop_updates = list(noop_updates)
+        self.idle_updates = list(idle_updates)
+        self.commands = []
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def connect(self):
+        mail = imaplib.IMAP4('127.0.0.1', self.port)
+        mail.login('user', 'pass')
+        return mail
+
+    def _serve(self):
+        conn, _ = self.listener.accept()
+        self.file = conn.makefile('rwb', buffering=0)
+        self._write('* OK fake IMAP ready')
+        try:
+            while True:
+                line = self.file.readline()
+                if not line:
+                    return
+                tag, command, *rest = line.decode().rstrip('\r\n').split(' ', 2)
+                self.commands.append(' '.join([command.upper()] + rest))
+                if not getattr(self, f"_{command.lower()}", self._unknown)(tag, rest[0] if rest else ''):
+                    return
+        finally:
+            conn.close()
+            self.listener.close()
+
+    def _write(self, line):
+        self.file.write(line.encode() + b'\r\n')
+
+    def _unknown(self, tag, args):
+        self._write(f"{tag} BAD unknown command")
+        return True
+
+    def _capability(self, tag, args):
+        self._write(f"* CAPABILITY {' '.join(self.capabilities)}")
+        self._write(f"{tag} OK done")
+        return True
+
+    def _login(self, tag, args):
+        self._write(f"{tag} OK logged in")
+        return True
+
+    def _select(self, tag, args):
+        uids = sorted(self.messages)
+        self._write(f"* {len(uids)} EXISTS")
+        self._write("* 0 RECENT")
+        self._write(f"* OK [UIDVALIDITY {self.uidvalidity}] ok")
+        self._write(f"* OK [UIDNEXT {(uids[-1] if uids else 0) + 1}] ok")
+        self._write(f"{tag} OK [READ-WRITE] selected")
+        return True
+
+    def _noop(self, tag, args):
+        for update in (self.noop_updates.pop(0) if self.noop_updates else []):
+            self._write(f"* {update}")
+        self._write(f"{tag} OK noop")
+        return True
+
+    def _idle(self, tag, args):
+        self._write('+ idling')
+        for update in self.idle_updates:
+            self._write(f"* {update}")
+        assert self.file.readline().rstrip(b'\r\n') == b'DONE'
+        self._write(f"{tag} OK IDLE terminated")
+        return True
+
+    def _uid(self, tag, args):
+        command, _, rest = args.partition(' ')
+        if command.upper() == 'SEARCH':
+            first = int(re.match(r'UID (\d+):\*', rest).group(1))
+            found = [uid for uid in sorted(self.messages) if uid >= first]
+            self._write(f"* SEARCH {' '.join(map(str, found))}".rstrip())
+        elif command.upper() == 'FETCH':
+            uid_set, _, items = rest.partition(' ')
+            for uid in self._expand(uid_set):
+                if uid in self.messages:
+                    raw = self.messages[uid]
+                    self.file.write(f"* {uid} FETCH (UID {uid} BODY[] {{{len(raw)}}}\r\n".encode() + raw + b')\r\n')
+        self._write(f"{tag} OK {command} done")
+        return True
+
+    def _logout(self, tag, args):
+        self._write('* BYE logging out')
+        self._write(f"{tag} OK bye")
+        return False
+
+    def _expand(self, uid_set):
+        uids = []
+        for part in uid_set.split(','):
+            first, _, last = part.partition(':')
+            uids.extend(range(int(first), int(last or first) + 1))
+        return uids
@@ -0,0 +1,102 @@
+import csv
+
+from bounces import is_permanent_failure, load_suppressed, parse_dsn, scan_bounces, suppress_bounced
+from fake_imap import FakeIMAPServer
+
+def dsn(*recipients, subject='Undelivered Mail Returned to Sender'):
+    """Raw RFC 3464 bounce, one (recipient, action, status, diagnostic) per failed address"""
+    per_recipient = '\r\n'.join(
+        f"Final-Recipient: rfc822; {recipient}\r\nAction: {action}\r\nStatus: {status}\r\n"
+        f"Diagnostic-Code: smtp; {diagnostic}\r\n"
+        for recipient, action, status, diagnostic in recipients
+    )
+    return (
+        "From: MAILER-DAEMON@mx.example\r\n"
+        f"Subject: {subject}\r\n"
+        "MIME-Version: 1.0\r\n"
+        'Content-Type: multipart/report; report-type=delivery-status; boundary="B"\r\n'
+        "\r\n"
+        "--B\r\n"
+        "Content-Type: text/plain\r\n"
+        "\r\n"
+        "Delivery failed.\r\n"
+        "--B\r\n"
+        "Content-Type: message/delivery-status\r\n"
+        "\r\n"
+        "Reporting-MTA: dns; mx.example\r\n"
+        "\r\n"
+        f"{per_recipient}"
+        "--B--\r\n"
+    ).encode('utf-8')
+
+def test_parse_dsn_reads_every_failed_recipient():
+    raw = dsn(('Agent@Agence.FR', 'failed', '5.1.1', '550 5.1.1 <agent@agence.fr>: User unknown'),
+              ('full@boite.fr', 'delayed', '4.2.2', '452 4.2.2 Mailbox full'))
+    failures = parse_dsn(raw)
+    assert [failure['email'] for failure in failures] == ['agent@agence.fr', 'full@boite.fr']
+    assert failures[0] == {'email': 'agent@agence.fr', 'status': '5.1.1', 'action': 'failed',
+                           'diagnostic': '550 5.1.1 <agent@agence.fr>: User unknown'}
+    assert failures[1]['status'] == '4.2.2'
+    assert failures[1]['action'] == 'delayed'
+
+def test_parse_dsn_extracts_status_code_from_text():
+    failures = parse_dsn(dsn(('a@b.fr', 'failed', '5.7.1 (delivery not authorized)', 'blocked')))
+    assert failures[0]['status'] == '5.7.1'
+
+def test_parse_dsn_exim_style_bounce():
+    raw = (b"From: Mail Delivery System <Mailer-Daemon@mx.example>\r\n"
+           b"Subject: Mail delivery failed: returning message to sender (5.1.1)\r\n"
+           b"X-Failed-Recipients: one@a.fr, Two@B.fr\r\n"
+           b"\r\n"
+           b"This message was created automatically by mail delivery software.\r\n")
+    failures = parse_dsn(raw)
+    assert [failure['email'] for failure in failures] == ['one@a.fr', 'two@b.fr']
+    assert all(failure['status'] == '5.1.1' and failure['action'] == 'failed' for failure in failures)
+
+def test_parse_dsn_ignores_ordinary_mail():
+    raw = b"From: someone@agence.fr\r\nSubject: Re: Projet\r\n\r\nMerci, rappelez-moi.\r\n"
+    assert parse_dsn(raw) == []
+
+def test_is_permanent_failure():
+    assert is_permanent_failure({'status': '5.1.1', 'action': 'failed'})
+    assert not is_permanent_failure({'status': '4.2.2', 'action': 'delayed'})
+    # A transient status wins over a 'failed' action
+    assert not is_permanent_failure({'status': '4.4.7', 'action': 'failed'})
+    # No status at all: the action decides
+    assert is_permanent_failure({'status': '', 'action': 'failed'})
+    assert not is_permanent_failure({'status': '', 'action': 'delayed'})
+
+def test_scan_then_suppress_hands_off_hard_bounces(tmp_path):
+    cfg = {'FETCH_BATCH_SIZE': 300, 'SYNC_STATE_PATH': str(tmp_path / 'imap_sync_state.json')}
+    messages = {
+        1: dsn(('dead@agence.fr', 'failed', '5.1.1', '550 User unknown')),
+        2: b"From: agent@agence.fr\r\nSubject: Re: Projet\r\n\r\nMerci\r\n",
+        3: dsn(('full@agence.fr', 'delayed', '4.2.2', '452 Mailbox full')),
+    }
+    server = FakeIMAPServer(messages=messages)
+    mail = server.connect()
+    failures = scan_bounces(mail, cfg)
+    mail.logout()
+    assert sorted(failure['email'] for failure in failures) == ['dead@agence.fr', 'full@agence.fr']
+
+    csv_path = tmp_path / 'contacts.csv'
+    csv_path.write_text("email;status;nudge1_date\nDead@Agence.fr;sent;2026-01-05\n"
+                        "full@agence.fr;sent;\nagent@agence.fr;answered;\n", encoding='utf-8')
+    suppression_path = str(tmp_path / 'suppression_list.csv')
+    assert suppress_bounced(str(csv_path), failures, suppression_path) == ['dead@agence.fr']
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = {row['email']: row for row in csv.DictReader(f, delimiter=';')}
+    assert rows['Dead@Agence.fr']['status'] == 'bounced'
+    assert rows['Dead@Agence.fr']['notes'].startswith('Hard bounce 5.1.1')
+    assert rows['Dead@Agence.fr']['nudge1_date'] == '2026-01-05'
+    assert rows['full@agence.fr']['status'] == 'sent'
+    assert load_suppressed(suppression_path) == {'dead@agence.fr'}
+    # Already suppressed: not listed twice
+    assert suppress_bounced(str(csv_path), failures, suppression_path) == []
+
+    # The UID watermark moved past the scanned bounces
+    server = FakeIMAPServer(messages=messages)
+    mail = server.connect()
+    assert scan_bounces(mail, cfg) == []
+    mail.logout()
+    assert not any(command.startswith('UID') for command in server.commands)
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import campaign_daemon
+from campaign_daemon import ContactStore, daemon_request, remove_from_queue, save_queue, load_queue, update_contacts
+from lemlist_core.csv_io import read_csv_rows_with_dialect, write_csv_rows
+
+class Semicolon:
+    delimiter = ';'
+
+def write_master(path):
+    rows = [{'email': 'a@x.fr', 'answered': 'no', 'status': 'contacted', 'notes': ''},
+            {'email': 'b@y.fr', 'answered': 'no', 'status': 'contacted', 'notes': ''}]
+    write_csv_rows(str(path), rows, Semicolon(), ['email', 'answered', 'status', 'notes'])
+
+def contacts(path):
+    rows, _, _ = read_csv_rows_with_dialect(str(path))
+    return {row['email']: row for row in rows}
+
+def start_daemon(csv_path, socket_path):
+    threading.Thread(target=campaign_daemon.serve, args=(str(csv_path), socket_path), daemon=True).start()
+    for _ in range(100):
+        if daemon_request('stats', socket_path=socket_path) is not None:
+            return
+        time.sleep(0.02)
+    raise RuntimeError('daemon did not start')
+
+def test_update_op_adds_columns_and_keeps_marks(tmp_path):
+    csv_path = tmp_path / 'master.csv'
+    write_master(csv_path)
+    store = ContactStore(str(csv_path))
+    assert store.handle({'op': 'mark', 'email': 'b@y.fr', 'answered': 'yes', 'status': 'responded'})['ok']
+    response = store.handle({'op': 'update', 'updates': [
+        {'email': 'A@x.fr', 'fields': {'nudge1_date': '2026-01-05', 'status': 'nudge1_sent'}},
+        {'email': 'ghost@z.fr', 'fields': {'status': 'x'}}]})
+    assert response == {'ok': False, 'updated': ['a@x.fr'], 'missing': ['ghost@z.fr']}
+    saved = contacts(csv_path)
+    assert saved['a@x.fr']['nudge1_date'] == '2026-01-05'
+    assert (saved['b@y.fr']['answered'], saved['b@y.fr']['status']) == ('yes', 'responded')
+
+def test_campaign_and_marks_share_one_writer(tmp_path):
+    csv_path = tmp_path / 'master.csv'
+    socket_path = str(tmp_path / 'daemon.sock')
+    write_master(csv_path)
+    start_daemon(csv_path, socket_path)
+    # A reply marked through the daemon, then the campaign records a send
+    response = daemon_request('mark', socket_path=socket_path, csv_path=str(csv_path),
+                              updates=[{'email': 'b@y.fr', 'answered': 'yes', 'status': 'responded'}])
+    assert response['updated'] == ['b@y.fr']
+    assert update_contacts(str(csv_path), {'a@x.fr': {'nudge1_date': '2026-01-05'}}, socket_path=socket_path) == (['a@x.fr'], [])
+    saved = contacts(csv_path)
+    assert saved['a@x.fr']['nudge1_date'] == '2026-01-05'
+    assert saved['b@y.fr']['answered'] == 'yes'
+
+def test_update_contacts_without_daemon_merges_into_the_file(tmp_path):
+    csv_path = tmp_path / 'master.csv'
+    write_master(csv_path)
+    updated = update_contacts(str(csv_path), {'b@y.fr': {'status': 'send_failed'}},
+                              socket_path=str(tmp_path / 'none.sock'))
+    assert updated == (['b@y.fr'], [])
+    assert contacts(csv_path)['b@y.fr']['status'] == 'send_failed'
+
+def test_remove_from_queue_drops_only_handled_entries(tmp_path):
+    path = str(tmp_path / 'queue.jsonl')
+    save_queue([{'email': 'a@x.fr', 'stage': 'nudge1'}, {'email': 'b@y.fr', 'stage': 'nudge1'},
+                {'email': 'a@x.fr', 'stage': 'nudge2'}], path)
+    assert remove_from_queue('nudge1', ['A@x.fr'], path) == 1
+    assert load_queue(path) == [{'email': 'b@y.fr', 'stage': 'nudge1'}, {'email': 'a@x.fr', 'stage': 'nudge2'}]
+    assert not os.path.exists(path + '.tmp')
@@ -0,0 +1,59 @@
+import email.utils
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from check_responses import sync_responses
+from fake_imap import FakeIMAPServer
+
+def reply(sender, days_ago, subject='Re: Ecole Polytechnique - Projet de logiciel pour agences immobilieres'):
+    date = email.utils.format_datetime(datetime.now(timezone.utc) - timedelta(days=days_ago))
+    return (f"From: {sender}\r\nSubject: {subject}\r\nDate: {date}\r\n\r\n"
+            "Bonjour, rappelez-moi demain.\r\n").encode('utf-8')
+
+def imap_config(tmp_path):
+    return {
+        'IMAP_USER': 'me@polytechnique.edu',
+        'FETCH_BATCH_SIZE': 300,
+        'THREAD_INDEX_PATH': str(tmp_path / 'thread_index.json'),
+        'SYNC_STATE_PATH': str(tmp_path / 'imap_sync_state.json'),
+    }
+
+def test_sync_prunes_cache_past_the_window(tmp_path):
+    cfg = imap_config(tmp_path)
+    old_date = email.utils.format_datetime(datetime.now(timezone.utc) - timedelta(days=200))
+    with open(cfg['SYNC_STATE_PATH'], 'w', encoding='utf-8') as f:
+        json.dump({'INBOX|recent': {'uidvalidity': 42, 'last_uid': 1, 'highestmodseq': None, 'messages': {
+            '1': {'sender': 'old@agence.fr', 'date': old_date, 'is_automatic': False},
+        }}}, f)
+
+    server = FakeIMAPServer(messages={1: reply('old@agence.fr', 200), 2: reply('new@agence.fr', 1)})
+    mail = server.connect()
+    responses, _, fresh = sync_responses(mail, cfg, verbose=False)
+    mail.logout()
+
+    assert [response['sender'] for response in fresh] == ['new@agence.fr']
+    assert [response['sender'] for response in responses] == ['new@agence.fr']
+    with open(cfg['SYNC_STATE_PATH'], encoding='utf-8') as f:
+        assert list(json.load(f)['INBOX|recent']['messages']) == ['2']
+
+def test_sync_leaves_state_alone_when_nothing_changed(tmp_path):
+    cfg = imap_config(tmp_path)
+    messages = {1: reply('a@agence.fr', 3)}
+    server = FakeIMAPServer(messages=messages)
+    mail = server.connect()
+    sync_responses(mail, cfg, verbose=False)
+    mail.logout()
+    written = os.stat(cfg['SYNC_STATE_PATH']).st_mtime_ns
+    os.utime(cfg['SYNC_STATE_PATH'], ns=(written - 10**9, written - 10**9))
+
+    server = FakeIMAPServer(messages=messages)
+    mail = server.connect()
+    responses, _, fresh = sync_responses(mail, cfg, verbose=False)
+    mail.logout()
+
+    assert fresh == []
+    assert [response['sender'] for response in responses] == ['a@agence.fr']
+    # UIDNEXT showed nothing new: no SEARCH, no FETCH, no rewrite
+    assert not any(command.startswith('UID') for command in server.commands)
+    assert os.stat(cfg['SYNC_STATE_PATH']).st_mtime_ns == written - 10**9
@@ -0,0 +1,34 @@
+import email
+
+from check_responses import classify_auto_headers, is_automatic_response, is_system_email, parse_campaign_headers
+
+SUBJECT = 'Re: École Polytechnique - Projet de logiciel pour agences immobilières'
+
+def headers(**fields):
+    return email.message_from_string(''.join(f"{name.replace('_', '-')}: {value}\n" for name, value in fields.items()))
+
+def test_classify_auto_headers():
+    assert classify_auto_headers(headers(Auto_Submitted='auto-replied')) == 'Auto-Submitted: auto-replied'
+    assert classify_auto_headers(headers(Auto_Submitted='no')) is None
+    assert classify_auto_headers(headers(X_Autoreply='yes')) == 'X-Autoreply header'
+    assert classify_auto_headers(headers(Precedence='bulk')) == 'Precedence: bulk'
+    assert classify_auto_headers(headers(Return_Path='<>')) == 'Null Return-Path'
+    assert classify_auto_headers(headers(Content_Type='multipart/report; report-type=delivery-status')) \
+        == 'Delivery status notification'
+    assert classify_auto_headers(headers(Subject='Re: Projet')) is None
+
+def test_subject_and_sender_patterns():
+    assert is_automatic_response('Réponse automatique : absent jusqu\'au 3')
+    assert is_automatic_response('Re: Projet', 'Je suis en congé cette semaine')
+    assert not is_automatic_response('Re: Projet', 'Merci, appelez-moi')
+    assert is_system_email('MAILER-DAEMON@mx.example')
+    assert is_system_email('')
+    assert not is_system_email('agent@agence.fr')
+
+def test_headers_classify_before_any_body_fetch():
+    raw = f"From: agent@agence.fr\r\nSubject: {SUBJECT}\r\nAuto-Submitted: auto-replied\r\n\r\n".encode()
+    assert parse_campaign_headers(raw, 'me@polytechnique.edu')['auto_reason'] == 'Auto-Submitted: auto-replied'
+    raw = f"From: agent@agence.fr\r\nSubject: {SUBJECT}\r\n\r\n".encode()
+    assert parse_campaign_headers(raw, 'me@polytechnique.edu')['auto_reason'] is None
+    raw = f"From: postmaster@agence.fr\r\nSubject: {SUBJECT}\r\n\r\n".encode()
+    assert parse_campaign_headers(raw, 'me@polytechnique.edu') is None
@@ -0,0 +1,40 @@
+from check_responses import sync_responses
+from fake_imap import FakeIMAPServer
+from imap_sync import chunk_message_set, parse_fetch_response
+
+def test_chunk_message_set_collapses_ranges():
+    nums = [b'1', b'2', b'3', b'7', b'9', b'10']
+    assert list(chunk_message_set(nums)) == [(nums, b'1:3,7,9:10')]
+    assert [uid_set for _, uid_set in chunk_message_set(nums, size=4)] == [b'1:3,7', b'9:10']
+    assert list(chunk_message_set([])) == []
+
+def test_parse_fetch_response_by_uid():
+    data = [
+        (b'1 (UID 11 BODY[HEADER] {5}', b'first'), b')',
+        (b'2 (BODY[HEADER] {6}', b'second'), b' UID 12)',
+        b'3 (FLAGS (\\Seen))',
+    ]
+    assert parse_fetch_response(data) == {b'1': b'first', b'2': b'second'}
+    assert parse_fetch_response(data, by_uid=True) == {b'11': b'first', b'12': b'second'}
+
+def test_sync_fetches_headers_in_batches(tmp_path):
+    subject = 'Re: Ecole Polytechnique - Projet de logiciel pour agences immobilieres'
+    messages = {
+        uid: f"From: agent{uid}@agence.fr\r\nSubject: {subject}\r\n\r\nBonjour\r\n".encode()
+        for uid in range(1, 8)
+    }
+    server = FakeIMAPServer(messages=messages)
+    mail = server.connect()
+    cfg = {
+        'IMAP_USER': 'me@polytechnique.edu',
+        'FETCH_BATCH_SIZE': 3,
+        'THREAD_INDEX_PATH': str(tmp_path / 'thread_index.json'),
+        'SYNC_STATE_PATH': str(tmp_path / 'imap_sync_state.json'),
+    }
+    responses, _, _ = sync_responses(mail, cfg, search_subject='Projet', verbose=False)
+    mail.logout()
+
+    assert sorted(response['sender'] for response in responses) == [f"agent{uid}@agence.fr" for uid in range(1, 8)]
+    # One FETCH per batch of 3, headers then body previews, instead of one per message
+    fetches = [command.split()[2] for command in server.commands if command.startswith('UID FETCH')]
+    assert fetches == ['1:3', '4:6', '7', '1:3', '4:6', '7']
@@ -0,0 +1,32 @@
+import csv
+import json
+
+from mark_answered import bulk_update, load_updates
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['email']: row for row in csv.DictReader(f, delimiter=';')}
+
+def test_bulk_update_one_pass(tmp_path):
+    csv_path = tmp_path / 'contacts.csv'
+    csv_path.write_text("email;answered;status\nA@agence.fr;no;sent\nb@agence.fr;no;sent\n", encoding='utf-8')
+    updated, missing = bulk_update(str(csv_path), [
+        {'email': ' a@AGENCE.fr ', 'answered': 'yes', 'status': 'qualified', 'notes': 'Rappeler lundi'},
+        {'email': 'b@agence.fr', 'answered': 'yes', 'status': ''},
+        {'email': 'absent@agence.fr', 'answered': 'yes'},
+        {'email': ''},
+    ])
+    assert updated == ['a@agence.fr', 'b@agence.fr']
+    assert missing == ['absent@agence.fr']
+    rows = read_rows(csv_path)
+    assert (rows['A@agence.fr']['status'], rows['A@agence.fr']['notes']) == ('qualified', 'Rappeler lundi')
+    # Empty values leave the column untouched
+    assert (rows['b@agence.fr']['answered'], rows['b@agence.fr']['status']) == ('yes', 'sent')
+
+def test_load_updates_csv_and_jsonl(tmp_path):
+    jsonl_path = tmp_path / 'updates.jsonl'
+    jsonl_path.write_text(json.dumps({'email': 'a@agence.fr', 'status': 'not_interested'}) + '\n\n', encoding='utf-8')
+    csv_path = tmp_path / 'updates.csv'
+    csv_path.write_text("email;answered;status\nb@agence.fr;no;qualified\n", encoding='utf-8')
+    assert load_updates(str(jsonl_path)) == [{'email': 'a@agence.fr', 'status': 'not_interested', 'answered': 'yes'}]
+    assert [(update['email'], update['answered']) for update in load_updates(str(csv_path))] == [('b@agence.fr', 'no')]
@@ -0,0 +1,28 @@
+import json
+
+from auto_mark_responses import load_results
+from check_responses import write_results_jsonl
+
+def test_results_round_trip(tmp_path):
+    path = str(tmp_path / 'response_analysis.jsonl')
+    response_details = [
+        {'email': 'Agent@Agence.fr', 'name': 'Jean Dupont', 'company': 'Agence; "du Port"',
+         'subject': 'Re: Projet', 'date': 'Mon, 5 Jan 2026 10:00:00 +0100', 'in_csv': True},
+        {'email': 'agent@agence.fr', 'name': 'Jean Dupont', 'company': 'Agence',
+         'subject': 'Re: Projet (2)', 'date': '', 'in_csv': True},
+    ]
+    new_contacts = [{'email': 'inconnu@autre.fr', 'name': 'Unknown', 'company': 'Unknown',
+                     'subject': 'Re: Projet', 'date': '', 'in_csv': False}]
+    auto_responses = [{'sender': 'absent@agence.fr', 'subject': 'Absent', 'date': '', 'auto_reason': 'Precedence: bulk'}]
+    write_results_jsonl(path, response_details, new_contacts, auto_responses)
+
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['kind'] for record in records] == ['existing_response', 'existing_response', 'new_contact', 'automatic']
+    # Separators and quotes in free-text fields survive, unlike the old text report
+    assert records[0]['company'] == 'Agence; "du Port"'
+    assert records[3] == {'kind': 'automatic', 'email': 'absent@agence.fr', 'subject': 'Absent',
+                          'date': '', 'reason': 'Precedence: bulk'}
+
+    # Automatic replies are reported, never marked
+    assert load_results(path) == (['agent@agence.fr', 'agent@agence.fr'], ['inconnu@autre.fr'])
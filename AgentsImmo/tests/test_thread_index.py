@@ -0,0 +1,35 @@
+from check_responses import parse_campaign_headers
+from lemlist_core.mailer import make_message_id
+from thread_index import load_thread_index, match_reply, record_outbound
+
+def test_record_and_match(tmp_path):
+    path = str(tmp_path / 'sent_messages_index.jsonl')
+    initial = make_message_id('me@polytechnique.edu')
+    nudge = make_message_id('me@polytechnique.edu')
+    assert initial.endswith('@polytechnique.edu>') and initial != nudge
+    record_outbound(initial, ' Agent@Agence.FR ', 'agents_immo', 'initial', path=path)
+    record_outbound(nudge, 'agent@agence.fr', 'agents_immo', 'nudge1', path=path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('not json\n\n')
+
+    index = load_thread_index(path)
+    assert set(index) == {initial, nudge}
+    assert match_reply(index, in_reply_to=initial)['stage'] == 'initial'
+    # References: the most recent known id wins
+    assert match_reply(index, references=f"{initial} <unknown@x> {nudge}")['stage'] == 'nudge1'
+    assert match_reply(index, in_reply_to='<unknown@x>') is None
+    assert match_reply({}, in_reply_to=initial) is None
+
+def test_reply_attributed_whatever_sender_and_subject(tmp_path):
+    path = str(tmp_path / 'sent_messages_index.jsonl')
+    message_id = make_message_id('me@polytechnique.edu')
+    record_outbound(message_id, 'agent@agence.fr', 'agents_immo', 'nudge2', path=path)
+    raw = (f"From: Collegue <collegue@agence.fr>\r\nSubject: votre message\r\n"
+           f"In-Reply-To: {message_id}\r\n\r\n").encode()
+
+    reply = parse_campaign_headers(raw, 'me@polytechnique.edu', load_thread_index(path))
+    assert reply['sender'] == 'agent@agence.fr'
+    assert reply['from'] == 'collegue@agence.fr'
+    assert (reply['campaign'], reply['stage']) == ('agents_immo', 'nudge2')
+    # Without the index the rewritten subject is not recognised as a campaign reply
+    assert parse_campaign_headers(raw, 'me@polytechnique.edu', {}) is None
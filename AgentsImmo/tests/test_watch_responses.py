@@ -0,0 +1,42 @@
+from fake_imap import FakeIMAPServer
+from imap_sync import select_folder
+from watch_responses import wait_for_new_mail
+
+def no_sleep(seconds):
+    pass
+
+def test_select_folder_reads_the_select_responses():
+    server = FakeIMAPServer(messages={3: b'a', 7: b'b'})
+    mail = server.connect()
+    assert select_folder(mail, 'INBOX') == {'EXISTS': 2, 'UIDVALIDITY': 42, 'UIDNEXT': 8}
+    assert not any(command.startswith('STATUS') for command in server.commands)
+    mail.logout()
+
+def test_polling_wakes_up_only_on_new_mail():
+    server = FakeIMAPServer(messages={1: b'a'}, capabilities=('IMAP4rev1',),
+                            noop_updates=[[], ['1 RECENT'], ['2 EXISTS'], []])
+    mail = server.connect()
+    select_folder(mail, 'INBOX')
+    # The SELECT's own EXISTS is not new mail, neither is a flag/RECENT update
+    assert not wait_for_new_mail(mail, False, sleep=no_sleep)
+    assert not wait_for_new_mail(mail, False, sleep=no_sleep)
+    assert wait_for_new_mail(mail, False, sleep=no_sleep)
+    assert not wait_for_new_mail(mail, False, sleep=no_sleep)
+    # A re-SELECT by the next sync does not count as new mail either
+    select_folder(mail, 'INBOX')
+    assert not wait_for_new_mail(mail, False, sleep=no_sleep)
+    mail.logout()
+
+def test_idle_wakes_up_on_pushed_exists():
+    server = FakeIMAPServer(idle_updates=['5 EXISTS'])
+    mail = server.connect()
+    select_folder(mail, 'INBOX')
+    assert wait_for_new_mail(mail, True, idle_timeout=5)
+    mail.logout()
+
+def test_idle_timeout_without_news():
+    server = FakeIMAPServer()
+    mail = server.connect()
+    select_folder(mail, 'INBOX')
+    assert not wait_for_new_mail(mail, True, idle_timeout=0.1)
+    mail.logout()
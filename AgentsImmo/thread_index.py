@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Outbound Message-ID index used to attribute replies
+Every campaign email gets a generated Message-ID (lemlist_core.mailer), appended to
+sent_messages_index.jsonl with the contact, campaign and stage. A reply is
+then attributed with a single dict lookup on its In-Reply-To/References
+headers, whatever address it comes from and whatever its subject became.
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+import _paths  # repo root on sys.path, for lemlist_core
+from lemlist_core.mailer import message_id_domain
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "THREAD_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sent_messages_index.jsonl'),
+)
+
+MESSAGE_ID_RE = re.compile(r'<[^<>\s]+>')
+
+def record_outbound(message_id, email, campaign, stage, path=DEFAULT_INDEX_PATH):
+    """Append one sent message to the index"""
+    entry = {
+        'message_id': message_id,
+        'email': email.strip().lower(),
+        'campaign': campaign,
+        'stage': stage,
+        'sent_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+def load_thread_index(path=DEFAULT_INDEX_PATH):
+    """Load the index as {message_id: entry}"""
+    index = {}
+    if not os.path.exists(path):
+        return index
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            index[entry['message_id']] = entry
+    return index
+
+def match_reply(index, in_reply_to="", references=""):
+    """Return the outbound entry a reply answers, or None
+
+    In-Reply-To is checked first, then References from the most recent id back.
+    """
+    if not index:
+        return None
+    candidates = MESSAGE_ID_RE.findall(in_reply_to or "")
+    candidates += reversed(MESSAGE_ID_RE.findall(references or ""))
+    for message_id in candidates:
+        entry = index.get(message_id)
+        if entry:
+            return entry
+    return None
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Open/click tracking server (asyncio, local)
+Answers the links rendered by the `track` filter and tracking_pixel()
+(lemlist_core.tracking), behind the public TRACKING_BASE_URL (reverse proxy
+or tunnel):
+  GET /c/<token>       302 to the link target, counted as a click
+  GET /o/<token>.gif   1x1 transparent GIF, counted as an open
+  GET /health          JSON counters
+Hits are answered from memory. Events are appended to tracking_events.jsonl
+and the per-contact totals (opens, clicks, last_opened, last_clicked) are
+rewritten to tracking_engagement.csv, both next to the master CSV, once per
+batch: every TRACKING_FLUSH_INTERVAL seconds or as soon as TRACKING_FLUSH_MAX
+events are pending, on a worker thread so the event loop never waits on the
+disk. The master CSV itself is never written here (campaign_manager.py and
+campaign_daemon.py rewrite it after each send or mark); campaign_manager.py
+joins the engagement file by email when it scores the nudge list. Totals are
+rebuilt from the event log at startup.
+Usage: python tracking_server.py [master_contacts_tracking.csv] [--host 127.0.0.1] [--port 8090]
+"""
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+import _paths  # repo root on sys.path, for lemlist_core
+
+from lemlist_core.env import load_dotenv_once
+from lemlist_core.tracking import ENGAGEMENT_FIELDS, engagement_path, read_token, write_engagement
+
+# Transparent 1x1 GIF
+PIXEL = bytes.fromhex('47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b')
+KEEPALIVE_TIMEOUT = 15
+MAX_HEADERS = 100
+
+class EngagementStore:
+    """Per-contact totals in memory, flushed to the event log and the engagement file in batches"""
+
+    def __init__(self, engagement_path, events_path, flush_interval=5.0, flush_max=1000):
+        self.engagement_path = os.path.abspath(engagement_path)
+        self.events_path = events_path
+        self.flush_interval = flush_interval
+        self.flush_max = flush_max
+        self.totals = {}
+        self.pending = []
+        self.stale = False  # Totals not written yet although no event is pending
+        self.counters = {'opens': 0, 'clicks': 0, 'invalid': 0, 'flushes': 0, 'flush_errors': 0}
+        self.last_flush = None
+        self.started_at = time.time()
+        self.wake = None
+        self._replay()
+
+    def _replay(self):
+        if not os.path.exists(self.events_path):
+            return
+        with open(self.events_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    self._count(json.loads(line))
+        self.stale = bool(self.totals)
+
+    def _count(self, event):
+        counts = self.totals.setdefault(event['email'], dict.fromkeys(ENGAGEMENT_FIELDS, 0))
+        if event['event'] == 'open':
+            counts['opens'] += 1
+            counts['last_opened'] = event['at']
+        else:
+            counts['clicks'] += 1
+            counts['last_clicked'] = event['at']
+
+    def record(self, kind, email, stage, user_agent=''):
+        """kind: 'open' or 'click'; only memory is touched here"""
+        event = {'event': kind, 'email': email, 'stage': stage,
+                 'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'user_agent': user_agent[:200]}
+        self._count(event)
+        self.pending.append(event)
+        self.counters['opens' if kind == 'open' else 'clicks'] += 1
+        if len(self.pending) >= self.flush_max and self.wake is not None:
+            self.wake.set()
+
+    def _take_batch(self):
+        events, self.pending = self.pending, []
+        totals = {email: dict(counts) for email, counts in self.totals.items()}
+        return events, totals
+
+    def _append_events(self, events):
+        if events:
+            with open(self.events_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events))
+
+    def _write_totals(self, totals):
+        started = time.perf_counter()
+        write_engagement(self.engagement_path, totals)
+        return time.perf_counter() - started
+
+    def _flushed(self, events, seconds):
+        self.counters['flushes'] += 1
+        self.stale = False
+        self.last_flush = {'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'events': len(events),
+                           'contacts': len(self.totals), 'ms': round(seconds * 1000, 1)}
+
+    async def flush(self):
+        if not (self.pending or self.stale):
+            return
+        loop = asyncio.get_running_loop()
+        events, totals = self._take_batch()
+        try:
+            await loop.run_in_executor(None, self._append_events, events)
+        except OSError as e:
+            self.counters['flush_errors'] += 1
+            self.pending[:0] = events
+            print(f"⚠️ Event log write failed ({e}), retrying at the next interval")
+            return
+        try:
+            seconds = await loop.run_in_executor(None, self._write_totals, totals)
+        except Exception as e:
+            # Totals are written in full every time: the next flush catches up
+            self.counters['flush_errors'] += 1
+            self.stale = True
+            print(f"⚠️ Engagement write failed ({e}), retrying at the next interval")
+            return
+        self._flushed(events, seconds)
+
+    def flush_now(self):
+        """Synchronous final flush, once the event loop has stopped"""
+        if self.pending or self.stale:
+            events, totals = self._take_batch()
+            self._append_events(events)
+            seconds = self._write_totals(totals)
+            self._flushed(events, seconds)
+
+    async def flush_loop(self):
+        self.wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            await self.flush()
+
+    def stats(self):
+        return {
+            'ok': True,
+            **self.counters,
+            'pending': len(self.pending),
+            'contacts': len(self.totals),
+            'last_flush': self.last_flush,
+            'uptime_seconds': int(time.time() - self.started_at),
+        }
+
+class TrackingServer:
+    def __init__(self, store, secret):
+        self.store = store
+        self.secret = secret
+
+    def route(self, method, target, headers):
+        """(status line, extra headers, body) for one request"""
+        if method not in ('GET', 'HEAD'):
+            return '405 Method Not Allowed', [('Allow', 'GET, HEAD')], b''
+        path = target.split('?', 1)[0]
+        if path.startswith('/c/'):
+            decoded = read_token(self.secret, path[3:])
+            if decoded is None or not decoded[2].startswith(('http://', 'https://')):
+                self.store.counters['invalid'] += 1
+                return '404 Not Found', [], b''
+            email, stage, url = decoded
+            if method == 'GET':
+                self.store.record('click', email, stage, headers.get('user-agent', ''))
+            return '302 Found', [('Location', url), ('Cache-Control', 'no-store')], b''
+        if path.startswith('/o/') and path.endswith('.gif'):
+            decoded = read_token(self.secret, path[3:-4])
+            if decoded is None:
+                self.store.counters['invalid'] += 1
+            elif method == 'GET':
+                self.store.record('open', decoded[0], decoded[1], headers.get('user-agent', ''))
+            # The image is served either way, a broken one would show in the email
+            return '200 OK', [('Content-Type', 'image/gif'), ('Cache-Control', 'no-store, max-age=0')], PIXEL
+        if path == '/health':
+            body = json.dumps(self.store.stats(), ensure_ascii=False).encode('utf-8')
+            return '200 OK', [('Content-Type', 'application/json; charset=utf-8')], body
+        return '404 Not Found', [], b''
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                # Whole request head in one read: one timer per request rather than one per line
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')[:MAX_HEADERS]
+                parts = request_line.split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                status, extra, body = self.route(method, target, headers)
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                response = [f"HTTP/1.1 {status}", f"Content-Length: {len(body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                response += [f"{name}: {value}" for name, value in extra]
+                writer.write(('\r\n'.join(response) + '\r\n\r\n').encode('latin-1') + (body if method == 'GET' else b''))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass  # Idle keep-alive, client gone, or a request head over the StreamReader limit
+        finally:
+            writer.close()
+
+async def serve(store, secret, host, port):
+    server = TrackingServer(store, secret)
+    listener = await asyncio.start_server(server.handle, host, port, backlog=1024)
+    bound = listener.sockets[0].getsockname()[1]
+    print(f"🟢 Tracking into {store.engagement_path} ({len(store.totals)} contacts with events) on http://{host}:{bound}", flush=True)
+    flusher = asyncio.create_task(store.flush_loop())
+    stopped = asyncio.Event()
+    with contextlib.suppress(NotImplementedError):  # No loop signal handlers on Windows
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    try:
+        async with listener:
+            await stopped.wait()
+    finally:
+        flusher.cancel()
+
+if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('tracking_server', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
+    import argparse
+
+    load_dotenv_once(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Serve tracked links and the open pixel, write engagement next to the tracking CSV')
+    parser.add_argument('csv_file', nargs='?', default='master_contacts_tracking.csv', help='Master contacts CSV (read by nothing here, locates the output files)')
+    parser.add_argument('--host', default=os.getenv("TRACKING_HOST", "127.0.0.1"), help='Listen address (default: TRACKING_HOST or 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=int(os.getenv("TRACKING_PORT", 8090)), help='Listen port (default: TRACKING_PORT or 8090, 0 = any free port)')
+    parser.add_argument('--events', help='Event log (default: tracking_events.jsonl next to the CSV)')
+    parser.add_argument('--engagement', help='Per-contact totals (default: tracking_engagement.csv next to the CSV)')
+    parser.add_argument('--flush-interval', type=float, default=float(os.getenv("TRACKING_FLUSH_INTERVAL", 5)), help='Seconds between batch writes (default: TRACKING_FLUSH_INTERVAL or 5)')
+    parser.add_argument('--flush-max', type=int, default=int(os.getenv("TRACKING_FLUSH_MAX", 1000)), help='Pending events that trigger an early write (default: TRACKING_FLUSH_MAX or 1000)')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_file):
+        print(f"❌ Error: File not found: {args.csv_file}")
+        sys.exit(1)
+    secret = os.getenv("TRACKING_SECRET", "")
+    if not secret:
+        print("❌ TRACKING_SECRET is not set (the senders sign the links with it)")
+        sys.exit(1)
+
+    events_path = args.events or os.path.join(os.path.dirname(os.path.abspath(args.csv_file)), 'tracking_events.jsonl')
+    store = EngagementStore(args.engagement or engagement_path(args.csv_file), events_path, args.flush_interval, args.flush_max)
+    try:
+        asyncio.run(serve(store, secret, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    store.flush_now()
+    print(f"\n👋 Tracking server stopped ({store.counters['opens']} opens, {store.counters['clicks']} clicks recorded)")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Watch the inbox and mark replies as they arrive
+Holds an IMAP IDLE connection (NOOP polling when the server has no IDLE),
+runs the incremental sync from check_responses.py whenever the server
+reports a new message (untagged EXISTS) and marks matching contacts in
+master_contacts_tracking.csv right away, so a nudge never goes to someone
+who already answered (or whose address bounced).
+Usage: python watch_responses.py [master_contacts_tracking.csv]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+import _paths  # repo root on sys.path, for lemlist_core
+
+from check_responses import load_env, connect_imap, sync_responses, CAMPAIGN_SUBJECT
+from bounces import scan_bounces, suppress_bounced
+from campaign_daemon import daemon_request
+from imap_sync import idle
+from lemlist_core.csv_io import read_csv_rows_with_dialect
+from mark_answered import bulk_update
+
+def wait_for_new_mail(mail, use_idle, idle_timeout=300, poll_interval=30, sleep=time.sleep):
+    """Wait for one IDLE cycle (or poll interval); True when the server reported an untagged EXISTS
+
+    Only new messages in the selected inbox trigger a sync: select_folder()
+    pops the EXISTS of its SELECT, so the one seen after a NOOP is fresh.
+    """
+    if use_idle:
+        return any(response.endswith(b' EXISTS') for response in idle(mail, idle_timeout))
+    sleep(poll_interval)
+    mail.noop()
+    return mail.response('EXISTS')[1] != [None]
+
+def load_unanswered(csv_path):
+    """Email -> row for contacts that have not answered yet"""
+    rows, _, _ = read_csv_rows_with_dialect(csv_path)
+    unanswered = {}
+    for row in rows:
+        email = (row.get('email') or '').strip().lower()
+        if email and (row.get('answered') or '').strip().lower() != 'yes':
+            unanswered[email] = row
+    return unanswered
+
+def handle_new_responses(csv_path, fresh):
+    """Mark fresh real replies in the tracking CSV, return how many were marked"""
+    real = [response for response in fresh if not response['is_automatic']]
+    if not real:
+        return 0
+
+    unanswered = load_unanswered(csv_path)
+    stamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+    updates = []
+    for response in real:
+        sender = response['sender']
+        if sender in unanswered:
+            updates.append({'email': sender, 'answered': 'yes', 'status': 'responded',
+                            'notes': f"Auto-marked by watcher ({stamp})"})
+        else:
+            print(f"🆕 Reply from {sender} (not pending in CSV) - run auto_mark_responses.py to add new contacts")
+
+    if not updates:
+        return 0
+    # One writer when campaign_daemon.py is running, else a fresh read-update-write of the CSV
+    response = daemon_request('mark', csv_path=csv_path, updates=updates)
+    if response is not None and 'updated' in response:
+        updated = response['updated']
+    else:
+        updated, _ = bulk_update(csv_path, updates)
+    for email in updated:
+        print(f"✅ Marked {email} as responded")
+    return len(set(updated))
+
+def watch(csv_path, idle_timeout=300, poll_interval=30):
+    imap_cfg = load_env()
+    if not imap_cfg["IMAP_PASS"]:
+        print("❌ No IMAP password found in .env")
+        return
+
+    inbox_folder = os.getenv("INBOX_FOLDER", "INBOX")
+    backoff = 5
+    while True:
+        try:
+            print(f"📧 Connecting to {imap_cfg['IMAP_HOST']}...")
+            mail = connect_imap(imap_cfg)
+            use_idle = 'IDLE' in (mail.capabilities or ())
+            print(f"👀 Watching {inbox_folder} ({'IDLE push' if use_idle else f'NOOP polling every {poll_interval}s'})")
+            backoff = 5
+
+            new_mail = True  # Catch up first (also covers anything missed while disconnected)
+            while True:
+                if new_mail:
+                    # Both syncs re-SELECT the inbox and read UIDNEXT from it, no STATUS
+                    _, _, fresh = sync_responses(mail, imap_cfg, search_subject=CAMPAIGN_SUBJECT, verbose=False)
+                    if fresh:
+                        marked = handle_new_responses(csv_path, fresh)
+                        autos = sum(1 for response in fresh if response['is_automatic'])
+                        print(f"✅ {len(fresh)} new replies classified: {marked} marked, {autos} automatic")
+
+                    suppressed = suppress_bounced(csv_path, scan_bounces(mail, imap_cfg))
+                    if suppressed:
+                        print(f"🚫 {len(suppressed)} hard-bounced addresses suppressed: {', '.join(suppressed[:5])}")
+
+                new_mail = wait_for_new_mail(mail, use_idle, idle_timeout, poll_interval)
+
+        except KeyboardInterrupt:
+            print("\n👋 Watcher stopped")
+            try:
+                mail.logout()
+            except Exception:
+                pass
+            return
+        except Exception as e:
+            print(f"⚠️ IMAP connection lost ({e}), reconnecting in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 300)
+
+if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('watch_responses', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Watch the inbox and mark replies in near real time')
+    parser.add_argument('csv_file', nargs='?', default='master_contacts_tracking.csv', help='Path to the master contacts CSV file')
+    parser.add_argument('--idle-timeout', type=int, default=300, help='Seconds per IDLE cycle before re-issuing it (default: 300, servers drop IDLE after 29 min)')
+    parser.add_argument('--poll-interval', type=int, default=30, help='Seconds between NOOP polls when IDLE is unsupported (default: 30)')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_file):
+        print(f"❌ Error: File not found: {args.csv_file}")
+        sys.exit(1)
+
+    watch(args.csv_file, idle_timeout=args.idle_timeout, poll_interval=args.poll_interval)
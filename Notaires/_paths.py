@@ -0,0 +1,11 @@
+"""
+Puts the repo root on sys.path so the scripts here can import lemlist_core
+Imported first (`import _paths`) by every module of this folder that uses
+lemlist_core, whether it runs as a script or is imported from another one.
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
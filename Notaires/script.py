@@ -1,152 +1,60 @@
-import smtplib, ssl, csv, time, os, sys, logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-from jinja2 import Template
+import os, sys, logging
+import _paths  # repo root on sys.path, for lemlist_core
+from lemlist_core.env import load_env as load_campaign_env
+from lemlist_core.csv_io import read_csv_rows_with_dialect, write_csv_rows, load_exclusion_set
+from lemlist_core.logs import setup_logging, SkipCounter
+from lemlist_core.dkim_signing import presign
+from lemlist_core.mailer import send_email, prepare_email, send_prepared
+from lemlist_core.progress import format_progress
+from lemlist_core.rate import AIMDRate
+from lemlist_core.scoring import prioritize
+from lemlist_core.scheduling import build_queues, CompanyCap, company_key, recipient_domain
+from lemlist_core.sender import RetryQueue, run_send_loop, PERMANENT
+from lemlist_core.status import start_status_server
+from lemlist_core.templates import load_template
+from lemlist_core.timezones import contact_timezone
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
+setup_logging(os.path.dirname(os.path.abspath(__file__)))
+
+# Detail line for a sampled skipped row, per reason (see lemlist_core.logs.SkipCounter)
+SKIP_MESSAGES = {
+    'no_email': "Ligne sans email: saut de l'envoi",
+    'excluded': "Email dans la liste exclue: {email}, saut",
+    'already_sent': "Déjà marqué envoyé: {email}, saut",
+    'rejected_before': "Adresse rejetée lors d'un envoi précédent: {email}, saut",
+    'company_cap': "Plafond de {limit} contacts atteint pour {company}: {email}, saut",
+    'score': "Écarté par le score ({cause}): {email}, saut",
+}
 
 def load_env():
-    # Load env from campaign folder and fallback to parent .env
-    load_dotenv()
-    parent_env = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-    if os.path.exists(parent_env):
-        load_dotenv(parent_env)
-    return {
-        "SMTP_HOST": os.getenv("SMTP_HOST"),
-        "SMTP_PORT": int(os.getenv("SMTP_PORT", 587)),
-        "SMTP_USER": os.getenv("SMTP_USER"),
-        "SMTP_PASS": os.getenv("SMTP_PASS"),
-        "SENDER_NAME": os.getenv("SENDER_NAME", os.getenv("SMTP_USER")),
-        "REPLY_TO": os.getenv("REPLY_TO", os.getenv("SMTP_USER")),
-        "SMTP_USE_SSL": os.getenv("SMTP_USE_SSL", "false").lower() in ("1", "true", "yes"),
-        "SMTP_ALLOW_INSECURE_TLS": os.getenv("SMTP_ALLOW_INSECURE_TLS", "false").lower() in ("1", "true", "yes"),
-        "SMTP_DEBUG": os.getenv("SMTP_DEBUG", "false").lower() in ("1", "true", "yes"),
-        "EMAIL_SUBJECT": os.getenv("EMAIL_SUBJECT", "École Polytechnique - Projet de logiciel pour études notariales"),
-        "VIDEO_URL": os.getenv("VIDEO_URL", "https://www.youtube.com/watch?v=4JHtwtUv_lk"),
-        "BCC_EMAIL": os.getenv("BCC_EMAIL", "valentin.henry-leo@polytechnique.edu"),
-        "SEND_DELAY_SECONDS": int(os.getenv("SEND_DELAY_SECONDS", 300)),
-    }
+    # Campaign folder .env first, then the parent .env
+    return load_campaign_env(
+        os.path.dirname(os.path.abspath(__file__)),
+        EMAIL_SUBJECT="École Polytechnique - Projet de logiciel pour études notariales",
+        VIDEO_URL="https://www.youtube.com/watch?v=4JHtwtUv_lk",
+        BCC_EMAIL="valentin.henry-leo@polytechnique.edu",
+        SEND_DELAY_SECONDS=300,
+    )
 
 def load_recipients(csv_path):
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        sample = f.read(2048)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        for row in reader:
-            if row.get("email"):
-                first_name = (row.get("first_name") or row.get("firstName") or "").strip()
-                last_name = (row.get("last_name") or row.get("lastName") or "").strip()
-                company_name = (row.get("company_name") or row.get("companyName") or "").strip()
-                yield {
-                    "email": row["email"].strip(),
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "company_name": company_name,
-                }
+    rows, _, _ = read_csv_rows_with_dialect(csv_path)
+    for row in rows:
+        if row.get("email"):
+            first_name = (row.get("first_name") or row.get("firstName") or "").strip()
+            last_name = (row.get("last_name") or row.get("lastName") or "").strip()
+            company_name = (row.get("company_name") or row.get("companyName") or "").strip()
+            yield {
+                "email": row["email"].strip(),
+                "first_name": first_name,
+                "last_name": last_name,
+                "company_name": company_name,
+            }
 
 def load_recipients_list(csv_path):
     return list(load_recipients(csv_path))
 
-def format_progress(current: int, total: int, width: int = 30) -> str:
-    if total <= 0:
-        return "[" + ("-" * width) + "] 0/0 (0%)"
-    filled = int(width * current / total)
-    if filled > width:
-        filled = width
-    bar = "#" * filled + "-" * (width - filled)
-    percent = int((current / total) * 100)
-    return f"[{bar}] {current}/{total} ({percent}%)"
-
-def read_csv_rows_with_dialect(csv_path):
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        sample = f.read(4096)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        rows = list(reader)
-        fieldnames = list(reader.fieldnames or [])
-        return rows, dialect, fieldnames
-
-def write_csv_rows(csv_path, rows, dialect, fieldnames):
-    # Ensure stable header order
-    delimiter = getattr(dialect, 'delimiter', ';')
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=delimiter)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-
-def load_exclusion_set(path):
-    excluded = set()
-    if not path or not os.path.exists(path):
-        return excluded
-    def add_from_csv(csv_file):
-        try:
-            rows, _, _ = read_csv_rows_with_dialect(csv_file)
-        except Exception:
-            return
-        for row in rows:
-            email = (row.get('email') or '').strip().lower()
-            if email:
-                excluded.add(email)
-    if os.path.isdir(path):
-        for root, _, files in os.walk(path):
-            for name in files:
-                if name.lower().endswith('.csv'):
-                    add_from_csv(os.path.join(root, name))
-    else:
-        add_from_csv(path)
-    return excluded
-
-def send_email(smtp_cfg, subject, html_body, recipient):
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = f"{smtp_cfg['SENDER_NAME']} <{smtp_cfg['SMTP_USER']}>"
-    msg["To"] = recipient["email"]
-    msg["Reply-To"] = smtp_cfg["REPLY_TO"]
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-    to_addrs = [recipient["email"]]
-    bcc = (smtp_cfg.get("BCC_EMAIL") or "").strip()
-    if bcc:
-        to_addrs.append(bcc)
-
-    context = ssl.create_default_context()
-    if smtp_cfg.get("SMTP_ALLOW_INSECURE_TLS"):
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-
-    if smtp_cfg.get("SMTP_USE_SSL") or smtp_cfg.get("SMTP_PORT") == 465:
-        with smtplib.SMTP_SSL(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"], context=context) as server:
-            if smtp_cfg.get("SMTP_DEBUG"):
-                server.set_debuglevel(1)
-            server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-            server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
-    else:
-        with smtplib.SMTP(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"]) as server:
-            if smtp_cfg.get("SMTP_DEBUG"):
-                server.set_debuglevel(1)
-            server.starttls(context=context)
-            server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-            server.sendmail(smtp_cfg["SMTP_USER"], to_addrs, msg.as_string())
-
-def read_template_html():
-    template_path = os.path.join(os.path.dirname(__file__), 'template.html')
-    with open(template_path, 'r', encoding='utf-8') as f:
-        return f.read()
+def template_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.html')
 
 def mask_secret(secret, visible=2):
     if not secret:
@@ -177,10 +85,10 @@ def send_test_email(to_email):
     recipient = {"email": to_email, "first_name": "", "last_name": "", "company_name": ""}
     send_email(cfg, subject, html_body, recipient)
 
-def main(csv_path, exclude_csv=None):
+def main(csv_path, exclude_csv=None, adaptive=False, max_per_company=None, delay_seconds=None):
     cfg = load_env()
     subject = cfg["EMAIL_SUBJECT"]
-    tpl = Template(read_template_html())
+    tpl = load_template(template_path())
 
     # Load full CSV to allow in-place marking of sent rows
     rows, dialect, fieldnames = read_csv_rows_with_dialect(csv_path)
@@ -190,18 +98,30 @@ def main(csv_path, exclude_csv=None):
     # Build exclusion set of already-contacted emails
     excluded = load_exclusion_set(exclude_csv)
 
+    # Per-company cap for this stage, counting contacts already reached
+    cap = CompanyCap(cfg["MAX_PER_COMPANY"] if max_per_company is None else max_per_company)
+    for row in rows:
+        if (row.get('sent') or '').strip().lower() == 'yes':
+            cap.count(row)
+
     total = len(rows)
+    jobs = []
+    skips = SkipCounter('initial', total, SKIP_MESSAGES)
     for i, row in enumerate(rows, 1):
         email_value = (row.get('email') or '').strip()
         if not email_value:
-            logging.warning(f"{format_progress(i, total)} Ligne sans email: saut de l'envoi")
+            skips.skip('no_email', i, '')
             continue
         if email_value.lower() in excluded:
-            logging.info(f"{format_progress(i, total)} Email dans la liste exclue: {email_value}, saut")
+            skips.skip('excluded', i, email_value)
             continue
-        # Skip already sent rows
-        if (row.get('sent') or '').strip().lower() == 'yes':
-            logging.info(f"{format_progress(i, total)} Déjà marqué envoyé: {email_value}, saut")
+        # Skip already sent rows, and rows the server rejected for good
+        sent = (row.get('sent') or '').strip().lower()
+        if sent == 'yes':
+            skips.skip('already_sent', i, email_value)
+            continue
+        if sent == 'failed':
+            skips.skip('rejected_before', i, email_value)
             continue
 
         r = {
@@ -210,27 +130,54 @@ def main(csv_path, exclude_csv=None):
             'last_name': (row.get('last_name') or row.get('lastName') or '').strip(),
             'company_name': (row.get('company_name') or row.get('companyName') or '').strip(),
         }
-        html_body = tpl.render(**r, video_url=cfg["VIDEO_URL"])
-        try:
-            send_email(cfg, subject, html_body, r)
-            row['sent'] = 'yes'
+        if not cap.allow(row):
+            skips.skip('company_cap', i, email_value, limit=cap.limit, company=company_key(row))
+            continue
+        skips.seen(i)
+        jobs.append({'index': i, 'email': email_value, 'domain': recipient_domain(email_value),
+                     'tz': contact_timezone(row, cfg["DEFAULT_TIMEZONE"]), 'row': row, 'recipient': r})
+    # Best leads first (then spread over domains and local send windows below)
+    jobs = prioritize(jobs, skips, cfg["SKIP_UNVERIFIED"])
+    skips.summary(final=True)
+
+    def build_email(job):
+        return prepare_email(cfg, subject, tpl.render(**job['recipient'], stage='initial', video_url=cfg["VIDEO_URL"]), job['recipient'])
+
+    def send_one(job):
+        if presigned is not None:
+            return send_prepared(cfg, presigned.get(job))
+        html_body = tpl.render(**job['recipient'], stage='initial', video_url=cfg["VIDEO_URL"])
+        return send_email(cfg, subject, html_body, job['recipient'])
+
+    def on_sent(job, _message_id):
+        r = job['recipient']
+        job['row']['sent'] = 'yes'
+        write_csv_rows(csv_path, rows, dialect, fieldnames)
+        logging.info(f"{format_progress(job['index'], total)} Envoyé à {r['email']} ({r.get('first_name','')} {r.get('last_name','')})")
+
+    def on_failed(job, kind, code, message):
+        logging.error(f"[{job['index']}] Erreur pour {job['email']}: {f'{code} ' if code else ''}{message}")
+        if kind == PERMANENT:
+            job['row']['sent'] = 'failed'
             write_csv_rows(csv_path, rows, dialect, fieldnames)
-            logging.info(f"{format_progress(i, total)} Envoyé à {r['email']} ({r.get('first_name','')} {r.get('last_name','')})")
-        except Exception as e:
-            logging.error(f"[{i}] Erreur pour {email_value}: {e}")
 
-        delay = cfg.get("SEND_DELAY_SECONDS", 300)
-        logging.info(f"Pause {int(delay/60)} minutes avant le prochain…")
-        time.sleep(delay)
+    # DKIM on: every message built now and signed in background batches, best leads first
+    presigned = presign(cfg, jobs, build_email)
+    queues = build_queues(jobs, cfg)
+    delay = cfg["SEND_DELAY_SECONDS"] if delay_seconds is None else delay_seconds
+    status = start_status_server(cfg, 'Notaires', 'initial', len(jobs), delay)
+    run_send_loop(queues, send_one, delay, on_sent, on_failed, RetryQueue.from_config(cfg),
+                  rate=AIMDRate.from_config(cfg, delay) if adaptive else None, status=status)
 
 def send_template_to_single(email, first_name="", last_name="", company_name=""):
     cfg = load_env()
     subject = cfg["EMAIL_SUBJECT"]
-    tpl = Template(read_template_html())
+    tpl = load_template(template_path())
     if not (email or "").strip():
         logging.warning("Skip send: empty email provided to send_template_to_single")
         return
-    html_body = tpl.render(first_name=first_name, last_name=last_name, company_name=company_name, video_url=cfg["VIDEO_URL"])
+    html_body = tpl.render(email=email, first_name=first_name, last_name=last_name, company_name=company_name,
+                           stage='initial', video_url=cfg["VIDEO_URL"])
     recipient = {"email": email, "first_name": first_name, "last_name": last_name, "company_name": company_name}
     send_email(cfg, subject, html_body, recipient)
 
@@ -249,6 +196,9 @@ def send_first_from_csv(csv_path):
     raise RuntimeError('No valid recipient row found in CSV')
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('notaires_script', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     if len(sys.argv) >= 2 and sys.argv[1] == "--send-test":
         to_email = ""
         if len(sys.argv) >= 3:
@@ -300,6 +250,8 @@ if __name__ == "__main__":
 
     # Support optional exclusion list: --exclude-csv <path>
     exclude_csv = None
+    adaptive = False
+    max_per_company = None
     args = [a for a in sys.argv[1:] if a]
     if len(args) >= 1 and args[0] not in ("--send-test", "--send-template", "--send-first-from-csv"):
         # positional run: script.py <csv> [--exclude-csv <file>]
@@ -309,12 +261,18 @@ if __name__ == "__main__":
             if args[i] == "--exclude-csv" and i + 1 < len(args):
                 exclude_csv = args[i+1]
                 i += 2
+            elif args[i] == "--adaptive":
+                adaptive = True
+                i += 1
+            elif args[i] == "--max-per-company" and i + 1 < len(args):
+                max_per_company = int(args[i+1])
+                i += 2
             else:
                 i += 1
-        main(csv_pos, exclude_csv=exclude_csv)
+        main(csv_pos, exclude_csv=exclude_csv, adaptive=adaptive, max_per_company=max_per_company)
         sys.exit(0)
 
-    print("Usage: python script.py Notaires.csv [--exclude-csv already_sent.csv]\n"
+    print("Usage: python script.py Notaires.csv [--exclude-csv already_sent.csv] [--adaptive] [--max-per-company N]\n"
           "       python script.py --send-test <email>\n"
           "       python script.py --send-template <email> [first_name]\n"
           "       python script.py --send-first-from-csv <file.csv>")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Data-handling benchmark on synthetic lemlist/Apollo lists
+Times and measures peak Python memory (tracemalloc) for the CSV paths every
+campaign run goes through: reading an export, building the exclusion set,
+merge_all_contacts, consolidate_already_contacted and nudge1 selection
+(campaign_manager dry run), at each size. Results are compared with the stored
+baseline (benchmarks/baseline_data.json); a case slower or heavier than the
+tolerances exits non-zero. Peak memory carries across machines, timings do
+not: re-save the baseline on the machine that runs the comparison.
+Usage: python benchmarks/bench_data.py [--sizes 10000,100000] [--repeat 3]
+                                       [--baseline baseline_data.json] [--save-baseline] [--json results.json] [--keep]
+"""
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+CAMPAIGN_DIR = os.path.join(REPO_ROOT, 'AgentsImmo')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline_data.json')
+sys.path.insert(0, BENCH_DIR)
+
+from synth_data import write_leads, write_lead_dir, write_master
+
+def prepare(work_dir, rows, seed):
+    """Generate one size worth of inputs, return their paths"""
+    paths = {
+        'export': os.path.join(work_dir, 'export.csv'),
+        'lead_dir': os.path.join(work_dir, 'already_contacted'),
+        'master': os.path.join(work_dir, 'master_contacts_tracking.csv'),
+        'output': os.path.join(work_dir, 'merged.csv'),
+    }
+    os.makedirs(paths['lead_dir'], exist_ok=True)
+    write_leads(paths['export'], rows, seed=seed)
+    write_lead_dir(paths['lead_dir'], rows, seed=seed)
+    write_master(paths['master'], rows, seed=seed)
+    return paths
+
+def cases(paths):
+    """name -> zero-argument callable"""
+    from lemlist_core.csv_io import read_csv_rows_with_dialect, load_exclusion_set
+    from merge_all_contacts import merge_all_contacts
+    from consolidate_contacts import consolidate_already_contacted
+    from campaign_manager import send_nudge_campaign
+
+    return {
+        'read_csv': lambda: read_csv_rows_with_dialect(paths['export'], normalize_headers=True),
+        'exclusion_set': lambda: load_exclusion_set(paths['lead_dir']),
+        'merge': lambda: merge_all_contacts(paths['master'], paths['lead_dir'], paths['output']),
+        'consolidate': lambda: consolidate_already_contacted(paths['lead_dir'], paths['output']),
+        'nudge_select': lambda: send_nudge_campaign(paths['master'], 'nudge1', dry_run=True),
+    }
+
+def measure(fn, repeat):
+    """(best wall seconds over `repeat` runs, peak traced MiB of one extra run)"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    # Traced separately: tracemalloc slows allocation-heavy code several times over
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / (1024 * 1024)
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """Return the (case, rows, metric, now, before) entries worse than baseline by more than the tolerances"""
+    previous = {(entry['case'], entry['rows']): entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['case'], entry['rows']))
+        if not before:
+            continue
+        for metric, allowed in (('seconds', tolerance), ('peak_mib', memory_tolerance)):
+            if before[metric] and entry[metric] > before[metric] * (1 + allowed):
+                regressions.append((entry['case'], entry['rows'], metric, entry[metric], before[metric]))
+    return regressions
+
+def print_row(entry, before):
+    line = f"  {entry['case']:<14} {entry['seconds']:>9.3f}s {entry['peak_mib']:>9.1f} MiB"
+    if before and before['seconds'] and before['peak_mib']:
+        line += (f"  ({entry['seconds'] / before['seconds'] - 1:+.0%} time, "
+                 f"{entry['peak_mib'] / before['peak_mib'] - 1:+.0%} memory vs baseline)")
+    print(line)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark CSV ingestion, merge, exclusion and nudge selection')
+    parser.add_argument('--sizes', default='10000,100000', help='Comma-separated row counts (default: 10000,100000; add 1000000 for the full range)')
+    parser.add_argument('--cases', help='Comma-separated subset of: read_csv, exclusion_set, merge, consolidate, nudge_select')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case, best one kept (default: 3)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON to compare with (default: benchmarks/baseline_data.json)')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed slowdown vs baseline (default: 0.5 = 50%%, wall time is noisy)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.1, help='Allowed peak memory growth vs baseline (default: 0.1 = 10%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Keep the scripts\' output (and the generated inputs)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated inputs and outputs for inspection')
+
+    args = parser.parse_args()
+    keep = args.keep or args.verbose
+
+    sys.path[:0] = [CAMPAIGN_DIR, REPO_ROOT]
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    previous = {(entry['case'], entry['rows']): entry for entry in baseline.get('results', [])}
+    selected = [name.strip() for name in args.cases.split(',')] if args.cases else None
+
+    results = []
+    for rows in [int(value) for value in args.sizes.split(',') if value.strip()]:
+        with (contextlib.nullcontext(tempfile.mkdtemp(prefix='lemlist_bench_data_')) if keep
+              else tempfile.TemporaryDirectory(prefix='lemlist_bench_data_')) as work_dir:
+            started = time.perf_counter()
+            paths = prepare(work_dir, rows, args.seed)
+            print(f"📄 {rows} rows (inputs generated in {time.perf_counter() - started:.1f}s)")
+            for name, fn in cases(paths).items():
+                if selected and name not in selected:
+                    continue
+                output = io.StringIO() if not args.verbose else sys.stdout
+                with contextlib.redirect_stdout(output):
+                    seconds, peak_mib = measure(fn, args.repeat)
+                entry = {'case': name, 'rows': rows, 'seconds': round(seconds, 4), 'peak_mib': round(peak_mib, 2)}
+                results.append(entry)
+                print_row(entry, previous.get((name, rows)))
+        if keep:
+            print(f"📂 Files in {work_dir}")
+
+    report = {'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+    elif baseline:
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+        for case, rows, metric, now, before in regressions:
+            print(f"⚠️ {case} @ {rows} rows: {metric} {now} vs {before} in baseline")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} (time) / {args.memory_tolerance:.0%} (memory) of the baseline")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Reply-detection benchmark against the local IMAP replay server
+For each mailbox size, runs one watcher cycle (watch_responses.py): bounce
+scan + suppression, incremental reply sync, then marking the replies in the
+tracking CSV, followed by a second cycle that should find nothing new. Reports
+time per phase, IMAP round trips and bytes, and what was detected against the
+mailbox contents. CSV, thread index, sync state and suppression list live in a
+temp dir, removed at the end unless --keep (or --verbose) is given.
+Usage: python benchmarks/bench_replies.py [--sizes 1000,10000,100000] [--batch-size 300]
+                                          [--latency-ms 0] [--json results.json] [--keep]
+"""
+import contextlib
+import csv
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CAMPAIGN_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'AgentsImmo')
+sys.path.insert(0, BENCH_DIR)
+
+from imap_replay import SENDER, contact_email, outbound_message_id
+
+FIELDNAMES = ['email', 'first_name', 'last_name', 'company_name', 'premier_envoi_date',
+              'nudge1_date', 'nudge2_date', 'answered', 'status', 'notes']
+
+def write_campaign_files(csv_path, index_path, contacts):
+    """Tracking CSV and thread index for the contacts the replay mailbox answers from"""
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES, delimiter=';')
+        writer.writeheader()
+        for i in range(contacts):
+            writer.writerow({'email': contact_email(i), 'first_name': f"Prénom{i}", 'last_name': f"Nom{i}",
+                             'company_name': f"Agence {i % 97}", 'premier_envoi_date': '2026-01-05',
+                             'nudge1_date': '', 'nudge2_date': '', 'answered': 'no', 'status': 'contacted',
+                             'notes': ''})
+    with open(index_path, 'w', encoding='utf-8') as f:
+        for i in range(contacts):
+            f.write(json.dumps({'message_id': outbound_message_id(i), 'email': contact_email(i),
+                                'campaign': 'bench', 'stage': 'initial', 'sent_at': '2026-01-05 09:00:00'}) + '\n')
+
+def start_server(messages, contacts, args):
+    """Run imap_replay.py in its own process, return (proc, port, mailbox mix)"""
+    cmd = [sys.executable, os.path.join(BENCH_DIR, 'imap_replay.py'), '--port', '0',
+           '--messages', str(messages), '--contacts', str(contacts),
+           '--latency-ms', str(args.latency_ms), '--seed', str(args.seed)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    port = int(proc.stdout.readline().rsplit(':', 1)[1])
+    mix = json.loads(proc.stdout.readline()[2:].strip())
+    return proc, port, mix
+
+def stop_server(proc):
+    """Stop the server and return its counters"""
+    proc.send_signal(signal.SIGINT)
+    output, _ = proc.communicate(timeout=30)
+    for line in output.splitlines():
+        if line.startswith('📊 '):
+            return json.loads(line[2:].strip())
+    return {}
+
+class WireCounter:
+    """Count commands and bytes on an imaplib connection (instance-level wrappers)"""
+
+    def __init__(self, mail):
+        self.round_trips = self.bytes_in = self.bytes_out = 0
+        new_tag, send, read, readline = mail._new_tag, mail.send, mail.read, mail.readline
+
+        def counted_new_tag():
+            self.round_trips += 1
+            return new_tag()
+        def counted_send(data):
+            self.bytes_out += len(data)
+            return send(data)
+        def counted_read(size):
+            data = read(size)
+            self.bytes_in += len(data)
+            return data
+        def counted_readline():
+            data = readline()
+            self.bytes_in += len(data)
+            return data
+
+        mail._new_tag, mail.send, mail.read, mail.readline = counted_new_tag, counted_send, counted_read, counted_readline
+
+    def snapshot(self):
+        return {'round_trips': self.round_trips, 'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out}
+
+def watcher_cycle(csv_path, imap_cfg, quiet):
+    """One detect-and-mark cycle, timed per phase"""
+    from check_responses import connect_imap, sync_responses, CAMPAIGN_SUBJECT
+    from bounces import scan_bounces, suppress_bounced
+    from watch_responses import handle_new_responses
+
+    phases = {}
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        started = time.perf_counter()
+        mail = connect_imap(imap_cfg)
+        wire = WireCounter(mail)
+        phases['connect'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        failures = scan_bounces(mail, imap_cfg)
+        suppressed = suppress_bounced(csv_path, failures)
+        phases['bounces'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _, _, fresh = sync_responses(mail, imap_cfg, search_subject=CAMPAIGN_SUBJECT, verbose=False)
+        phases['replies'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        marked = handle_new_responses(csv_path, fresh)
+        phases['mark'] = time.perf_counter() - started
+
+        mail.logout()
+    return {
+        'seconds': {name: round(value, 4) for name, value in phases.items()},
+        'total_seconds': round(sum(phases.values()), 4),
+        'wire': wire.snapshot(),
+        'bounces_found': len(failures),
+        'suppressed': len(suppressed),
+        'replies_found': sum(1 for response in fresh if not response['is_automatic']),
+        'automatic_found': sum(1 for response in fresh if response['is_automatic']),
+        'marked': marked,
+    }
+
+def run_size(messages, args, work_dir):
+    contacts = args.contacts or max(1, messages // 10)
+    paths = {name: os.path.join(work_dir, name) for name in
+             ('contacts.csv', 'sent_messages_index.jsonl', 'imap_sync_state.json', 'suppression_list.csv')}
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+    write_campaign_files(paths['contacts.csv'], paths['sent_messages_index.jsonl'], contacts)
+
+    proc, port, mix = start_server(messages, contacts, args)
+    os.environ['IMAP_PORT'] = str(port)
+    from check_responses import load_env
+    imap_cfg = load_env()
+    imap_cfg["FETCH_BATCH_SIZE"] = args.batch_size
+    try:
+        first = watcher_cycle(paths['contacts.csv'], imap_cfg, quiet=not args.verbose)
+        second = watcher_cycle(paths['contacts.csv'], imap_cfg, quiet=not args.verbose)
+    finally:
+        server_stats = stop_server(proc)
+    return {'messages': messages, 'contacts': contacts, 'mailbox': mix,
+            'first_cycle': first, 'incremental_cycle': second, 'server': server_stats}
+
+def configure_env(work_dir):
+    """Point the reply tools at the replay server and the temp dir (set before they are imported)"""
+    os.environ.update({
+        'IMAP_HOST': '127.0.0.1',
+        'IMAP_USE_SSL': 'false',
+        'SMTP_USER': SENDER,
+        'SMTP_PASS': 'bench',
+        'INBOX_FOLDER': 'INBOX',
+        'IMAP_SYNC_STATE': os.path.join(work_dir, 'imap_sync_state.json'),
+        'THREAD_INDEX_PATH': os.path.join(work_dir, 'sent_messages_index.jsonl'),
+        'SUPPRESSION_LIST_PATH': os.path.join(work_dir, 'suppression_list.csv'),
+    })
+
+def print_report(result):
+    first, second = result['first_cycle'], result['incremental_cycle']
+    mix = result['mailbox']
+    print(f"📬 {result['messages']} messages, {result['contacts']} contacts — {mix}")
+    seconds = ' | '.join(f"{name} {value}s" for name, value in first['seconds'].items())
+    print(f"⏱️ First cycle {first['total_seconds']}s ({seconds})")
+    wire = first['wire']
+    print(f"🔁 {wire['round_trips']} round trips, {wire['bytes_in'] / 1024:.0f} KiB in, {wire['bytes_out'] / 1024:.0f} KiB out")
+    print(f"✅ {first['replies_found']} replies ({mix.get('reply', 0) + mix.get('thread_reply', 0)} in mailbox), "
+          f"{first['automatic_found']} automatic ({mix.get('auto_reply', 0)}), "
+          f"{first['bounces_found']} bounces ({mix.get('bounce', 0)}), {first['marked']} contacts marked, "
+          f"{first['suppressed']} suppressed")
+    print(f"♻️ Incremental cycle {second['total_seconds']}s, {second['wire']['round_trips']} round trips, "
+          f"{second['wire']['bytes_in']} bytes in")
+    print()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark reply detection and marking against a local IMAP server')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated mailbox sizes (default: 1000,10000,100000)')
+    parser.add_argument('--contacts', type=int, help='Campaign contacts (default: messages / 10)')
+    parser.add_argument('--batch-size', type=int, default=300, help='UIDs per FETCH (IMAP_FETCH_BATCH_SIZE, default: 300)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Server delay before every IMAP reply')
+    parser.add_argument('--seed', type=int, default=1, help='Mailbox seed')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Keep the reply tools\' output (and the temp dir)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temp dir (CSV, sync state, indexes) for inspection')
+
+    args = parser.parse_args()
+    keep = args.keep or args.verbose
+    sys.path.insert(0, CAMPAIGN_DIR)
+
+    results = []
+    with (contextlib.nullcontext(tempfile.mkdtemp(prefix='lemlist_bench_imap_')) if keep
+          else tempfile.TemporaryDirectory(prefix='lemlist_bench_imap_')) as work_dir:
+        configure_env(work_dir)
+        for size in [int(value) for value in args.sizes.split(',') if value.strip()]:
+            result = run_size(size, args, work_dir)
+            print_report(result)
+            results.append(result)
+    if keep:
+        print(f"📂 Files in {work_dir}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'batch_size': args.batch_size, 'latency_ms': args.latency_ms, 'results': results},
+                      f, indent=2, ensure_ascii=False)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+End-to-end send benchmark against the local SMTP sink
+Runs AgentsImmo/script.py main() (initial) or campaign_manager.py
+send_nudge_campaign (nudge1/nudge2) on a synthetic contact list with pacing,
+domain cooldowns and send windows disabled, and reports messages/sec, SMTP
+latency percentiles, CPU time per message and the mean time of each SMTP
+phase (lemlist_core.metrics). With --transport pickup|maildir|file the
+messages go to a spool in the temp dir instead (TRANSPORT), to compare a bulk
+handoff with the SMTP dialogue. Nothing touches the real tracking files: CSV,
+thread index and suppression list live in a temp dir, removed at the end
+unless --keep (or --verbose) is given.
+Usage: python benchmarks/bench_send.py [--contacts 500] [--target initial|nudge1|nudge2]
+                                       [--latency-ms 0] [--fail-4xx 0] [--fail-5xx 0] [--disconnect 0]
+                                       [--transport smtp|pickup|maildir|file] [--json results.json] [--keep]
+"""
+import contextlib
+import csv
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+CAMPAIGN_DIR = os.path.join(REPO_ROOT, 'AgentsImmo')
+
+FIELDNAMES = ['email', 'first_name', 'last_name', 'company_name', 'premier_envoi_date',
+              'nudge1_date', 'nudge2_date', 'answered', 'status', 'notes']
+
+def write_contacts(path, count, target):
+    """Synthetic master CSV where every contact is due for `target`"""
+    sent_long_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES, delimiter=';')
+        writer.writeheader()
+        for i in range(count):
+            writer.writerow({
+                'email': f"contact{i}@agence{i % max(1, count // 5)}.example",
+                'first_name': f"Prénom{i}",
+                'last_name': f"Nom{i}",
+                'company_name': f"Agence {i % max(1, count // 5)}",
+                'premier_envoi_date': sent_long_ago if target != 'initial' else '',
+                'nudge1_date': sent_long_ago if target == 'nudge2' else '',
+                'nudge2_date': '',
+                'answered': 'no',
+                'status': 'contacted' if target != 'initial' else '',
+                'notes': '',
+            })
+
+def start_sink(args):
+    """Run smtp_sink.py in its own process (its CPU must not count as ours), return (proc, port)"""
+    cmd = [sys.executable, os.path.join(BENCH_DIR, 'smtp_sink.py'), '--port', '0',
+           '--latency-ms', str(args.latency_ms), '--fail-4xx', str(args.fail_4xx),
+           '--fail-5xx', str(args.fail_5xx), '--disconnect', str(args.disconnect), '--seed', str(args.seed)]
+    if args.transcript:
+        cmd += ['--transcript', args.transcript]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    return proc, int(line.rsplit(':', 1)[1])
+
+def stop_sink(proc):
+    """Stop the sink and return its counters"""
+    proc.send_signal(signal.SIGINT)
+    output, _ = proc.communicate(timeout=10)
+    for line in output.splitlines():
+        if line.startswith('📊 '):
+            return json.loads(line[2:].strip())
+    return {}
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def configure_env(port, work_dir):
+    """Point every sender setting at the sink and the temp dir (set before the campaign modules load)"""
+    os.environ.update({
+        'SMTP_HOST': '127.0.0.1',
+        'SMTP_PORT': str(port),
+        'SMTP_USER': 'bench@sender.example',
+        'SMTP_PASS': 'bench',
+        'SMTP_USE_SSL': 'false',
+        'SMTP_STARTTLS': 'false',
+        'SMTP_CA_CERT': os.path.join(work_dir, 'no_cert.pem'),
+        'BCC_EMAIL': '',
+        'SEND_WINDOW': '',
+        'DOMAIN_COOLDOWN': '0',
+        'DOMAIN_COOLDOWNS': '',
+        'MAX_PER_COMPANY': '0',
+        'RETRY_BASE_DELAY': '0',
+        'RETRY_MAX_ATTEMPTS': '3',
+        'THREAD_INDEX_PATH': os.path.join(work_dir, 'sent_messages_index.jsonl'),
+        'SUPPRESSION_LIST_PATH': os.path.join(work_dir, 'suppression_list.csv'),
+    })
+
+def count_spooled(transport, path):
+    """Messages written by a spool transport"""
+    import mailbox
+
+    if transport == 'pickup':
+        return sum(1 for name in os.listdir(path) if name.endswith('.eml'))
+    if transport == 'maildir':
+        return len(mailbox.Maildir(path, create=False))
+    return len(mailbox.mbox(path))
+
+def run(args, work_dir):
+    csv_path = os.path.join(work_dir, 'contacts.csv')
+    write_contacts(csv_path, args.contacts, args.target)
+
+    proc, port = start_sink(args)
+    configure_env(port, work_dir)
+    spool_path = os.path.join(work_dir, 'spool.mbox' if args.transport == 'file' else 'spool')
+    os.environ.update({'TRANSPORT': args.transport, 'TRANSPORT_PATH': spool_path if args.transport != 'smtp' else ''})
+    sys.path.insert(0, CAMPAIGN_DIR)  # before the repo root: its script.py is the legacy one
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    if args.target == 'initial':
+        import script as module
+        entry = lambda: module.main(csv_path, delay_seconds=0)
+    else:
+        import campaign_manager as module
+        entry = lambda: module.send_nudge_campaign(csv_path, args.target, delay_seconds=0)
+
+    # Time every send as seen by the sender (send_prepared when DKIM presigning is on)
+    latencies = []
+    real_functions = {name: getattr(module, name) for name in ('send_email', 'send_prepared')}
+    def timed(fn):
+        def wrapper(*a, **kw):
+            started = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                latencies.append(time.perf_counter() - started)
+        return wrapper
+    for name, fn in real_functions.items():
+        setattr(module, name, timed(fn))
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        entry()
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        for name, fn in real_functions.items():
+            setattr(module, name, fn)
+        sink_stats = stop_sink(proc)
+
+    from lemlist_core.metrics import METRICS, PHASES
+    account = METRICS.snapshot()['by_account'].get(os.environ['SMTP_USER'], {})
+    delivered = sink_stats.get('messages', 0) if args.transport == 'smtp' else count_spooled(args.transport, spool_path)
+    attempts = len(latencies)
+    return {
+        'target': args.target,
+        'transport': args.transport,
+        'contacts': args.contacts,
+        'sink': {'latency_ms': args.latency_ms, 'fail_4xx': args.fail_4xx, 'fail_5xx': args.fail_5xx,
+                 'disconnect': args.disconnect},
+        'delivered': delivered,
+        'attempts': attempts,
+        'wall_seconds': round(wall, 3),
+        'messages_per_second': round(delivered / wall, 2) if wall else 0.0,
+        'latency_ms': {name: round(percentile(latencies, pct) * 1000, 2)
+                       for name, pct in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))},
+        'cpu_ms_per_message': round(cpu * 1000 / max(1, attempts), 3),
+        'phase_mean_ms': {phase: round(account[phase]['sum'] * 1000 / account[phase]['count'], 3)
+                          for phase in PHASES if phase in account},
+        'sink_stats': sink_stats,
+    }
+
+def print_report(result):
+    via = f"sink {result['sink']}" if result['transport'] == 'smtp' else f"{result['transport']} spool"
+    print(f"📨 {result['target']} — {result['contacts']} contacts, {via}")
+    print(f"✅ {result['delivered']} delivered in {result['attempts']} attempts, {result['wall_seconds']}s")
+    print(f"⚡ {result['messages_per_second']} msg/s")
+    latency = result['latency_ms']
+    print(f"⏱️ send_email latency p50 {latency['p50']}ms | p90 {latency['p90']}ms | p99 {latency['p99']}ms | max {latency['max']}ms")
+    print(f"🧮 CPU {result['cpu_ms_per_message']}ms per attempt")
+    if result['phase_mean_ms']:
+        print(f"🔬 Mean per phase: {' | '.join(f'{phase} {ms}ms' for phase, ms in result['phase_mean_ms'].items())}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the send path against a local SMTP sink')
+    parser.add_argument('--contacts', type=int, default=500, help='Synthetic contacts to send to (default: 500)')
+    parser.add_argument('--target', choices=['initial', 'nudge1', 'nudge2'], default='nudge1',
+                        help='initial = script.py main(), nudge1/nudge2 = campaign_manager.py')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Sink delay before every SMTP reply')
+    parser.add_argument('--fail-4xx', type=float, default=0, help='Share of messages refused with 451')
+    parser.add_argument('--fail-5xx', type=float, default=0, help='Share of messages refused with 550')
+    parser.add_argument('--disconnect', type=float, default=0, help='Share of connections dropped at MAIL')
+    parser.add_argument('--seed', type=int, default=1, help='Fault injection seed')
+    parser.add_argument('--transcript', help='Write the sink SMTP transcript to this file')
+    parser.add_argument('--transport', choices=['smtp', 'pickup', 'maildir', 'file'], default='smtp',
+                        help='smtp = through the sink (default), else a spool in the temp dir')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Keep the senders\' logging (and the temp dir)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temp dir (CSV, spool, thread index) for inspection')
+
+    args = parser.parse_args()
+    keep = args.keep or args.verbose
+    with (contextlib.nullcontext(tempfile.mkdtemp(prefix='lemlist_bench_')) if keep
+          else tempfile.TemporaryDirectory(prefix='lemlist_bench_')) as work_dir:
+        result = run(args, work_dir)
+    print_report(result)
+    if keep:
+        print(f"📂 Files in {work_dir}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
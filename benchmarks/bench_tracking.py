@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tracking server benchmark: a burst of opens and clicks from many connections
+Starts AgentsImmo/tracking_server.py on a synthetic tracking CSV, fires
+--requests hits (--click-ratio of them clicks) over --connections keep-alive
+connections, and reports hits per second and latency percentiles. Then it
+stops the server and checks that the opens/clicks totals of the engagement
+file add up to what was sent. CSV, event log and engagement file live in a
+temp dir, removed at the end unless --keep is given.
+Usage: python benchmarks/bench_tracking.py [--requests 20000] [--connections 200] [--contacts 10000]
+                                           [--flush-interval 1] [--json results.json] [--keep]
+"""
+import asyncio
+import contextlib
+import csv
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from synth_data import MASTER_COLUMNS, contact_email
+from lemlist_core.tracking import engagement_path, make_token
+
+SECRET = 'bench'
+VIDEO_URL = 'https://www.youtube.com/watch?v=eS6VZm7rzeM'
+
+def write_contacts(csv_path, contacts):
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MASTER_COLUMNS, delimiter=';')
+        writer.writeheader()
+        for i in range(contacts):
+            writer.writerow({'email': contact_email(i), 'first_name': f"Prénom{i}", 'last_name': f"Nom{i}",
+                             'company_name': f"Agence {i % 97}", 'premier_envoi_date': '2026-01-05',
+                             'answered': 'no', 'status': 'contacted'})
+
+def start_server(csv_path, args):
+    cmd = [sys.executable, os.path.join(REPO_ROOT, 'AgentsImmo', 'tracking_server.py'), csv_path, '--port', '0',
+           '--flush-interval', str(args.flush_interval), '--flush-max', str(args.flush_max)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, env={**os.environ, 'TRACKING_SECRET': SECRET})
+    port = int(proc.stdout.readline().rsplit(':', 1)[1])
+    return proc, port
+
+async def get(reader, writer, path):
+    """One keep-alive GET, returns (status code, body)"""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nUser-Agent: bench_tracking\r\n\r\n".encode('ascii'))
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def client(port, paths, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for path in paths:
+        started = time.perf_counter()
+        status, _ = await get(reader, writer, path)
+        latencies.append(time.perf_counter() - started)
+        if status not in (200, 302):
+            errors.append(status)
+    writer.close()
+
+async def burst(port, args):
+    rng = random.Random(args.seed)
+    paths, expected = [], {'opens': 0, 'clicks': 0}
+    for _ in range(args.requests):
+        email = contact_email(rng.randrange(args.contacts))
+        if rng.random() < args.click_ratio:
+            paths.append(f"/c/{make_token(SECRET, email, 'nudge1', VIDEO_URL)}")
+            expected['clicks'] += 1
+        else:
+            paths.append(f"/o/{make_token(SECRET, email, 'nudge1')}.gif")
+            expected['opens'] += 1
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, paths[i::args.connections], latencies, errors)
+                           for i in range(args.connections)))
+    elapsed = time.perf_counter() - started
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    _, body = await get(reader, writer, '/health')
+    writer.close()
+    latencies.sort()
+    return {
+        'requests': args.requests,
+        'connections': args.connections,
+        'seconds': round(elapsed, 3),
+        'hits_per_second': round(args.requests / elapsed),
+        'latency_ms': {name: round(latencies[int(q * (len(latencies) - 1))] * 1000, 2)
+                       for name, q in (('p50', 0.5), ('p99', 0.99), ('max', 1.0))},
+        'errors': len(errors),
+        'expected': expected,
+        'server': json.loads(body),
+    }
+
+def engagement_totals(path):
+    totals = {'opens': 0, 'clicks': 0}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            for field in totals:
+                totals[field] += int(row.get(field) or 0)
+    return totals
+
+def print_report(result):
+    latency = result['latency_ms']
+    print(f"🎯 {result['requests']} hits over {result['connections']} connections in {result['seconds']}s: "
+          f"{result['hits_per_second']} hits/s")
+    print(f"⏱️ Latency p50 {latency['p50']} ms | p99 {latency['p99']} ms | max {latency['max']} ms, "
+          f"{result['errors']} errors")
+    server = result['server']
+    print(f"💾 {server['flushes']} batch writes during the burst, last {server['last_flush']}")
+    ok = result['engagement'] == result['expected']
+    print(f"{'✅' if ok else '❌'} Engagement totals {result['engagement']} for {result['expected']} sent")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the open/click tracking server under a burst of hits')
+    parser.add_argument('--requests', type=int, default=20000, help='Hits to send (default: 20000)')
+    parser.add_argument('--connections', type=int, default=200, help='Concurrent keep-alive connections (default: 200)')
+    parser.add_argument('--contacts', type=int, default=10000, help='Contacts in the tracking CSV (default: 10000)')
+    parser.add_argument('--click-ratio', type=float, default=0.2, help='Share of clicks among the hits (default: 0.2)')
+    parser.add_argument('--flush-interval', type=float, default=1, help='Server TRACKING_FLUSH_INTERVAL (default: 1)')
+    parser.add_argument('--flush-max', type=int, default=1000, help='Server TRACKING_FLUSH_MAX (default: 1000)')
+    parser.add_argument('--seed', type=int, default=1, help='Hit mix seed')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='Keep the temp dir (CSV, event log, engagement file) for inspection')
+
+    args = parser.parse_args()
+
+    with (contextlib.nullcontext(tempfile.mkdtemp(prefix='lemlist_bench_tracking_')) if args.keep
+          else tempfile.TemporaryDirectory(prefix='lemlist_bench_tracking_')) as work_dir:
+        csv_path = os.path.join(work_dir, 'contacts.csv')
+        write_contacts(csv_path, args.contacts)
+
+        proc, port = start_server(csv_path, args)
+        try:
+            result = asyncio.run(burst(port, args))
+        finally:
+            proc.send_signal(signal.SIGINT)
+            proc.communicate(timeout=60)
+        result['engagement'] = engagement_totals(engagement_path(csv_path))
+    print_report(result)
+    if args.keep:
+        print(f"📂 Files in {work_dir}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
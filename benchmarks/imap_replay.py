@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Local IMAP stand-in serving a synthetic INBOX for tests and benchmarks
+The mailbox mixes campaign replies (subject or In-Reply-To threaded),
+auto-replies (headers, subject or body), hard bounces (RFC 3464 reports) and
+unrelated mail, with RFC 2047 encoded subjects, and is rebuilt identically
+from --messages/--contacts/--seed. Supports the subset the reply checks use
+(CAPABILITY, LOGIN, STATUS, SELECT, UID SEARCH, UID FETCH, NOOP, LOGOUT) and
+counts round trips and bytes. No TLS: connect with IMAP_USE_SSL=false.
+Usage: python imap_replay.py [--port 1143] [--messages 10000] [--contacts 1000]
+                             [--latency-ms 0] [--seed 1]
+"""
+import email.header
+import email.utils
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+SENDER = 'bench@sender.example'
+CAMPAIGN_SUBJECT = "École Polytechnique - Projet de logiciel pour agences immobilières"
+UIDVALIDITY = 1
+
+# Share of each kind of message in the mailbox, the rest is unrelated mail
+DEFAULT_MIX = {'reply': 0.04, 'thread_reply': 0.02, 'auto_reply': 0.04, 'bounce': 0.02}
+
+UNRELATED_SUBJECTS = [
+    "Votre facture du mois", "Invitation : réunion d'équipe", "Newsletter immobilier",
+    "Confirmation de commande", "Rappel : séminaire jeudi", "Weekly digest", "Re: planning",
+]
+
+def contact_email(index):
+    return f"contact{index}@agence{index % 97}.example"
+
+def outbound_message_id(index):
+    """Message-ID of our campaign email to contact `index` (what the thread index holds)"""
+    return f"<bench.{index}@{SENDER.rsplit('@', 1)[1]}>"
+
+def encode_subject(subject, rng):
+    """Half of the non-ASCII subjects go out RFC 2047 encoded, like most clients send them"""
+    if rng.random() < 0.5:
+        return email.header.Header(subject, 'utf-8').encode(linesep='\r\n')
+    return subject
+
+def build_message(uid, kind, contact, rng, date):
+    """Return (headers, body) for one synthetic message"""
+    headers = [('Date', email.utils.format_datetime(date)), ('Message-ID', f"<{uid}.replay@mx.example>"), ('To', SENDER)]
+    address = contact_email(contact)
+    name = f"Prénom{contact} Nom{contact}"
+    campaign_re = encode_subject(f"Re: {CAMPAIGN_SUBJECT}", rng)
+
+    if kind == 'reply':
+        headers += [('From', f'"{name}" <{address}>'), ('Subject', campaign_re)]
+        if rng.random() < 0.7:
+            headers.append(('In-Reply-To', outbound_message_id(contact)))
+        body = "Bonjour,\r\nMerci pour votre message, je veux bien en discuter.\r\nCordialement\r\n"
+    elif kind == 'thread_reply':
+        # Subject rewritten by the prospect, only the headers tie it to our email
+        headers += [('From', f'"{name}" <{address}>'), ('Subject', rng.choice(["Votre projet", "Question", "Re: démo"])),
+                    ('In-Reply-To', outbound_message_id(contact)), ('References', outbound_message_id(contact))]
+        body = "Bonjour,\r\nPouvez-vous m'en dire plus ?\r\n"
+    elif kind == 'auto_reply':
+        variant = rng.randrange(3)
+        headers.append(('From', f'"{name}" <{address}>'))
+        if variant == 0:
+            headers += [('Subject', campaign_re), ('Auto-Submitted', 'auto-replied')]
+            body = "Je suis absent jusqu'au 3.\r\n"
+        elif variant == 1:
+            headers.append(('Subject', encode_subject(f"Réponse automatique : {CAMPAIGN_SUBJECT}", rng)))
+            body = "Merci pour votre message.\r\n"
+        else:
+            # Only the body gives it away: needs the preview fetch
+            headers.append(('Subject', campaign_re))
+            body = "Bonjour, je suis en congés et n'ai pas accès à mes emails.\r\n"
+        headers.append(('In-Reply-To', outbound_message_id(contact)))
+    elif kind == 'bounce':
+        boundary = f"bounce{uid}"
+        headers += [('From', 'Mail Delivery System <MAILER-DAEMON@mx.example>'),
+                    ('Subject', 'Undelivered Mail Returned to Sender'),
+                    ('MIME-Version', '1.0'),
+                    ('Content-Type', f'multipart/report; report-type=delivery-status; boundary="{boundary}"')]
+        body = (f"--{boundary}\r\nContent-Type: text/plain\r\n\r\nDelivery to {address} failed.\r\n"
+                f"--{boundary}\r\nContent-Type: message/delivery-status\r\n\r\n"
+                f"Reporting-MTA: dns; mx.example\r\n\r\n"
+                f"Final-Recipient: rfc822; {address}\r\nAction: failed\r\nStatus: 5.1.1\r\n"
+                f"Diagnostic-Code: smtp; 550 5.1.1 User unknown\r\n\r\n"
+                f"--{boundary}--\r\n")
+    else:
+        headers += [('From', f"news@shop{rng.randrange(500)}.example"),
+                    ('Subject', encode_subject(rng.choice(UNRELATED_SUBJECTS), rng))]
+        body = "Lorem ipsum dolor sit amet. " * rng.randint(2, 20) + "\r\n"
+    return headers, body
+
+class Message:
+    __slots__ = ('uid', 'kind', 'headers', 'body', 'search')
+
+    def __init__(self, uid, kind, headers, body):
+        self.uid = uid
+        self.kind = kind
+        self.headers = headers
+        self.body = body.encode('utf-8')
+        # Lower-cased, decoded header values for SEARCH, as a server would match them
+        self.search = {}
+        for name, value in headers:
+            decoded = str(email.header.make_header(email.header.decode_header(value)))
+            self.search.setdefault(name.lower(), decoded.lower())
+
+    def header_bytes(self, fields=None):
+        wanted = {field.lower() for field in fields} if fields else None
+        lines = [f"{name}: {value}\r\n" for name, value in self.headers if wanted is None or name.lower() in wanted]
+        return (''.join(lines) + '\r\n').encode('utf-8')
+
+    def raw(self):
+        return self.header_bytes() + self.body
+
+def build_mailbox(count, contacts=None, seed=1, mix=DEFAULT_MIX):
+    """Deterministic list of Message, UIDs 1..count, oldest first"""
+    rng = random.Random(seed)
+    contacts = contacts or max(1, count // 10)
+    start = datetime.now(timezone.utc) - timedelta(days=60)
+    messages = []
+    for uid in range(1, count + 1):
+        roll = rng.random()
+        kind = 'unrelated'
+        for name, share in mix.items():
+            if roll < share:
+                kind = name
+                break
+            roll -= share
+        date = start + timedelta(seconds=uid * 60 * 60 * 24 * 59 // max(1, count))
+        headers, body = build_message(uid, kind, rng.randrange(contacts), rng, date)
+        messages.append(Message(uid, kind, headers, body))
+    return messages
+
+def mailbox_summary(messages):
+    summary = {}
+    for message in messages:
+        summary[message.kind] = summary.get(message.kind, 0) + 1
+    return summary
+
+TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|\(|\)|[^\s()]+')
+
+def tokenize(text):
+    return [match.group(1) if match.group(1) is not None else match.group(0) for match in TOKEN_RE.finditer(text)]
+
+def parse_uid_set(text, max_uid):
+    """'1:300,305,400:*' -> [(1, 300), (305, 305), (400, max_uid)]"""
+    ranges = []
+    for part in text.split(','):
+        low, _, high = part.partition(':')
+        low = max_uid if low == '*' else int(low)
+        high = low if not high else (max_uid if high == '*' else int(high))
+        ranges.append((min(low, high), max(low, high)))
+    return ranges
+
+def parse_search(tokens, max_uid):
+    """Parse one search key off `tokens`, return a predicate on Message"""
+    key = tokens.pop(0).upper()
+    if key == 'OR':
+        left, right = parse_search(tokens, max_uid), parse_search(tokens, max_uid)
+        return lambda message: left(message) or right(message)
+    if key == 'NOT':
+        inner = parse_search(tokens, max_uid)
+        return lambda message: not inner(message)
+    if key == '(':
+        keys = []
+        while tokens[0] != ')':
+            keys.append(parse_search(tokens, max_uid))
+        tokens.pop(0)
+        return lambda message: all(match(message) for match in keys)
+    if key == 'ALL':
+        return lambda message: True
+    if key == 'UID':
+        ranges = parse_uid_set(tokens.pop(0), max_uid)
+        return lambda message: any(low <= message.uid <= high for low, high in ranges)
+    if key in ('SUBJECT', 'FROM', 'TO'):
+        needle = tokens.pop(0).lower()
+        return lambda message: needle in message.search.get(key.lower(), '')
+    if key == 'HEADER':
+        name, needle = tokens.pop(0).lower(), tokens.pop(0).lower()
+        return lambda message: needle in message.search.get(name, '')
+    if key == 'SINCE':
+        since = datetime.strptime(tokens.pop(0), '%d-%b-%Y').date()
+        return lambda message: email.utils.parsedate_to_datetime(message.search['date']).date() >= since
+    raise ValueError(f"unsupported search key {key}")
+
+class IMAPReplay(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, messages, host='127.0.0.1', port=0, latency_ms=0):
+        super().__init__((host, port), IMAPHandler)
+        self.messages = messages
+        self.by_uid = {message.uid: message for message in messages}
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.stats = {'connections': 0, 'round_trips': 0, 'bytes_in': 0, 'bytes_out': 0,
+                      'messages_fetched': 0, 'commands': {}}
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve from a background thread, return self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def count_command(self, name):
+        with self.lock:
+            self.stats['round_trips'] += 1
+            self.stats['commands'][name] = self.stats['commands'].get(name, 0) + 1
+
+class IMAPHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.server.count('bytes_out', len(data))
+        self.wfile.write(data)
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        self.send("* OK IMAP replay ready\r\n")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            server.count('bytes_in', len(raw))
+            line = raw.decode('utf-8', errors='ignore').rstrip('\r\n')
+            tag, _, rest = line.partition(' ')
+            command, _, args = rest.partition(' ')
+            command = command.upper()
+            if command == 'UID':
+                sub, _, args = args.partition(' ')
+                command = f"UID {sub.upper()}"
+            server.count_command(command)
+            if server.latency_ms:
+                time.sleep(server.latency_ms / 1000.0)
+            try:
+                if not self.dispatch(tag, command, args):
+                    return
+            except Exception as e:
+                self.send(f"{tag} BAD {e}\r\n")
+
+    def dispatch(self, tag, command, args):
+        server = self.server
+        if command == 'CAPABILITY':
+            self.send("* CAPABILITY IMAP4rev1 LITERAL+\r\n")
+        elif command == 'LOGIN':
+            pass
+        elif command == 'STATUS':
+            self.send(f'* STATUS "INBOX" (UIDVALIDITY {UIDVALIDITY} UIDNEXT {len(server.messages) + 1})\r\n')
+        elif command in ('SELECT', 'EXAMINE'):
+            self.send(f"* {len(server.messages)} EXISTS\r\n* 0 RECENT\r\n"
+                      f"* OK [UIDVALIDITY {UIDVALIDITY}] UIDs valid\r\n* OK [UIDNEXT {len(server.messages) + 1}] Predicted next UID\r\n")
+        elif command == 'UID SEARCH':
+            tokens = tokenize(args)
+            keys = []
+            while tokens:
+                keys.append(parse_search(tokens, len(server.messages)))
+            uids = [str(message.uid) for message in server.messages if all(match(message) for match in keys)]
+            self.send(f"* SEARCH {' '.join(uids)}\r\n")
+        elif command == 'UID FETCH':
+            self.fetch(args)
+        elif command == 'NOOP':
+            pass
+        elif command == 'LOGOUT':
+            self.send("* BYE logging out\r\n")
+            self.send(f"{tag} OK LOGOUT completed\r\n")
+            return False
+        else:
+            self.send(f"{tag} BAD unsupported command {command}\r\n")
+            return True
+        self.send(f"{tag} OK {command} completed\r\n")
+        return True
+
+    def fetch(self, args):
+        server = self.server
+        uid_set, _, items = args.partition(' ')
+        ranges = parse_uid_set(uid_set, len(server.messages))
+        items = items.strip().upper()
+        fields = re.search(r'HEADER\.FIELDS \(([^)]*)\)', items)
+        partial = re.search(r'BODY(?:\.PEEK)?\[TEXT\]<(\d+)\.(\d+)>', items)
+        for uid in sorted({uid for low, high in ranges for uid in range(low, high + 1)}):
+            message = server.by_uid.get(uid)
+            if message is None:
+                continue
+            if fields:
+                name = f"BODY[HEADER.FIELDS ({fields.group(1)})]"
+                payload = message.header_bytes(fields.group(1).split())
+            elif partial:
+                start, length = int(partial.group(1)), int(partial.group(2))
+                name = f"BODY[TEXT]<{start}>"
+                payload = message.body[start:start + length]
+            elif 'BODY[TEXT]' in items or 'BODY.PEEK[TEXT]' in items:
+                name, payload = "BODY[TEXT]", message.body
+            else:
+                name, payload = "BODY[]", message.raw()
+            server.count('messages_fetched')
+            self.send(f"* {message.uid} FETCH (UID {message.uid} {name} {{{len(payload)}}}\r\n".encode('utf-8') + payload + b")\r\n")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local IMAP server replaying a synthetic mailbox')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1143, help='Port to listen on (0 = any free port)')
+    parser.add_argument('--messages', type=int, default=10000, help='Messages in INBOX (default: 10000)')
+    parser.add_argument('--contacts', type=int, help='Distinct campaign contacts (default: messages / 10)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay before answering every command')
+    parser.add_argument('--seed', type=int, default=1, help='Mailbox seed')
+
+    args = parser.parse_args()
+
+    messages = build_mailbox(args.messages, args.contacts, args.seed)
+    server = IMAPReplay(messages, args.host, args.port, args.latency_ms)
+    # The benchmark harness reads these two lines to find the port and the mailbox mix
+    print(f"📮 IMAP replay listening on {args.host}:{server.port}", flush=True)
+    print(f"📬 {json.dumps(mailbox_summary(messages))}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {json.dumps(server.stats)}", flush=True)
+        server.server_close()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Local SMTP stand-in for tests and benchmarks
+Accepts any AUTH, stores nothing but counters and (optionally) a transcript,
+and can inject per-reply latency, 4xx/5xx refusals at RCPT and disconnects.
+No TLS: point the senders at it with SMTP_STARTTLS=false.
+Usage: python smtp_sink.py [--port 2525] [--latency-ms 20] [--fail-4xx 0.05] [--fail-5xx 0.01]
+                           [--disconnect 0.01] [--transcript sink.log] [--seed 1]
+"""
+import json
+import random
+import socketserver
+import threading
+import time
+
+TEMP_FAILURE = "451 4.7.1 Too many messages, slow down"
+PERM_FAILURE = "550 5.1.1 User unknown"
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, fail_4xx=0.0, fail_5xx=0.0,
+                 disconnect=0.0, transcript=None, seed=None):
+        super().__init__((host, port), SMTPHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_4xx = fail_4xx
+        self.fail_5xx = fail_5xx
+        self.disconnect = disconnect
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.transcript = open(transcript, 'a', encoding='utf-8') if transcript else None
+        self.stats = {'connections': 0, 'messages': 0, 'bytes': 0, 'refused_4xx': 0, 'refused_5xx': 0, 'disconnects': 0}
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve from a background thread, return self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.transcript:
+            self.transcript.close()
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def draw(self):
+        """Fate of the next message: None, '4xx', '5xx' or 'disconnect'"""
+        with self.lock:
+            roll = self.random.random()
+        for outcome, rate in (('disconnect', self.disconnect), ('4xx', self.fail_4xx), ('5xx', self.fail_5xx)):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return None
+
+    def log(self, conn_id, direction, line):
+        if self.transcript:
+            with self.lock:
+                self.transcript.write(f"{time.time():.6f} {conn_id} {direction} {line}\n")
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True  # multi-line replies would otherwise stall on delayed ACKs
+
+    def reply(self, line):
+        server = self.server
+        if server.latency_ms or server.jitter_ms:
+            with server.lock:
+                jitter = server.random.uniform(0, server.jitter_ms)
+            time.sleep((server.latency_ms + jitter) / 1000.0)
+        server.log(self.conn_id, 'S:', line)
+        self.wfile.write(line.encode('utf-8') + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        self.conn_id = f"{self.client_address[1]}"
+        self.reply("220 sink.local ESMTP ready")
+        fate = None
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', errors='ignore').rstrip('\r\n')
+            server.log(self.conn_id, 'C:', line if not line.upper().startswith('AUTH') else 'AUTH ***')
+            verb = line.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                for i, capability in enumerate(['sink.local', 'AUTH PLAIN LOGIN', '8BITMIME', 'SIZE 20971520']):
+                    self.reply(f"250{' ' if i == 3 else '-'}{capability}")
+            elif verb == 'HELO':
+                self.reply("250 sink.local")
+            elif verb == 'STARTTLS':
+                self.reply("454 4.7.0 TLS not available")
+            elif verb == 'AUTH':
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].upper() == 'LOGIN':
+                    if len(parts) == 2:
+                        self.reply("334 VXNlcm5hbWU6")
+                        self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == 'MAIL':
+                fate = server.draw()
+                if fate == 'disconnect':
+                    server.count('disconnects')
+                    server.log(self.conn_id, '--', 'dropped connection')
+                    return
+                self.reply("250 2.1.0 Ok")
+            elif verb == 'RCPT':
+                if fate == '4xx':
+                    server.count('refused_4xx')
+                    self.reply(TEMP_FAILURE)
+                elif fate == '5xx':
+                    server.count('refused_5xx')
+                    self.reply(PERM_FAILURE)
+                else:
+                    self.reply("250 2.1.5 Ok")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(chunk)
+                server.count('messages')
+                server.count('bytes', size)
+                server.log(self.conn_id, '--', f"message {size} bytes")
+                self.reply("250 2.0.0 Ok: queued")
+            elif verb in ('RSET', 'NOOP'):
+                fate = None if verb == 'RSET' else fate
+                self.reply("250 2.0.0 Ok")
+            elif verb == 'QUIT':
+                self.reply("221 2.0.0 Bye")
+                return
+            else:
+                self.reply("502 5.5.2 Command not recognized")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local SMTP sink with fault injection')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525, help='Port to listen on (0 = any free port)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay before every reply')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Extra random delay (0..jitter) before every reply')
+    parser.add_argument('--fail-4xx', type=float, default=0, help='Share of messages refused with 451 at RCPT')
+    parser.add_argument('--fail-5xx', type=float, default=0, help='Share of messages refused with 550 at RCPT')
+    parser.add_argument('--disconnect', type=float, default=0, help='Share of messages whose connection is dropped at MAIL')
+    parser.add_argument('--transcript', help='Append the SMTP dialogue to this file')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible fault injection')
+
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.latency_ms, args.jitter_ms, args.fail_4xx, args.fail_5xx,
+                    args.disconnect, args.transcript, args.seed)
+    # The benchmark harness reads this line to find the port
+    print(f"📮 SMTP sink listening on {args.host}:{sink.port}", flush=True)
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {json.dumps(sink.stats)}", flush=True)
+        sink.server_close()
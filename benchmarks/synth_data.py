@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Synthetic contact lists shaped like our lemlist and Apollo exports
+Lead exports carry the 61 lemlist columns (header order as in
+Notaires/already_contacted_notaires/notaire 2.csv) or Apollo-style headers
+(Email, First Name, ...), with accents, quoted multi-line descriptions, blank
+and upper-case emails, and `,`, `;` or tab delimiters. Master files follow
+master_contacts_tracking.csv. Everything is reproducible from the seed.
+Usage: python synth_data.py output.csv [--rows 100000] [--variant lemlist|apollo|master]
+                            [--delimiter ,] [--seed 1]
+"""
+import csv
+import random
+from datetime import datetime, timedelta
+
+LEMLIST_COLUMNS = [
+    'emailStatus', 'email', 'firstName', 'lastName', 'picture', 'phone', 'linkedinUrl', 'timezone', 'companyName',
+    'companyDomain', 'icebreaker', 'fullName', 'location', 'country', 'title', 'industry', 'companyWebsite',
+    'companyLinkedinUrl', 'companyDescription', 'companySize', 'companyFoundedYear', 'companyIndustry',
+    'companyPicture', 'jobTitle', 'skills', 'yearsOfExperience', 'connectionCount', 'experience1', 'experience2',
+    'experience3', 'experience4', 'experience5', 'language1', 'language2', 'language3', 'experience6', 'experience7',
+    'experience8', 'language4', 'school1', 'school2', 'school3', 'experience9', 'school4', 'school5', 'experience10',
+    'experience11', 'experience12', 'experience13', 'school6', 'experience14', 'experience15', 'experience16',
+    'experience17', 'cleanFirstName', 'isASaaSCompany', 'findCompanyLatestNews', 'campagne', 'lastState', 'status',
+    '_id',
+]
+
+# Apollo names for the columns our scripts read, the rest keep their lemlist name
+APOLLO_RENAMES = {'email': 'Email', 'firstName': 'First Name', 'lastName': 'Last Name', 'companyName': 'Company Name',
+                  'jobTitle': 'Title', 'companyDomain': 'Website', 'location': 'City', 'country': 'Country'}
+
+MASTER_COLUMNS = ['email', 'first_name', 'last_name', 'company_name', 'premier_envoi_date',
+                  'nudge1_date', 'nudge2_date', 'answered', 'status', 'notes']
+
+FIRST_NAMES = ['Émilie', 'François', 'Hélène', 'Jérôme', 'Maëlle', 'Noémie', 'Loïc', 'Agnès', 'Benoît', 'Céline',
+               'Zoé', 'Raphaël', 'Thibault', 'Chloé', 'André', 'Inès', 'Gaëtan', 'Léa', 'Timothée', 'Anaïs']
+LAST_NAMES = ['Lefèvre', 'Garçon', 'Bélanger', 'Côté', 'Dupré', 'Ménard', 'Hébert', 'Prévost', 'Gauthier', 'Noël',
+              'Rousseau', 'Béranger', 'Lemaître', 'Fournier', 'Besançon', 'Giraud', 'Mercier', 'Boëdec']
+COMPANY_WORDS = ['Immobilier', 'Notaires', 'Étude', 'Agence', 'Groupe', 'Conseil', 'Patrimoine', 'Associés', 'Habitat']
+CITIES = [('Paris, Île-de-France, France', 'France', 'Europe/Paris'), ('Lyon, Auvergne-Rhône-Alpes, France', 'France', ''),
+          ('Montréal, Québec, Canada', 'Canada', 'America/Toronto'), ('Bruxelles, Belgique', 'Belgium', ''),
+          ('Genève, Suisse', 'Switzerland', 'Europe/Zurich'), ('Lille, Hauts-de-France, France', 'France', '')]
+JOB_TITLES = ['Notaire', 'Gérant', "Directeur d'agence", 'Négociateur immobilier', 'Assistante', 'Fondateur', 'CEO']
+EMAIL_STATUSES = ['deliverable', 'deliverable', 'deliverable', 'risky', '', 'undeliverable']
+LAST_STATES = ['', 'emailsSent', 'emailsOpened', 'emailsClicked', 'scanned']
+COMPANY_SIZES = ['1-10', '11-50', '51-200', '2-10', '201-500', '']
+
+def ascii_slug(text):
+    table = str.maketrans('éèêëàâäîïôöûüùçÉÈÎÔ', 'eeeeaaaiioouuucEEIO')
+    return ''.join(ch for ch in text.translate(table).lower() if ch.isalnum())
+
+def contact_email(index):
+    """Same index, same address in every file: what lets merges and exclusions overlap"""
+    return f"{ascii_slug(FIRST_NAMES[index % len(FIRST_NAMES)])}.c{index}@{company_domain(index)}"
+
+def company_domain(index):
+    return f"{ascii_slug(COMPANY_WORDS[index % len(COMPANY_WORDS)])}{index // 7 % 5000}.fr"
+
+def lead_row(index, rng):
+    """One lemlist-shaped lead (dict over LEMLIST_COLUMNS)"""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = rng.choice(LAST_NAMES)
+    company = f"{COMPANY_WORDS[index % len(COMPANY_WORDS)]} {rng.choice(LAST_NAMES)} & Associés"
+    city, country, tz = rng.choice(CITIES)
+    email = contact_email(index)
+    roll = rng.random()
+    if roll < 0.03:
+        email = ''  # Leads lemlist could not enrich
+    elif roll < 0.08:
+        email = email.upper()
+    row = dict.fromkeys(LEMLIST_COLUMNS, '')
+    row.update({
+        'emailStatus': rng.choice(EMAIL_STATUSES) if email else '',
+        'email': email,
+        'firstName': first,
+        'lastName': last,
+        'picture': f"https://app.lemlist.com/api/files/Files/lip_{rng.getrandbits(64):016x}.jpg",
+        'linkedinUrl': f"https://www.linkedin.com/in/{ascii_slug(first)}-{ascii_slug(last)}-{index}",
+        'timezone': tz,
+        'companyName': company,
+        'companyDomain': company_domain(index),
+        'fullName': f"{first} {last}",
+        'location': city,
+        'country': country,
+        'title': f"{rng.choice(JOB_TITLES)} chez {company}",
+        'industry': 'Real Estate',
+        'companyWebsite': f"https://www.{company_domain(index)}",
+        'companyDescription': ("Fondée en 1998, l'étude accompagne particuliers et professionnels.\n"
+                               "Spécialités : immobilier, droit de la famille, successions. " * rng.randint(1, 4)).strip(),
+        'companySize': rng.choice(COMPANY_SIZES),
+        'companyIndustry': 'Real Estate',
+        'jobTitle': rng.choice(JOB_TITLES),
+        'skills': 'Négociation, Droit immobilier, Gestion locative',
+        'yearsOfExperience': str(rng.randint(1, 35)),
+        'connectionCount': str(rng.randint(10, 500)),
+        'experience1': f"{rng.choice(JOB_TITLES)} - {company}",
+        'school1': 'Université Paris-Panthéon-Assas',
+        'language1': 'Français',
+        'cleanFirstName': first,
+        'campagne': 'Notaire',
+        'lastState': rng.choice(LAST_STATES),
+        'status': rng.choice(['done', 'review', 'paused', '']),
+        '_id': f"lea_{rng.getrandbits(80):020x}",
+    })
+    return row
+
+def write_leads(path, rows, start=0, variant='lemlist', delimiter=',', seed=1):
+    """Lead export with `rows` leads numbered from `start` (lemlist or Apollo headers)"""
+    rng = random.Random(f"{seed}:{start}:{rows}")
+    if variant == 'apollo':
+        fieldnames = [APOLLO_RENAMES.get(name, name) for name in LEMLIST_COLUMNS]
+    else:
+        fieldnames = LEMLIST_COLUMNS
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(fieldnames)
+        for index in range(start, start + rows):
+            row = lead_row(index, rng)
+            writer.writerow([row[name] for name in LEMLIST_COLUMNS])
+
+def write_master(path, rows, seed=1):
+    """master_contacts_tracking.csv with contacts at every stage"""
+    rng = random.Random(f"master:{seed}:{rows}")
+    today = datetime.now()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MASTER_COLUMNS, delimiter=';')
+        writer.writeheader()
+        for index in range(rows):
+            first_sent = today - timedelta(days=rng.randint(0, 30))
+            stage = rng.random()
+            nudge1 = first_sent + timedelta(days=4) if stage > 0.5 and first_sent + timedelta(days=4) < today else None
+            nudge2 = nudge1 + timedelta(days=6) if nudge1 and stage > 0.8 and nudge1 + timedelta(days=6) < today else None
+            answered = rng.random() < 0.06
+            status = 'responded' if answered else ('nudge2_sent' if nudge2 else 'nudge1_sent' if nudge1 else 'contacted')
+            if rng.random() < 0.02:
+                status = 'bounced'
+            writer.writerow({
+                'email': contact_email(index),
+                'first_name': FIRST_NAMES[index % len(FIRST_NAMES)],
+                'last_name': rng.choice(LAST_NAMES),
+                'company_name': f"{COMPANY_WORDS[index % len(COMPANY_WORDS)]} {rng.choice(LAST_NAMES)}",
+                'premier_envoi_date': first_sent.strftime('%Y-%m-%d'),
+                'nudge1_date': nudge1.strftime('%Y-%m-%d') if nudge1 else '',
+                'nudge2_date': nudge2.strftime('%Y-%m-%d') if nudge2 else '',
+                'answered': 'yes' if answered else 'no',
+                'status': status,
+                'notes': 'Réponse reçue' if answered else '',
+            })
+
+def write_lead_dir(directory, rows, files=4, overlap=0.2, seed=1):
+    """Split `rows` leads over several exports with rotating header variants and delimiters
+
+    Each file also repeats `overlap` of the previous file's leads, the way
+    re-exported campaigns do, so merges have duplicates to resolve.
+    """
+    formats = [('lemlist', ','), ('apollo', ';'), ('lemlist', '\t'), ('lemlist', ';')]
+    per_file = max(1, rows // files)
+    paths = []
+    for number in range(files):
+        variant, delimiter = formats[number % len(formats)]
+        start = max(0, number * per_file - int(per_file * overlap))
+        count = per_file + (number * per_file - start)
+        path = f"{directory}/export_{number + 1}_{variant}.csv"
+        write_leads(path, count, start, variant, delimiter, seed)
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate a synthetic lemlist/Apollo/master contact CSV')
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--rows', type=int, default=100000, help='Contacts to generate (default: 100000)')
+    parser.add_argument('--variant', choices=['lemlist', 'apollo', 'master'], default='lemlist')
+    parser.add_argument('--delimiter', default=',', help="Field delimiter for lead exports (',', ';' or 'tab')")
+    parser.add_argument('--seed', type=int, default=1)
+
+    args = parser.parse_args()
+
+    if args.variant == 'master':
+        write_master(args.output, args.rows, args.seed)
+    else:
+        write_leads(args.output, args.rows, 0, args.variant, '\t' if args.delimiter == 'tab' else args.delimiter, args.seed)
+    print(f"✅ {args.rows} {args.variant} contacts written to {args.output}")
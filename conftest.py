@@ -0,0 +1,6 @@
+"""
+pytest setup for the repo
+test_env.py and AgentsImmo/test_imap.py are manual connection checks run as
+scripts (they need a .env and a live server), not unit tests.
+"""
+collect_ignore = ['test_env.py', 'AgentsImmo/test_imap.py']
@@ -0,0 +1,58 @@
+"""
+Shared helpers for the campaign scripts (env, CSV, progress, templates, SMTP, send loop)
+Names are resolved lazily so that importing the package stays cheap: smtplib,
+ssl, email.mime, jinja2 and python-dotenv are only imported by the code
+paths that actually need them.
+"""
+import importlib
+
+_EXPORTS = {
+    'load_env': 'env',
+    'load_dotenv_once': 'env',
+    'env_flag': 'env',
+    'read_csv_rows_with_dialect': 'csv_io',
+    'write_csv_rows': 'csv_io',
+    'update_csv_rows': 'csv_io',
+    'atomic_write': 'csv_io',
+    'load_exclusion_set': 'csv_io',
+    'format_progress': 'progress',
+    'load_template': 'templates',
+    'send_email': 'mailer',
+    'classify_smtp_error': 'sender',
+    'RetryQueue': 'sender',
+    'run_send_loop': 'sender',
+    'AIMDRate': 'rate',
+    'DomainQueues': 'scheduling',
+    'CompanyCap': 'scheduling',
+    'build_queues': 'scheduling',
+    'contact_timezone': 'timezones',
+    'score_contact': 'scoring',
+    'prioritize': 'scoring',
+    'SendWindow': 'timezones',
+    'is_throttling': 'rate',
+    'make_message_id': 'mailer',
+    'prepare_email': 'mailer',
+    'send_prepared': 'mailer',
+    'message_id_domain': 'mailer',
+    'METRICS': 'metrics',
+    'PhaseTimer': 'metrics',
+    'start_profiling': 'profiling',
+    'SendStatus': 'status',
+    'start_status_server': 'status',
+    'setup_logging': 'logs',
+    'SkipCounter': 'logs',
+    'get_transport': 'transports',
+    'presign': 'dkim_signing',
+    'make_token': 'tracking',
+    'read_token': 'tracking',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'lemlist_core' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
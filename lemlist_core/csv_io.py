@@ -0,0 +1,123 @@
+"""
+CSV reading/writing with delimiter sniffing (lemlist and Apollo exports)
+"""
+import contextlib
+import csv
+import os
+
+def read_csv_rows_with_dialect(csv_path, normalize_headers=False):
+    """Return (rows, dialect, fieldnames)
+
+    normalize_headers adds email/first_name/last_name/company_name columns
+    when only the Apollo-style headers (Email, First Name, ...) are present.
+    """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
+        except Exception:
+            class _D: delimiter = ';'
+            dialect = _D()
+        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
+        rows = list(reader)
+        fieldnames = list(reader.fieldnames or [])
+
+    if normalize_headers:
+        # Ensure normalized keys exist when Apollo-style headers are present
+        renamed = False
+        if 'email' not in fieldnames and 'Email' in fieldnames:
+            fieldnames.append('email'); renamed = True
+        if 'first_name' not in fieldnames and 'First Name' in fieldnames:
+            fieldnames.append('first_name'); renamed = True
+        if 'last_name' not in fieldnames and 'Last Name' in fieldnames:
+            fieldnames.append('last_name'); renamed = True
+        if 'company_name' not in fieldnames and 'Company Name' in fieldnames:
+            fieldnames.append('company_name'); renamed = True
+        if renamed:
+            for r in rows:
+                if 'email' not in r and 'Email' in r:
+                    r['email'] = (r.get('Email') or '').strip()
+                if 'first_name' not in r and ('First Name' in r or 'firstName' in r):
+                    r['first_name'] = (r.get('First Name') or r.get('firstName') or '').strip()
+                if 'last_name' not in r and ('Last Name' in r or 'lastName' in r):
+                    r['last_name'] = (r.get('Last Name') or r.get('lastName') or '').strip()
+                if 'company_name' not in r and ('Company Name' in r or 'companyName' in r):
+                    r['company_name'] = (r.get('Company Name') or r.get('companyName') or '').strip()
+    return rows, dialect, fieldnames
+
+def write_csv_rows(csv_path, rows, dialect, fieldnames):
+    delimiter = getattr(dialect, 'delimiter', ';')
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=delimiter)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', **open_kwargs):
+    """Open path.tmp for writing and rename it over path once the block is done
+
+    Readers (scrapers, MTA pickup, other tools) see the old file or the new
+    one, never half of it. The temporary file is removed if the block fails.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, mode, **open_kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+def update_csv_rows(csv_path, updates):
+    """Re-read the CSV, set the given fields on rows by email, write it back
+
+    updates maps email -> {field: value}; missing columns are appended. Other
+    tools' changes made since the caller loaded the file are kept.
+    Returns (updated_emails, missing_emails).
+    """
+    rows, dialect, fieldnames = read_csv_rows_with_dialect(csv_path)
+    index = {}
+    for row in rows:
+        email = (row.get('email') or '').strip().lower()
+        if email:
+            index.setdefault(email, row)
+    updated, missing = [], []
+    for email, fields in updates.items():
+        row = index.get(email.strip().lower())
+        if row is None:
+            missing.append(email)
+            continue
+        for field in fields:
+            if field not in fieldnames:
+                fieldnames.append(field)
+        row.update(fields)
+        updated.append(email)
+    if updated:
+        write_csv_rows(csv_path, rows, dialect, fieldnames)
+    return updated, missing
+
+def load_exclusion_set(path):
+    """Lowercased emails from a CSV file, or from every CSV under a directory"""
+    excluded = set()
+    if not path or not os.path.exists(path):
+        return excluded
+    def add_from_csv(csv_file):
+        try:
+            rows, _, _ = read_csv_rows_with_dialect(csv_file, normalize_headers=True)
+        except Exception:
+            return
+        for row in rows:
+            email = (row.get('email') or '').strip().lower()
+            if email:
+                excluded.add(email)
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in files:
+                if name.lower().endswith('.csv'):
+                    add_from_csv(os.path.join(root, name))
+    else:
+        add_from_csv(path)
+    return excluded
@@ -0,0 +1,129 @@
+"""
+Optional DKIM signing (dkimpy)
+Enabled by DKIM_KEY_PATH + DKIM_SELECTOR (DKIM_DOMAIN defaults to the domain
+of SMTP_USER). The key is read and checked once per process. send_email signs
+inline; the senders presign their whole run instead (PresignedMessages): the
+messages are built up front and signed in batches of DKIM_BATCH_SIZE on
+DKIM_WORKERS processes while the send loop is already running, so the RSA
+work (~8 ms per message with a 2048-bit key, pure Python) stays out of the
+delivery path. Without dkimpy installed (pip install dkimpy) messages go out
+unsigned and an error is logged once.
+"""
+import functools
+import logging
+import os
+
+# Relaxed headers survive the folding/whitespace changes relays make, simple body
+# keeps the check strict on the content
+CANONICALIZE = (b'relaxed', b'simple')
+SIGNED_HEADERS = (b'from', b'to', b'subject', b'message-id', b'reply-to', b'mime-version', b'content-type')
+
+class DKIMSigner:
+    def __init__(self, selector, domain, key):
+        self.selector = selector
+        self.domain = domain
+        self.key = key
+
+    @property
+    def params(self):
+        return (self.selector, self.domain, self.key)
+
+    def sign(self, data):
+        """DKIM-Signature header line (CRLF-terminated) for CRLF message bytes"""
+        import dkim
+
+        return dkim.sign(data, self.selector, self.domain, self.key,
+                         canonicalize=CANONICALIZE, include_headers=list(SIGNED_HEADERS))
+
+@functools.lru_cache(maxsize=None)
+def _load_signer(key_path, selector, domain):
+    try:
+        import dkim
+        from dkim.crypto import parse_pem_private_key
+    except ImportError:
+        logging.error("❌ DKIM_KEY_PATH défini mais dkimpy n'est pas installé (pip install dkimpy) : envoi sans signature")
+        return None
+    with open(key_path, 'rb') as f:
+        key = f.read()
+    try:
+        parse_pem_private_key(key)  # Fail here, once, rather than on every message
+    except Exception as e:
+        raise dkim.KeyFormatError(f"{key_path}: {e}")
+    logging.info(f"🔏 Signature DKIM {selector.decode()}._domainkey.{domain.decode()}")
+    return DKIMSigner(selector, domain, key)
+
+def get_signer(cfg):
+    """Process-wide DKIMSigner for the config, None when DKIM is off or dkimpy is missing"""
+    key_path, selector = cfg.get("DKIM_KEY_PATH"), cfg.get("DKIM_SELECTOR")
+    if not (key_path and selector):
+        return None
+    domain = cfg.get("DKIM_DOMAIN") or (cfg.get("SMTP_USER") or '').rsplit('@', 1)[-1]
+    return _load_signer(os.path.abspath(key_path), selector.encode('ascii'), domain.lower().encode('ascii'))
+
+def sign_email(cfg, email):
+    """Prepend the DKIM-Signature to a prepared email (mailer.prepare_email) when DKIM is on"""
+    signer = get_signer(cfg)
+    if signer is not None:
+        email['data'] = signer.sign(email['data']) + email['data']
+    return email
+
+_worker_signer = None
+
+def _init_worker(selector, domain, key):
+    global _worker_signer
+    _worker_signer = DKIMSigner(selector, domain, key)
+
+def _sign_batch(messages):
+    return [_worker_signer.sign(data) for data in messages]
+
+class PresignedMessages:
+    """Every job's email built now and signed in background batches
+
+    build(job) returns a mailer.prepare_email() dict; get(job) hands it back
+    signed, waiting for its batch only if the pool has not got to it yet.
+    """
+
+    def __init__(self, signer, jobs, build, batch_size=50, workers=None):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.signer = signer
+        self.pending = {}  # id(job) -> (future, position in its batch)
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                        initializer=_init_worker, initargs=signer.params)
+        batch = []
+        for job in jobs:
+            job['email_message'] = build(job)
+            batch.append(job)
+            if len(batch) >= batch_size:
+                self._submit(batch)
+                batch = []
+        if batch:
+            self._submit(batch)
+        # Workers exit once the queued batches are signed
+        self.pool.shutdown(wait=False)
+
+    def _submit(self, batch):
+        future = self.pool.submit(_sign_batch, [job['email_message']['data'] for job in batch])
+        for position, job in enumerate(batch):
+            self.pending[id(job)] = (future, position)
+
+    def get(self, job):
+        email = job['email_message']
+        entry = self.pending.get(id(job))
+        if entry is not None:
+            future, position = entry
+            try:
+                signature = future.result()[position]
+            except Exception as e:
+                logging.warning(f"⚠️ Signature DKIM en lot échouée ({e}), signature directe")
+                signature = self.signer.sign(email['data'])
+            email['data'] = signature + email['data']
+            del self.pending[id(job)]
+        return email
+
+def presign(cfg, jobs, build):
+    """PresignedMessages for the run, or None when DKIM is off (send_email then builds each message)"""
+    signer = get_signer(cfg)
+    if signer is None or not jobs:
+        return None
+    return PresignedMessages(signer, jobs, build, cfg.get("DKIM_BATCH_SIZE", 50), cfg.get("DKIM_WORKERS") or None)
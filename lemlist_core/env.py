@@ -0,0 +1,86 @@
+"""
+.env loading, done once per process
+"""
+import functools
+import os
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def env_flag(name, default="false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+@functools.lru_cache(maxsize=None)
+def load_dotenv_once(campaign_dir=None):
+    """Load the campaign folder .env, then the repo root .env (first value wins)"""
+    from dotenv import load_dotenv
+
+    paths = []
+    if campaign_dir:
+        paths.append(os.path.join(os.path.abspath(campaign_dir), '.env'))
+    paths.append(os.path.join(REPO_ROOT, '.env'))
+    for path in dict.fromkeys(paths):
+        if os.path.exists(path):
+            load_dotenv(path)
+
+def load_env(campaign_dir=None, **defaults):
+    """SMTP settings plus campaign keys given as KEY=default
+
+    The type of each default (bool/int/str) decides how the env value is parsed.
+    """
+    load_dotenv_once(campaign_dir)
+    cfg = {
+        "SMTP_HOST": os.getenv("SMTP_HOST"),
+        "SMTP_PORT": int(os.getenv("SMTP_PORT", 587)),
+        "SMTP_USER": os.getenv("SMTP_USER"),
+        "SMTP_PASS": os.getenv("SMTP_PASS"),
+        "SENDER_NAME": os.getenv("SENDER_NAME", os.getenv("SMTP_USER")),
+        "REPLY_TO": os.getenv("REPLY_TO", os.getenv("SMTP_USER")),
+        "SMTP_USE_SSL": env_flag("SMTP_USE_SSL"),
+        "SMTP_STARTTLS": env_flag("SMTP_STARTTLS", "true"),
+        "SMTP_ALLOW_INSECURE_TLS": env_flag("SMTP_ALLOW_INSECURE_TLS"),
+        "SMTP_DEBUG": env_flag("SMTP_DEBUG"),
+        # smtp (default), pickup (local MTA pickup dir), maildir (spool for a relay) or file (mbox, tests)
+        "TRANSPORT": os.getenv("TRANSPORT", "smtp"),
+        "TRANSPORT_PATH": os.getenv("TRANSPORT_PATH", ""),
+        # DKIM signing (needs dkimpy): private key PEM, selector, d= domain (default: SMTP_USER's)
+        "DKIM_KEY_PATH": os.getenv("DKIM_KEY_PATH", ""),
+        "DKIM_SELECTOR": os.getenv("DKIM_SELECTOR", ""),
+        "DKIM_DOMAIN": os.getenv("DKIM_DOMAIN", ""),
+        "DKIM_BATCH_SIZE": int(os.getenv("DKIM_BATCH_SIZE", 50)),
+        "DKIM_WORKERS": int(os.getenv("DKIM_WORKERS", 0)),  # 0 = one per CPU
+        # Per-phase SMTP latency histograms: *.prom = Prometheus textfile, else JSON (empty = not written)
+        "SMTP_METRICS_PATH": os.getenv("SMTP_METRICS_PATH", ""),
+        "SMTP_METRICS_INTERVAL": int(os.getenv("SMTP_METRICS_INTERVAL", 15)),
+        # Transient SMTP failures (4xx, timeouts) are retried with exponential backoff
+        "RETRY_MAX_ATTEMPTS": int(os.getenv("RETRY_MAX_ATTEMPTS", 4)),
+        "RETRY_BASE_DELAY": int(os.getenv("RETRY_BASE_DELAY", 60)),
+        "RETRY_MAX_DELAY": int(os.getenv("RETRY_MAX_DELAY", 1800)),
+        # Bounds for --adaptive pacing (seconds between sends) and its additive step (msgs/hour)
+        "SEND_DELAY_MIN": int(os.getenv("SEND_DELAY_MIN", 30)),
+        "SEND_DELAY_MAX": int(os.getenv("SEND_DELAY_MAX", 900)),
+        "SEND_RATE_STEP": float(os.getenv("SEND_RATE_STEP", 1)),
+        # Seconds before the same recipient domain gets another email, 0 = off (DOMAIN_COOLDOWNS="gmail.com=60,...")
+        "DOMAIN_COOLDOWN": int(os.getenv("DOMAIN_COOLDOWN", 0)),
+        "DOMAIN_COOLDOWNS": os.getenv("DOMAIN_COOLDOWNS", ""),
+        "MAX_PER_COMPANY": int(os.getenv("MAX_PER_COMPANY", 0)),
+        # Local business hours of the recipient, e.g. "09:00-18:00" (empty = send any time), weekdays 0=Monday
+        "SEND_WINDOW": os.getenv("SEND_WINDOW", ""),
+        "SEND_WEEKDAYS": os.getenv("SEND_WEEKDAYS", "0-4"),
+        "DEFAULT_TIMEZONE": os.getenv("DEFAULT_TIMEZONE", "Europe/Paris"),
+        # Only send to contacts whose lemlist emailStatus is "deliverable" (else they just go last)
+        "SKIP_UNVERIFIED": env_flag("SKIP_UNVERIFIED"),
+        # Live JSON status of the send loop on http://STATUS_HOST:STATUS_PORT/status (0 = off)
+        "STATUS_PORT": int(os.getenv("STATUS_PORT", 0)),
+        "STATUS_HOST": os.getenv("STATUS_HOST", "127.0.0.1"),
+    }
+    for key, default in defaults.items():
+        value = os.getenv(key)
+        if value is None:
+            cfg[key] = default
+        elif isinstance(default, bool):
+            cfg[key] = value.lower() in ("1", "true", "yes")
+        elif isinstance(default, int):
+            cfg[key] = int(value)
+        else:
+            cfg[key] = value
+    return cfg
@@ -0,0 +1,93 @@
+"""
+Log setup for the senders and aggregated skip reporting
+LOG_FORMAT=json writes one JSON object per line (extra= fields included)
+instead of the "time | level | message" text lines. Rows skipped while
+building the send list are counted per reason: only a sample of them is
+logged in detail (the first one of each reason, then one in LOG_SKIP_SAMPLE,
+0 = none) and the counters are summarised every LOG_SUMMARY_INTERVAL seconds
+and once at the end.
+"""
+import collections
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from .env import load_dotenv_once
+from .progress import format_progress
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
+
+# Attributes every LogRecord has: anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def setup_logging(campaign_dir=None):
+    """basicConfig in the format picked by LOG_FORMAT (text or json, read from the campaign .env too)"""
+    load_dotenv_once(campaign_dir)
+    handler = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+
+class SkipCounter:
+    """Per-reason counts of the rows left out of a run, with sampled detail lines
+
+    messages maps each reason to a str.format template ({email}, {stage} and
+    the keyword arguments given to skip()); it is only formatted for sampled rows.
+    """
+
+    def __init__(self, stage, total, messages, sample=None, interval=None, clock=time.monotonic):
+        self.stage = stage
+        self.total = total
+        self.messages = messages
+        self.sample = int(os.getenv("LOG_SKIP_SAMPLE", 100)) if sample is None else sample
+        self.interval = float(os.getenv("LOG_SUMMARY_INTERVAL", 10)) if interval is None else interval
+        self.clock = clock
+        self.counts = collections.Counter()
+        self.position = 0
+        self.last_summary = clock()
+
+    def skip(self, reason, index, email, **detail):
+        self.counts[reason] += 1
+        self.position = index
+        count = self.counts[reason]
+        if self.sample and (count == 1 or count % self.sample == 0):
+            message = self.messages[reason].format(email=email, stage=self.stage, **detail)
+            logging.info(f"{format_progress(index, self.total)} {message}",
+                         extra={'event': 'skip', 'stage': self.stage, 'reason': reason, 'row': index,
+                                'email': email, 'reason_count': count, **detail})
+        if self.interval and self.clock() - self.last_summary >= self.interval:
+            self.summary()
+
+    def seen(self, index):
+        """Note progress on a row that was kept, for the interval summaries"""
+        self.position = index
+        if self.interval and self.clock() - self.last_summary >= self.interval:
+            self.summary()
+
+    def summary(self, final=False):
+        self.last_summary = self.clock()
+        if not self.counts:
+            return
+        detail = ', '.join(f"{reason} {count}" for reason, count in self.counts.most_common())
+        logging.info(f"{'🧾 Lignes écartées' if final else '🧾 En cours'} ({self.stage}, {self.position}/{self.total}) : "
+                     f"{sum(self.counts.values())} — {detail}",
+                     extra={'event': 'skip_summary', 'stage': self.stage, 'final': final, 'row': self.position,
+                            'total': self.total, 'skipped': dict(self.counts)})
@@ -0,0 +1,88 @@
+"""
+Building and sending the campaign emails
+smtplib, ssl and email.mime are imported on first send, so tools that never
+send (dry runs, CSV maintenance) do not pay for them at startup.
+"""
+import logging
+import os
+
+def message_id_domain(sender_email):
+    """Domain used on the right-hand side of our Message-IDs"""
+    return (sender_email or '').rsplit('@', 1)[-1].strip().lower() or 'localhost'
+
+def make_message_id(sender_email):
+    """Generate a globally unique Message-ID for an outbound email"""
+    from email.utils import make_msgid
+    return make_msgid(domain=message_id_domain(sender_email))
+
+def build_message(smtp_cfg, subject, html_body, recipient):
+    """MIME message for one recipient, with a generated Message-ID"""
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = f"{smtp_cfg['SENDER_NAME']} <{smtp_cfg['SMTP_USER']}>"
+    msg["To"] = recipient["email"]
+    msg["Reply-To"] = smtp_cfg["REPLY_TO"]
+    msg["Message-ID"] = make_message_id(smtp_cfg["SMTP_USER"])
+    msg.attach(MIMEText(html_body, "html", "utf-8"))
+    return msg
+
+def ssl_context(smtp_cfg):
+    """TLS context, using the local CA certificate (SMTP_CA_CERT) when present"""
+    import ssl
+
+    # ✅ Crée un contexte SSL propre
+    try:
+        # Si tu as un fichier certif local (exporté via openssl)
+        cert_path = os.getenv("SMTP_CA_CERT", "zimbra_cert.pem")
+        if os.path.exists(cert_path):
+            context = ssl.create_default_context(cafile=cert_path)
+            logging.info(f"Utilisation du certificat local : {cert_path}")
+        else:
+            context = ssl.create_default_context()
+    except Exception as e:
+        logging.warning(f"Impossible de charger le certificat local : {e}")
+        context = ssl.create_default_context()
+
+    # ✅ Si on autorise les connexions "faibles" (auto-signées)
+    if smtp_cfg.get("SMTP_ALLOW_INSECURE_TLS"):
+        logging.warning("⚠️ TLS non vérifié activé : certificat auto-signé accepté")
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+def prepare_email(smtp_cfg, subject, html_body, recipient):
+    """Message bytes (CRLF) and envelope for one recipient, plus BCC_EMAIL when configured"""
+    msg = build_message(smtp_cfg, subject, html_body, recipient)
+    to_addrs = [recipient["email"]]
+    bcc = (smtp_cfg.get("BCC_EMAIL") or "").strip()
+    if bcc:
+        to_addrs.append(bcc)
+    return {
+        'message_id': msg["Message-ID"],
+        'from': smtp_cfg["SMTP_USER"],
+        'to': to_addrs,
+        'data': msg.as_bytes(policy=msg.policy.clone(linesep="\r\n")),
+    }
+
+def send_prepared(smtp_cfg, email):
+    """Hand a prepare_email() message to the transport, return its Message-ID"""
+    from .transports import get_transport
+
+    get_transport(smtp_cfg).send(email['data'], email['from'], email['to'])
+    return email['message_id']
+
+def send_email(smtp_cfg, subject, html_body, recipient):
+    """Send one email (plus BCC_EMAIL when configured), return its Message-ID
+
+    The message goes to the relay over SMTP, or to a local spool, depending
+    on TRANSPORT (see lemlist_core.transports), DKIM-signed when DKIM_KEY_PATH
+    is set. SMTP phases are timed into lemlist_core.metrics (exported to
+    SMTP_METRICS_PATH when set).
+    """
+    from .dkim_signing import sign_email
+
+    email = sign_email(smtp_cfg, prepare_email(smtp_cfg, subject, html_body, recipient))
+    return send_prepared(smtp_cfg, email)
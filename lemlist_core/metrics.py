@@ -0,0 +1,187 @@
+"""
+SMTP latency histograms and send counters
+send_email times every protocol phase (dns, connect, tls, auth, envelope,
+data) and records it here per sender account and per recipient domain. The
+registry is written to SMTP_METRICS_PATH at most every SMTP_METRICS_INTERVAL
+seconds and at exit, as a Prometheus textfile (*.prom, for the node_exporter
+textfile collector) or a JSON snapshot (any other name).
+"""
+import atexit
+import contextlib
+import json
+import threading
+import time
+
+PHASES = ('dns', 'connect', 'tls', 'auth', 'envelope', 'data')
+
+# Upper bounds in seconds (Prometheus "le"), +Inf is implicit
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class PhaseTimer:
+    """Exclusive wall time per phase: a nested phase is not counted again in its parent
+
+    `current` is the phase running, or the last one entered (the one that
+    failed, after an exception).
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.current = None
+        self._stack = []  # [name, seconds spent in nested phases]
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.current = name
+        started = time.perf_counter()
+        self._stack.append([name, 0.0])
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - self._stack.pop()[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+                if not failed:
+                    self.current = self._stack[-1][0]
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        total, result = 0, []
+        for value in self.counts:
+            total += value
+            result.append(total)
+        return result
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in zip(BUCKETS + (None,), self.cumulative()):
+            if total >= rank:
+                return bound
+        return None
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+class SMTPMetrics:
+    """Thread-safe registry of phase histograms and send outcomes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_account = {}  # (account, phase) -> Histogram
+        self.by_domain = {}   # (domain, phase) -> Histogram
+        self.sends = {}       # (account, domain, outcome) -> count
+        self.failed_phases = {}  # (account, domain, phase) -> count
+        self.last_export = 0.0
+        self._exit_path = None
+
+    def record(self, account, domain, phases, outcome, failed_phase=None):
+        """Add one send: {phase: seconds}, outcome 'sent' or 'failed' (and where it failed)"""
+        account, domain = account or 'unknown', domain or 'unknown'
+        with self.lock:
+            for phase, seconds in phases.items():
+                self.by_account.setdefault((account, phase), Histogram()).observe(seconds)
+                self.by_domain.setdefault((domain, phase), Histogram()).observe(seconds)
+            key = (account, domain, outcome)
+            self.sends[key] = self.sends.get(key, 0) + 1
+            if failed_phase:
+                key = (account, domain, failed_phase)
+                self.failed_phases[key] = self.failed_phases.get(key, 0) + 1
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for family, label, histograms in (
+                ('lemlist_smtp_phase_seconds', 'account', self.by_account),
+                ('lemlist_smtp_domain_phase_seconds', 'domain', self.by_domain),
+            ):
+                lines.append(f"# HELP {family} SMTP protocol phase duration per {'sender account' if label == 'account' else 'recipient domain'}")
+                lines.append(f"# TYPE {family} histogram")
+                for (value, phase), histogram in sorted(histograms.items()):
+                    for bound, total in zip(BUCKETS + ('+Inf',), histogram.cumulative()):
+                        lines.append(f"{family}_bucket{{{_labels(**{label: value}, phase=phase, le=bound)}}} {total}")
+                    lines.append(f"{family}_sum{{{_labels(**{label: value}, phase=phase)}}} {histogram.sum:.6f}")
+                    lines.append(f"{family}_count{{{_labels(**{label: value}, phase=phase)}}} {histogram.count}")
+            lines.append("# HELP lemlist_smtp_sends_total Send attempts by outcome")
+            lines.append("# TYPE lemlist_smtp_sends_total counter")
+            for (account, domain, outcome), total in sorted(self.sends.items()):
+                lines.append(f"lemlist_smtp_sends_total{{{_labels(account=account, domain=domain, outcome=outcome)}}} {total}")
+            lines.append("# HELP lemlist_smtp_failures_total Failed send attempts by the phase that failed")
+            lines.append("# TYPE lemlist_smtp_failures_total counter")
+            for (account, domain, phase), total in sorted(self.failed_phases.items()):
+                lines.append(f"lemlist_smtp_failures_total{{{_labels(account=account, domain=domain, phase=phase)}}} {total}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """JSON-friendly view: per account and per domain, phase -> count/sum/p50/p90/p99/buckets"""
+        def describe(histograms):
+            result = {}
+            for (value, phase), histogram in sorted(histograms.items()):
+                result.setdefault(value, {})[phase] = {
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'p50': histogram.quantile(0.5),
+                    'p90': histogram.quantile(0.9),
+                    'p99': histogram.quantile(0.99),
+                    'buckets': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'], histogram.cumulative())),
+                }
+            return result
+
+        with self.lock:
+            return {
+                'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'by_account': describe(self.by_account),
+                'by_domain': describe(self.by_domain),
+                'sends': [{'account': account, 'domain': domain, 'outcome': outcome, 'count': total}
+                          for (account, domain, outcome), total in sorted(self.sends.items())],
+                'failures': [{'account': account, 'domain': domain, 'phase': phase, 'count': total}
+                             for (account, domain, phase), total in sorted(self.failed_phases.items())],
+            }
+
+    def export(self, path):
+        """Write the registry to path, Prometheus text for *.prom, else JSON"""
+        from .csv_io import atomic_write
+
+        if path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=1)
+        with atomic_write(path, encoding='utf-8') as f:
+            f.write(content)
+        self.last_export = time.monotonic()
+
+    def export_if_due(self, path, interval=15):
+        """Export when `interval` seconds passed since the last one; always once more at exit"""
+        if not path:
+            return
+        if self._exit_path != path:
+            self._exit_path = path
+            atexit.register(self.export, path)
+        if time.monotonic() - self.last_export >= interval:
+            self.export(path)
+
+METRICS = SMTPMetrics()
@@ -0,0 +1,109 @@
+"""
+--profile switch shared by the entry points
+`python merge_all_contacts.py --profile` (or PROFILE=1 in the environment)
+runs the script under cProfile and tracemalloc and, at exit, writes next to
+its output (PROFILE_DIR, else the given directory, else the current one):
+  profile_<name>_<timestamp>.pstats     call graph, for pstats / snakeviz / gprof2dot
+  profile_<name>_<timestamp>.txt        top functions by cumulative time, with their callers
+  profile_<name>_<timestamp>.alloc.txt  top allocation sites near the memory peak
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+
+from .env import env_flag
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 30
+
+class _PeakSampler(threading.Thread):
+    """Keep the tracemalloc snapshot taken at the highest traced size seen
+
+    By exit the big lists are gone, so a snapshot taken then says little about
+    what made the run heavy. Sampled every PROFILE_SNAPSHOT_INTERVAL seconds,
+    re-snapshotted only once memory grew 10% past the kept one.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='profile-peak-sampler', daemon=True)
+        self.interval = interval
+        self.size = 0
+        self.snapshot = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        import tracemalloc
+
+        while not self.stopped.wait(self.interval):
+            if not tracemalloc.is_tracing():
+                return
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.size * 1.1:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.size = current
+
+def start_profiling(name, output_dir=None, argv=None):
+    """Start profiling when --profile is on the command line or PROFILE is set
+
+    Removes --profile from argv (sys.argv by default) so the script's own
+    parsing never sees it. Returns the report prefix, or None when off.
+    """
+    argv = sys.argv if argv is None else argv
+    requested = '--profile' in argv
+    while '--profile' in argv:
+        argv.remove('--profile')
+    if not (requested or env_flag('PROFILE')):
+        return None
+
+    import cProfile
+    import tracemalloc
+
+    output_dir = os.getenv('PROFILE_DIR') or output_dir or os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = os.path.join(output_dir, f"profile_{name}_{time.strftime('%Y%m%d_%H%M%S')}")
+    # Several frames per trace so allocations point at our code, not at csv/email internals
+    tracemalloc.start(int(os.getenv('PROFILE_TRACE_FRAMES', 5)))
+    sampler = _PeakSampler(float(os.getenv('PROFILE_SNAPSHOT_INTERVAL', 1.0)))
+    sampler.start()
+    profiler = cProfile.Profile()
+    atexit.register(_write_reports, profiler, sampler, prefix)
+    profiler.enable()
+    print(f"🔬 Profiling on, reports: {prefix}.*", file=sys.stderr)
+    return prefix
+
+def _write_reports(profiler, sampler, prefix):
+    import pstats
+    import tracemalloc
+
+    profiler.disable()
+    sampler.stopped.set()
+    sampler.join()
+    current, peak = tracemalloc.get_traced_memory()
+    if sampler.snapshot is not None and sampler.size > current:
+        snapshot, taken_at = sampler.snapshot, f"sampled at {sampler.size / (1024 * 1024):.1f} MiB"
+    else:
+        snapshot, taken_at = tracemalloc.take_snapshot(), "taken at exit"
+    tracemalloc.stop()
+
+    profiler.dump_stats(prefix + '.pstats')
+    with open(prefix + '.txt', 'w', encoding='utf-8') as f:
+        stats = pstats.Stats(profiler, stream=f).strip_dirs().sort_stats('cumulative')
+        stats.print_stats(TOP_FUNCTIONS)
+        stats.print_callers(TOP_FUNCTIONS)
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+    with open(prefix + '.alloc.txt', 'w', encoding='utf-8') as f:
+        f.write(f"Peak traced memory: {peak / (1024 * 1024):.1f} MiB, still allocated at exit: {current / (1024 * 1024):.1f} MiB\n")
+        f.write(f"Top allocation sites, snapshot {taken_at}:\n\n")
+        for index, stat in enumerate(snapshot.statistics('traceback')[:TOP_ALLOCATIONS], 1):
+            f.write(f"#{index}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format(most_recent_first=True):
+                f.write(f"    {line}\n")
+            f.write("\n")
+    print(f"🔬 Profile written: {prefix}.pstats, {prefix}.txt, {prefix}.alloc.txt", file=sys.stderr)
@@ -0,0 +1,13 @@
+"""
+Text progress bar used in the send logs
+"""
+
+def format_progress(current: int, total: int, width: int = 30) -> str:
+    if total <= 0:
+        return "[" + ("-" * width) + "] 0/0 (0%)"
+    filled = int(width * current / total)
+    if filled > width:
+        filled = width
+    bar = "#" * filled + "-" * (width - filled)
+    percent = int((current / total) * 100)
+    return f"[{bar}] {current}/{total} ({percent}%)"
@@ -0,0 +1,66 @@
+"""
+Adaptive send pacing (AIMD)
+The send rate grows by a fixed step after each clean delivery and is cut
+multiplicatively when the relay pushes back (421/450/451/452, "too many
+messages" replies) or its response time climbs, always within
+[SEND_DELAY_MIN, SEND_DELAY_MAX] seconds between messages.
+"""
+import logging
+import re
+
+THROTTLE_CODES = (421, 450, 451, 452)
+THROTTLE_RE = re.compile(r'too many|rate limit|try again later|throttl|exceeded|slow down', re.IGNORECASE)
+
+def is_throttling(code, message):
+    """True when an SMTP reply means the relay wants us to slow down"""
+    return code in THROTTLE_CODES or bool(THROTTLE_RE.search(message or ''))
+
+class AIMDRate:
+    """Delay between sends, adapted with additive increase / multiplicative decrease of the rate"""
+
+    def __init__(self, delay, min_delay=30, max_delay=900, step_per_hour=1.0,
+                 decrease=0.5, latency_factor=2.0, alpha=0.2):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.step_per_hour = step_per_hour
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.alpha = alpha
+        self.rate = 3600.0 / min(max(delay, min_delay), max_delay)  # messages per hour
+        self.latency = None       # EWMA of send_one durations
+        self.base_latency = None  # lowest EWMA seen, the relay's "normal" speed
+        self.samples = 0
+
+    @classmethod
+    def from_config(cls, cfg, delay):
+        return cls(delay, cfg["SEND_DELAY_MIN"], cfg["SEND_DELAY_MAX"], cfg["SEND_RATE_STEP"])
+
+    @property
+    def delay(self):
+        return min(max(3600.0 / self.rate, self.min_delay), self.max_delay)
+
+    def _clamp(self):
+        self.rate = min(max(self.rate, 3600.0 / self.max_delay), 3600.0 / self.min_delay)
+
+    def _cut(self, factor, reason):
+        before = self.delay
+        self.rate *= factor
+        self._clamp()
+        logging.warning(f"🐢 {reason} : pause entre envois {int(before)}s → {int(self.delay)}s")
+
+    def on_success(self, latency):
+        """Record a delivered message and how long the SMTP exchange took"""
+        self.samples += 1
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        if self.samples >= 3:
+            self.base_latency = self.latency if self.base_latency is None else min(self.base_latency, self.latency)
+        if self.base_latency and self.latency > self.base_latency * self.latency_factor:
+            # Slowing relay: back off gently before it starts refusing
+            self._cut(0.9, f"Relais ralenti ({self.latency:.1f}s contre {self.base_latency:.1f}s)")
+            return
+        self.rate += self.step_per_hour
+        self._clamp()
+
+    def on_throttle(self, code, message):
+        detail = f"{code} {message[:80]}" if code else message[:80]
+        self._cut(self.decrease, f"Limitation du relais ({detail})")
@@ -0,0 +1,145 @@
+"""
+Send order: per-domain queues served round-robin, local time windows, per-company caps
+Contacts sharing a mail domain are spread out (each domain waits
+DOMAIN_COOLDOWN seconds after a delivery) while other domains keep the
+global pace busy. With a SEND_WINDOW, contacts are further grouped by time
+zone and only the zones currently in business hours are served.
+"""
+import collections
+import time
+from datetime import datetime, timezone
+
+from .timezones import SendWindow
+
+def recipient_domain(email):
+    return (email or '').rsplit('@', 1)[-1].strip().lower()
+
+def company_key(row):
+    """Company a contact belongs to (lemlist companyDomain, else company name); '' if unknown"""
+    return (row.get('companyDomain') or row.get('company_name') or row.get('companyName') or '').strip().lower()
+
+def parse_domain_cooldowns(value):
+    """'gmail.com=60,orange.fr=300' -> {'gmail.com': 60, 'orange.fr': 300}"""
+    overrides = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            domain, seconds = item.split('=', 1)
+            overrides[domain.strip().lower()] = int(seconds)
+    return overrides
+
+class DomainQueues:
+    """Fresh jobs grouped by job['domain'], served round-robin with a per-domain cooldown"""
+
+    def __init__(self, jobs, cooldown=0, overrides=None, clock=time.monotonic):
+        self.cooldown = cooldown
+        self.overrides = overrides or {}
+        self.clock = clock
+        self.queues = collections.OrderedDict()
+        for job in jobs:
+            self.queues.setdefault(job.get('domain', ''), collections.deque()).append(job)
+        self.ready_at = {}
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def pop(self):
+        """Next job from the first domain out of cooldown, or None if all are cooling down"""
+        now = self.clock()
+        for domain in list(self.queues):
+            if self.ready_at.get(domain, 0) > now:
+                continue
+            queue = self.queues.pop(domain)
+            job = queue.popleft()
+            if queue:
+                self.queues[domain] = queue  # back of the rotation
+            return job
+        return None
+
+    def mark_sent(self, job):
+        domain = job.get('domain', '')
+        self.ready_at[domain] = self.clock() + self.overrides.get(domain, self.cooldown)
+
+    def seconds_until_ready(self):
+        if not self.queues:
+            return None
+        now = self.clock()
+        return max(0.0, min(self.ready_at.get(domain, 0) - now for domain in self.queues))
+
+class WindowQueues:
+    """DomainQueues per contact time zone (job['tz']), served only while the zone is in its send window"""
+
+    def __init__(self, jobs, window, cooldown=0, overrides=None, default_tz='Europe/Paris', clock=time.monotonic, now=None):
+        self.window = window
+        self.default_tz = default_tz
+        self.now = now or (lambda: datetime.now(timezone.utc))
+        grouped = collections.OrderedDict()
+        for job in jobs:
+            grouped.setdefault(job.get('tz') or self.default_tz, []).append(job)
+        self.groups = collections.OrderedDict(
+            (zone, DomainQueues(zone_jobs, cooldown, overrides, clock)) for zone, zone_jobs in grouped.items()
+        )
+
+    def __len__(self):
+        return sum(len(group) for group in self.groups.values())
+
+    def pop(self):
+        """Next ready job among the zones currently in-window (zones take turns), or None"""
+        now = self.now()
+        for zone in list(self.groups):
+            group = self.groups[zone]
+            if not len(group):
+                del self.groups[zone]
+                continue
+            if not self.window.is_open(zone, now):
+                continue
+            job = group.pop()
+            if job is not None:
+                self.groups.move_to_end(zone)
+                return job
+        return None
+
+    def mark_sent(self, job):
+        group = self.groups.get(job.get('tz') or self.default_tz)
+        if group is not None:
+            group.mark_sent(job)
+
+    def seconds_until_ready(self):
+        now = self.now()
+        waits = []
+        for zone, group in self.groups.items():
+            if not len(group):
+                continue
+            opens_in = self.window.seconds_until_open(zone, now)
+            waits.append(opens_in if opens_in else group.seconds_until_ready())
+        return min(waits) if waits else None
+
+def build_queues(jobs, cfg):
+    """Scheduler for a run: time-zone windows when SEND_WINDOW is set, else domain round-robin only"""
+    window = SendWindow.parse(cfg["SEND_WINDOW"], cfg["SEND_WEEKDAYS"])
+    overrides = parse_domain_cooldowns(cfg["DOMAIN_COOLDOWNS"])
+    if window is None:
+        return DomainQueues(jobs, cfg["DOMAIN_COOLDOWN"], overrides)
+    return WindowQueues(jobs, window, cfg["DOMAIN_COOLDOWN"], overrides, cfg["DEFAULT_TIMEZONE"])
+
+class CompanyCap:
+    """At most `limit` contacts per company for one stage (0 = no cap)"""
+
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.counts = collections.Counter()
+
+    def count(self, row):
+        """Count a contact already reached at this stage"""
+        key = company_key(row)
+        if key:
+            self.counts[key] += 1
+
+    def allow(self, row):
+        """True (and counted) if the contact fits under its company's cap"""
+        key = company_key(row)
+        if not self.limit or not key:
+            return True
+        if self.counts[key] >= self.limit:
+            return False
+        self.counts[key] += 1
+        return True
@@ -0,0 +1,82 @@
+"""
+Lead priority from the lemlist quality columns
+emailStatus, lastState, status, companySize and jobTitle (plus the opens and
+clicks tracking_server.py counted, job['engagement']) are scored in one pass over the run's
+jobs, which are then sent best-first. Columns missing from the CSV (e.g. the
+master tracking file) count as neutral.
+"""
+import re
+
+EMAIL_STATUS_SCORES = {'deliverable': 50, 'risky': 10, '': -20}
+LAST_STATE_SCORES = {'emailsopened': 15, 'emailsclicked': 20, 'reviewed': 5}
+
+# Contacts never worth a send
+SKIP_EMAIL_STATUSES = ('undeliverable', 'invalid')
+SKIP_STATES = ('emailsbounced', 'emailsunsubscribed', 'emailsreplied', 'unsubscribed')
+
+DECISION_MAKER_RE = re.compile(r'associ|g[ée]rant|directeu|fondat|pr[ée]sident|dirigeant|owner|founder|ceo|partner', re.IGNORECASE)
+JUNIOR_RE = re.compile(r'stagiaire|assistant|secr[ée]taire|intern|clerc', re.IGNORECASE)
+SIZE_RE = re.compile(r'\d+')
+
+def company_size_score(value):
+    """Small and mid-size offices (the buyers of the product) first"""
+    numbers = [int(n) for n in SIZE_RE.findall(value or '')]
+    if not numbers:
+        return 0
+    size = numbers[0]
+    if size <= 10:
+        return 10
+    if size <= 200:
+        return 15
+    return 5
+
+def engagement_score(engagement):
+    """Opens/clicks counted by tracking_server.py (lemlist_core.tracking.load_engagement row), on the lastState scale"""
+    for field, state in (('clicks', 'emailsclicked'), ('opens', 'emailsopened')):
+        value = str(engagement.get(field) or '').strip()
+        if value.isdigit() and int(value) > 0:
+            return LAST_STATE_SCORES[state]
+    return 0
+
+def score_contact(row, engagement=None):
+    """Return (score, skip_reason); skip_reason is None for sendable contacts"""
+    email_status = row.get('emailStatus')
+    if email_status is not None:
+        email_status = email_status.strip().lower()
+        if email_status in SKIP_EMAIL_STATUSES:
+            return 0, f"emailStatus {email_status}"
+    states = [(row.get(field) or '').strip().lower() for field in ('lastState', 'status')]
+    for state in states:
+        if state in SKIP_STATES:
+            return 0, f"état lemlist {state}"
+
+    score = EMAIL_STATUS_SCORES.get(email_status, 0) if email_status is not None else 0
+    score += max(LAST_STATE_SCORES.get(states[0], 0), engagement_score(engagement or {}))
+    score += company_size_score(row.get('companySize'))
+    title = row.get('jobTitle') or ''
+    if DECISION_MAKER_RE.search(title):
+        score += 20
+    elif JUNIOR_RE.search(title):
+        score -= 10
+    return score, None
+
+def prioritize(jobs, skips, skip_unverified=False):
+    """Score every job['row'] and return the sendable jobs best-first (stable for ties)
+
+    Left-out jobs are reported through skips (lemlist_core.logs.SkipCounter) as
+    reason 'score', with the cause in {cause}.
+    """
+    kept = []
+    for job in jobs:
+        score, skip_reason = score_contact(job['row'], job.get('engagement'))
+        if skip_reason is None and skip_unverified:
+            email_status = job['row'].get('emailStatus')
+            if email_status is not None and email_status.strip().lower() != 'deliverable':
+                skip_reason = f"emailStatus non vérifié ({email_status.strip() or 'vide'})"
+        if skip_reason:
+            skips.skip('score', job['index'], job['email'], cause=skip_reason)
+            continue
+        job['score'] = score
+        kept.append(job)
+    kept.sort(key=lambda job: -job['score'])
+    return kept
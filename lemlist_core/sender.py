@@ -0,0 +1,181 @@
+"""
+Paced send loop with a retry queue for transient SMTP failures
+4xx replies, timeouts and dropped connections are retried later with
+exponential backoff, in the regular send slots; 5xx replies about the
+recipient are permanent and handed back to the caller to record on the contact.
+Other 5xx (the message or the sender refused at DATA: content, spam, policy)
+fail the send without retry but say nothing about the address.
+"""
+import heapq
+import itertools
+import logging
+import random
+import re
+import time
+
+from .rate import is_throttling
+from .scheduling import DomainQueues
+
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'  # The recipient address was refused: suppress the contact
+REJECTED = 'rejected'    # The message or the sender was refused: not retried this run, contact kept
+
+# Enhanced status codes about the address (5.1.1 bad mailbox, 5.1.2 bad domain, ...)
+RECIPIENT_STATUS_RE = re.compile(r'\b5\.1\.\d{1,3}\b')
+
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='ignore')
+    return str(value or '')
+
+def classify_smtp_error(exc):
+    """Return (kind, code, message) for an exception raised by send_email"""
+    import smtplib
+
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        code, message = next(iter(exc.recipients.values()), (None, b''))
+        message = _text(message)
+        if not (code and 500 <= code < 600):
+            return TRANSIENT, code, message
+        # Only a refusal of the address itself suppresses the contact (RCPT 550-553 or 5.1.x)
+        about_recipient = 550 <= code <= 553 or RECIPIENT_STATUS_RE.search(message)
+        return (PERMANENT if about_recipient else REJECTED), code, message
+    if isinstance(exc, (smtplib.SMTPAuthenticationError, smtplib.SMTPSenderRefused,
+                        smtplib.SMTPConnectError, smtplib.SMTPHeloError)):
+        # Account or connection problem, not the recipient's: never mark the contact
+        return TRANSIENT, exc.smtp_code, _text(exc.smtp_error)
+    if isinstance(exc, smtplib.SMTPResponseException):
+        # DATA-phase (SMTPDataError) or other command refusals: about the message or the sender
+        code = exc.smtp_code
+        return (REJECTED if code and 500 <= code < 600 else TRANSIENT), code, _text(exc.smtp_error)
+    # Timeouts, disconnects, TLS and socket errors
+    return TRANSIENT, None, str(exc) or exc.__class__.__name__
+
+class RetryQueue:
+    """Jobs waiting for another attempt, ordered by due time"""
+
+    def __init__(self, max_attempts=4, base_delay=60, max_delay=1800, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(cfg["RETRY_MAX_ATTEMPTS"], cfg["RETRY_BASE_DELAY"], cfg["RETRY_MAX_DELAY"])
+
+    def __len__(self):
+        return len(self._heap)
+
+    def backoff(self, attempts):
+        """Delay before attempt attempts+1: base * 2^(attempts-1), capped, with 10% jitter"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay + random.uniform(0, delay * 0.1)
+
+    def push(self, job):
+        """Schedule the job's next attempt; False once it has used all its attempts"""
+        if job['attempts'] >= self.max_attempts:
+            return False
+        delay = self.backoff(job['attempts'])
+        heapq.heappush(self._heap, (self.clock() + delay, next(self._seq), job))
+        job['retry_in'] = delay
+        return True
+
+    def pop_due(self):
+        """Next job whose retry time has come, or None"""
+        if self._heap and self._heap[0][0] <= self.clock():
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    def seconds_until_next(self):
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self.clock())
+
+def run_send_loop(jobs, send_one, delay_seconds, on_sent, on_failed, retry_queue=None, rate=None, sleep=time.sleep,
+                  status=None):
+    """Send jobs, pausing delay_seconds (or rate.delay, see rate.AIMDRate) after each successful send
+
+    jobs is a list (sent in order) or a scheduler from scheduling.build_queues. Each job is
+    a dict with at least 'email'. send_one(job) sends it and returns a result
+    passed to on_sent(job, result). Failures are classified: transient ones go
+    back to retry_queue (served before fresh jobs once due), permanent ones and
+    exhausted retries go to on_failed(job, kind, code, message).
+    A throttling reply from the relay is followed by a pause even though nothing was sent.
+    status (status.SendStatus) is kept up to date for the HTTP status endpoint.
+    Returns {'sent', 'permanent', 'rejected', 'gave_up', 'retried'} counts.
+    """
+    retry_queue = retry_queue if retry_queue is not None else RetryQueue()
+    queues = DomainQueues(jobs) if isinstance(jobs, list) else jobs
+    counts = {'sent': 0, 'permanent': 0, 'rejected': 0, 'gave_up': 0, 'retried': 0}
+
+    while len(queues) or len(retry_queue):
+        if status is not None:
+            status.update(queues, retry_queue)
+        job = retry_queue.pop_due()
+        if job is None:
+            job = queues.pop()
+            if job is None:
+                # Every remaining domain is cooling down or out of its send window, and no retry is due yet
+                waits = [w for w in (retry_queue.seconds_until_next(), queues.seconds_until_ready()) if w is not None]
+                wait = min(waits)
+                logging.info(f"⏳ {len(queues)} envoi(s) en attente (domaine en pause ou hors horaires) et {len(retry_queue)} "
+                             f"nouvel(s) essai(s), reprise dans {int(wait)}s")
+                if status is not None:
+                    status.on_wait(wait, 'cooldown_or_window')
+                sleep(wait)
+                continue
+        else:
+            counts['retried'] += 1
+
+        if status is not None:
+            status.on_attempt(retried=job.get('attempts', 0) > 0)
+        job.setdefault('attempts', 0)
+        job['attempts'] += 1
+        started = time.monotonic()
+        try:
+            result = send_one(job)
+        except Exception as e:
+            kind, code, message = classify_smtp_error(e)
+            throttled = is_throttling(code, message)
+            if throttled and rate is not None:
+                rate.on_throttle(code, message)
+            if kind == TRANSIENT and retry_queue.push(job):
+                outcome = TRANSIENT
+                logging.warning(f"🔁 Échec temporaire pour {job['email']} ({code or e.__class__.__name__} {message}), "
+                                f"nouvel essai {job['attempts'] + 1}/{retry_queue.max_attempts} dans {int(job['retry_in'])}s")
+            else:
+                outcome = kind if kind in (PERMANENT, REJECTED) else 'gave_up'
+                counts[outcome] += 1
+                on_failed(job, kind, code, message)
+            if status is not None:
+                status.on_failed(outcome)
+            # Nothing was delivered: no pacing pause unless the relay asked us to slow down
+            if throttled and (len(queues) or len(retry_queue)):
+                pause = rate.delay if rate is not None else delay_seconds
+                logging.info(f"Pause {int(pause)}s demandée par le relais…")
+                if status is not None:
+                    status.on_wait(pause, 'relay')
+                sleep(pause)
+            continue
+
+        if rate is not None:
+            rate.on_success(time.monotonic() - started)
+        counts['sent'] += 1
+        queues.mark_sent(job)
+        on_sent(job, result)
+        if status is not None:
+            status.on_sent()
+        if len(queues) or len(retry_queue):
+            pause = rate.delay if rate is not None else delay_seconds
+            logging.info(f"Pause {int(pause)}s avant le prochain…")
+            if status is not None:
+                status.update(queues, retry_queue)
+                status.on_wait(pause, 'pace')
+            sleep(pause)
+
+    if status is not None:
+        status.on_done()
+    return counts
@@ -0,0 +1,82 @@
+"""
+smtplib clients that time each protocol phase into a metrics.PhaseTimer
+dns: resolving the relay; connect: TCP connect, banner and EHLO; tls: SSL
+handshake or STARTTLS; auth: LOGIN; envelope: MAIL FROM and RCPT TO; data:
+DATA and the message body. Imported by send_email on first use only.
+"""
+import smtplib
+import socket
+
+def open_connection(addresses, timeout, source_address=None):
+    """socket.create_connection over already resolved getaddrinfo() results"""
+    error = None
+    for family, socktype, proto, _, address in addresses:
+        sock = None
+        try:
+            sock = socket.socket(family, socktype, proto)
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(address)
+            return sock
+        except OSError as e:
+            error = e
+            if sock is not None:
+                sock.close()
+    raise error or OSError("getaddrinfo returned no address")
+
+class _TimedMixin:
+
+    def __init__(self, *args, timer, **kwargs):
+        self.timer = timer  # Set first: the base __init__ connects right away when given a host
+        super().__init__(*args, **kwargs)
+
+    def _get_socket(self, host, port, timeout):
+        if timeout is not None and not timeout:
+            raise ValueError('Non-blocking socket (timeout=0) is not supported')
+        with self.timer.phase('dns'):
+            addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        sock = open_connection(addresses, timeout, self.source_address)
+        if isinstance(self, smtplib.SMTP_SSL):
+            with self.timer.phase('tls'):
+                sock = self.context.wrap_socket(sock, server_hostname=self._host)
+        return sock
+
+    def connect(self, *args, **kwargs):
+        with self.timer.phase('connect'):
+            return super().connect(*args, **kwargs)
+
+    def ehlo(self, *args, **kwargs):
+        with self.timer.phase('connect'):
+            return super().ehlo(*args, **kwargs)
+
+    def helo(self, *args, **kwargs):
+        with self.timer.phase('connect'):
+            return super().helo(*args, **kwargs)
+
+    def starttls(self, *args, **kwargs):
+        with self.timer.phase('tls'):
+            return super().starttls(*args, **kwargs)
+
+    def login(self, *args, **kwargs):
+        with self.timer.phase('auth'):
+            return super().login(*args, **kwargs)
+
+    def mail(self, *args, **kwargs):
+        with self.timer.phase('envelope'):
+            return super().mail(*args, **kwargs)
+
+    def rcpt(self, *args, **kwargs):
+        with self.timer.phase('envelope'):
+            return super().rcpt(*args, **kwargs)
+
+    def data(self, *args, **kwargs):
+        with self.timer.phase('data'):
+            return super().data(*args, **kwargs)
+
+class TimedSMTP(_TimedMixin, smtplib.SMTP):
+    pass
+
+class TimedSMTP_SSL(_TimedMixin, smtplib.SMTP_SSL):
+    pass
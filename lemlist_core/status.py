@@ -0,0 +1,162 @@
+"""
+Live send status over local HTTP/JSON
+With STATUS_PORT set, a sender serves GET /status on STATUS_HOST
+(127.0.0.1 by default): queue depth, sends per hour over rolling windows,
+failure and retry counts, seconds until the next allowed send and a
+projected completion time. When the port is taken (another campaign already
+running) the next free one is used, so several senders can run side by side.
+"""
+import collections
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Rolling windows for the send rate, in seconds
+WINDOWS = {'5m': 300, '15m': 900, '1h': 3600, '24h': 86400}
+PORT_ATTEMPTS = 20
+
+class SendStatus:
+    """Counters updated by run_send_loop, read by the HTTP thread"""
+
+    def __init__(self, campaign, stage, total, delay_seconds, clock=time.time):
+        self.campaign = campaign
+        self.stage = stage
+        self.total = total
+        self.delay_seconds = delay_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.started_at = clock()
+        self.sent_times = collections.deque()
+        self.counts = collections.Counter()  # sent, transient, permanent, rejected, gave_up, retried
+        self.pending = total
+        self.retrying = 0
+        self.next_send_at = self.started_at
+        self.waiting_for = None  # 'pace', 'cooldown_or_window', 'relay'
+        self.finished_at = None
+        self.url = None
+
+    def update(self, queues, retry_queue):
+        with self.lock:
+            self.pending = len(queues)
+            self.retrying = len(retry_queue)
+
+    def on_attempt(self, retried):
+        with self.lock:
+            self.waiting_for = None
+            self.next_send_at = self.clock()
+            if retried:
+                self.counts['retried'] += 1
+
+    def on_sent(self):
+        with self.lock:
+            now = self.clock()
+            self.counts['sent'] += 1
+            self.sent_times.append(now)
+            while self.sent_times[0] < now - WINDOWS['24h']:
+                self.sent_times.popleft()
+
+    def on_failed(self, outcome):
+        """outcome: 'transient' (retry scheduled), 'permanent', 'rejected' or 'gave_up'"""
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def on_wait(self, seconds, reason):
+        with self.lock:
+            self.next_send_at = self.clock() + seconds
+            self.waiting_for = reason
+
+    def on_done(self):
+        with self.lock:
+            self.finished_at = self.clock()
+            self.pending = self.retrying = 0
+            self.waiting_for = None
+
+    def rates(self, now):
+        """Sends per hour over each rolling window (over the elapsed time while the run is younger)"""
+        elapsed = max(1.0, now - self.started_at)
+        result = {}
+        for name, seconds in WINDOWS.items():
+            span = min(seconds, elapsed)
+            sent = sum(1 for _ in itertools.takewhile(lambda at: at >= now - span, reversed(self.sent_times)))
+            result[name] = round(sent * 3600.0 / span, 1)
+        return result
+
+    def snapshot(self):
+        with self.lock:
+            now = self.clock()
+            rates = self.rates(now)
+            remaining = self.pending + self.retrying
+            wait = max(0.0, self.next_send_at - now)
+            # Observed rate once there is an hour (or 10 sends) of history, else the configured pace
+            per_hour = rates['1h'] if rates['1h'] and (now - self.started_at >= 3600 or self.counts['sent'] >= 10) else None
+            per_hour = per_hour or (3600.0 / self.delay_seconds if self.delay_seconds else None)
+            if self.finished_at:
+                eta = datetime.fromtimestamp(self.finished_at)
+            elif remaining and per_hour:
+                eta = datetime.fromtimestamp(now + wait) + timedelta(hours=max(0, remaining - 1) / per_hour)
+            else:
+                eta = None
+            return {
+                'campaign': self.campaign,
+                'stage': self.stage,
+                'state': 'finished' if self.finished_at else ('waiting' if wait else 'sending'),
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+                'queue': {'total': self.total, 'pending': self.pending, 'retrying': self.retrying},
+                'sent': self.counts['sent'],
+                'failures': {'transient': self.counts['transient'], 'permanent': self.counts['permanent'],
+                             'rejected': self.counts['rejected'],
+                             'gave_up': self.counts['gave_up']},
+                'retries': self.counts['retried'],
+                'sends_per_hour': rates,
+                'next_send_in': round(wait, 1),
+                'waiting_for': self.waiting_for,
+                'eta': eta.isoformat(timespec='seconds') if eta else None,
+            }
+
+def _handler_for(status):
+    from http.server import BaseHTTPRequestHandler
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/', '/status'):
+                self.send_error(404)
+                return
+            body = json.dumps(status.snapshot(), ensure_ascii=False, indent=1).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Polling every few seconds would flood the send log
+
+    return StatusHandler
+
+def start_status_server(cfg, campaign, stage, total, delay_seconds):
+    """SendStatus served on STATUS_HOST:STATUS_PORT (or the next free port); None when STATUS_PORT is 0"""
+    port = cfg.get("STATUS_PORT", 0)
+    if not port:
+        return None
+    from http.server import ThreadingHTTPServer
+
+    status = SendStatus(campaign, stage, total, delay_seconds)
+    handler = _handler_for(status)
+    for candidate in range(port, port + PORT_ATTEMPTS):
+        try:
+            server = ThreadingHTTPServer((cfg.get("STATUS_HOST", "127.0.0.1"), candidate), handler)
+            break
+        except OSError:
+            continue
+    else:
+        logging.warning(f"⚠️ Aucun port libre entre {port} et {port + PORT_ATTEMPTS - 1}, pas de statut HTTP")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='send-status', daemon=True).start()
+    host, bound = server.server_address[:2]
+    status.url = f"http://{host}:{bound}/status"
+    logging.info(f"📡 Statut {campaign}/{stage} sur {status.url}")
+    return status
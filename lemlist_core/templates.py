@@ -0,0 +1,21 @@
+"""
+Jinja2 templates, compiled once per process
+Templates get the `track` filter and `tracking_pixel()` from lemlist_core.tracking
+(both pass through unchanged while tracking is off).
+"""
+import functools
+
+@functools.lru_cache(maxsize=None)
+def _environment():
+    from jinja2 import Environment, pass_context
+    from .tracking import track, tracking_pixel
+
+    env = Environment()  # Same defaults as a bare jinja2.Template
+    env.filters['track'] = pass_context(track)
+    env.globals['tracking_pixel'] = pass_context(tracking_pixel)
+    return env
+
+@functools.lru_cache(maxsize=None)
+def load_template(template_path):
+    with open(template_path, 'r', encoding='utf-8') as f:
+        return _environment().from_string(f.read())
@@ -0,0 +1,48 @@
+import pytest
+
+from lemlist_core.csv_io import atomic_write, read_csv_rows_with_dialect, update_csv_rows, write_csv_rows
+
+def write_contacts(path, rows, fieldnames=('email', 'answered', 'status')):
+    class Dialect:
+        delimiter = ';'
+    write_csv_rows(str(path), rows, Dialect(), list(fieldnames))
+
+def test_update_keeps_changes_made_by_other_tools(tmp_path):
+    path = tmp_path / 'master.csv'
+    write_contacts(path, [{'email': 'a@x.fr', 'answered': 'no', 'status': 'contacted'},
+                          {'email': 'b@y.fr', 'answered': 'no', 'status': 'contacted'}])
+    # The campaign loads the file, then the watcher marks a reply
+    campaign_rows, _, _ = read_csv_rows_with_dialect(str(path))
+    rows, dialect, fieldnames = read_csv_rows_with_dialect(str(path))
+    rows[1].update(answered='yes', status='responded')
+    write_csv_rows(str(path), rows, dialect, fieldnames)
+
+    updated, missing = update_csv_rows(str(path), {'A@x.fr': {'nudge1_date': '2026-01-05', 'status': 'nudge1_sent'}})
+    assert (updated, missing) == (['A@x.fr'], [])
+    rows, dialect, fieldnames = read_csv_rows_with_dialect(str(path))
+    assert fieldnames == ['email', 'answered', 'status', 'nudge1_date']
+    assert rows[0] == {'email': 'a@x.fr', 'answered': 'no', 'status': 'nudge1_sent', 'nudge1_date': '2026-01-05'}
+    assert rows[1]['answered'] == 'yes'
+    assert dialect.delimiter == ';'
+    assert campaign_rows[1]['answered'] == 'no'
+
+def test_update_reports_unknown_emails_and_leaves_file_alone(tmp_path):
+    path = tmp_path / 'master.csv'
+    write_contacts(path, [{'email': 'a@x.fr', 'answered': 'no', 'status': ''}])
+    before = path.read_bytes()
+    assert update_csv_rows(str(path), {'ghost@x.fr': {'status': 'x'}}) == ([], ['ghost@x.fr'])
+    assert path.read_bytes() == before
+
+def test_atomic_write_replaces_only_complete_files(tmp_path):
+    path = tmp_path / 'state.json'
+    path.write_text('old', encoding='utf-8')
+    with pytest.raises(ValueError):
+        with atomic_write(str(path), encoding='utf-8') as f:
+            f.write('half')
+            raise ValueError('interrupted')
+    assert path.read_text(encoding='utf-8') == 'old'
+    with atomic_write(str(path), encoding='utf-8') as f:
+        f.write('new')
+        assert path.read_text(encoding='utf-8') == 'old'
+    assert path.read_text(encoding='utf-8') == 'new'
+    assert [entry.name for entry in tmp_path.iterdir()] == ['state.json']
@@ -0,0 +1,26 @@
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+import lemlist_core
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_package_import_pulls_in_no_heavy_module():
+    # Fresh interpreter: this test process has long imported everything
+    code = ("import sys, lemlist_core; "
+            "print(sorted(m for m in ('smtplib', 'ssl', 'email.mime.text', 'jinja2', 'dotenv', 'csv') if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+@pytest.mark.parametrize('name', sorted(lemlist_core._EXPORTS))
+def test_every_export_resolves(name):
+    module = importlib.import_module(f"lemlist_core.{lemlist_core._EXPORTS[name]}")
+    assert getattr(lemlist_core, name) is getattr(module, name)
+
+def test_unknown_name():
+    with pytest.raises(AttributeError):
+        lemlist_core.not_a_helper
@@ -0,0 +1,47 @@
+import json
+import logging
+
+from lemlist_core.logs import JsonFormatter, SkipCounter
+
+MESSAGES = {'answered': "{email} a déjà répondu ({stage})", 'too_early': "{email} : relance dans {days} j"}
+
+def test_skips_are_sampled_and_summarised(caplog):
+    now = [0.0]
+    counter = SkipCounter('nudge1', total=500, messages=MESSAGES, sample=100, interval=60, clock=lambda: now[0])
+    with caplog.at_level(logging.INFO):
+        for index in range(1, 251):
+            counter.skip('answered', index, f"a{index}@agence.fr")
+        counter.skip('too_early', 251, 'b@agence.fr', days=3)
+        counter.seen(252)
+
+    details = [record for record in caplog.records if record.event == 'skip']
+    # First of each reason, then one in 100
+    assert [(record.reason, record.reason_count) for record in details] == [
+        ('answered', 1), ('answered', 100), ('answered', 200), ('too_early', 1)]
+    assert details[-1].getMessage().endswith('b@agence.fr : relance dans 3 j')
+    assert not [record for record in caplog.records if record.event == 'skip_summary']
+
+    caplog.clear()
+    now[0] = 61
+    with caplog.at_level(logging.INFO):
+        counter.seen(300)
+        counter.summary(final=True)
+    summaries = [record for record in caplog.records if record.event == 'skip_summary']
+    assert [record.final for record in summaries] == [False, True]
+    assert summaries[-1].skipped == {'answered': 250, 'too_early': 1}
+    assert (summaries[-1].row, summaries[-1].total) == (300, 500)
+
+def test_sample_zero_logs_only_summaries(caplog):
+    counter = SkipCounter('initial', total=10, messages=MESSAGES, sample=0, interval=0)
+    with caplog.at_level(logging.INFO):
+        for index in range(1, 6):
+            counter.skip('answered', index, 'a@agence.fr')
+        counter.summary(final=True)
+    assert [record.event for record in caplog.records] == ['skip_summary']
+
+def test_json_formatter_keeps_extra_fields():
+    record = logging.LogRecord('lemlist', logging.INFO, __file__, 1, 'sent %s', ('a@agence.fr',), None)
+    record.stage = 'nudge2'
+    entry = json.loads(JsonFormatter().format(record))
+    assert (entry['level'], entry['msg'], entry['stage']) == ('INFO', 'sent a@agence.fr', 'nudge2')
+    assert 'args' not in entry
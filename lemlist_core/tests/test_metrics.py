@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from lemlist_core import metrics
+from lemlist_core.metrics import BUCKETS, Histogram, PhaseTimer, SMTPMetrics
+
+def test_phase_timer_counts_nested_time_once(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(metrics.time, 'perf_counter', lambda: now[0])
+    timer = PhaseTimer()
+    with timer.phase('connect'):
+        now[0] += 1.0
+        with timer.phase('tls'):
+            now[0] += 2.0
+        assert timer.current == 'connect'
+        now[0] += 0.5
+    with pytest.raises(OSError):
+        with timer.phase('envelope'):
+            now[0] += 0.25
+            raise OSError('refused')
+    assert timer.phases == {'connect': 1.5, 'tls': 2.0, 'envelope': 0.25}
+    # The phase that failed stays current
+    assert timer.current == 'envelope'
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram()
+    for seconds in (0.004, 0.2, 0.2, 3.0, 120.0):
+        histogram.observe(seconds)
+    assert histogram.count == 5
+    assert histogram.cumulative()[-1] == 5
+    assert histogram.counts[BUCKETS.index(0.25)] == 2
+    assert histogram.quantile(0.5) == 0.25
+    assert histogram.quantile(0.8) == 5.0
+    assert histogram.quantile(1.0) is None  # Past the last bucket
+    assert Histogram().quantile(0.5) is None
+
+def test_prometheus_and_json_exports(tmp_path):
+    registry = SMTPMetrics()
+    registry.record('me@x.fr', 'agence.fr', {'connect': 0.1, 'data': 0.3}, 'sent')
+    registry.record('me@x.fr', 'agence.fr', {'connect': 0.2}, 'failed', failed_phase='envelope')
+
+    prom_path = str(tmp_path / 'smtp.prom')
+    registry.export(prom_path)
+    with open(prom_path, encoding='utf-8') as f:
+        text = f.read()
+    assert 'lemlist_smtp_phase_seconds_bucket{account="me@x.fr",phase="connect",le="+Inf"} 2' in text
+    assert 'lemlist_smtp_domain_phase_seconds_count{domain="agence.fr",phase="data"} 1' in text
+    assert 'lemlist_smtp_sends_total{account="me@x.fr",domain="agence.fr",outcome="failed"} 1' in text
+    assert 'lemlist_smtp_failures_total{account="me@x.fr",domain="agence.fr",phase="envelope"} 1' in text
+
+    json_path = str(tmp_path / 'smtp.json')
+    registry.export(json_path)
+    with open(json_path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot['by_account']['me@x.fr']['connect']['count'] == 2
+    assert snapshot['by_domain']['agence.fr']['data']['p50'] == 0.5
+    assert sorted(tmp_path.iterdir()) == [tmp_path / 'smtp.json', tmp_path / 'smtp.prom']
+
+def test_export_if_due_throttles_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics.atexit, 'register', lambda *args: None)
+    registry = SMTPMetrics()
+    path = tmp_path / 'smtp.json'
+    registry.export_if_due(str(path), interval=3600)
+    assert path.exists()
+    path.unlink()
+    registry.export_if_due(str(path), interval=3600)
+    assert not path.exists()
+    registry.export_if_due(None)
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+from lemlist_core.profiling import start_profiling
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_off_by_default(monkeypatch):
+    monkeypatch.delenv('PROFILE', raising=False)
+    argv = ['script.py', 'contacts.csv']
+    assert start_profiling('script', argv=argv) is None
+    assert argv == ['script.py', 'contacts.csv']
+
+def test_profile_switch_writes_reports_to_output_dir(tmp_path):
+    code = ("import sys; from lemlist_core.profiling import start_profiling; "
+            f"prefix = start_profiling('demo', output_dir={str(tmp_path / 'out')!r}); "
+            "assert sys.argv[1:] == ['contacts.csv'], sys.argv; "
+            "data = [str(i) * 10 for i in range(20000)]")
+    env = {key: value for key, value in os.environ.items() if key not in ('PROFILE', 'PROFILE_DIR')}
+    subprocess.run([sys.executable, '-c', code, '--profile', 'contacts.csv'], cwd=ROOT, env=env, check=True,
+                   capture_output=True)
+
+    reports = sorted(os.listdir(tmp_path / 'out'))
+    assert len(reports) == 3
+    assert all(report.startswith('profile_demo_') for report in reports)
+    assert [report.split('.', 1)[1] for report in reports] == ['alloc.txt', 'pstats', 'txt']
+    alloc = next(report for report in reports if report.endswith('.alloc.txt'))
+    with open(tmp_path / 'out' / alloc, encoding='utf-8') as f:
+        assert f.readline().startswith('Peak traced memory:')
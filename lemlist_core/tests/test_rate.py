@@ -0,0 +1,56 @@
+import smtplib
+
+import pytest
+
+from lemlist_core.rate import AIMDRate, is_throttling
+from lemlist_core.sender import RetryQueue, run_send_loop
+
+def test_is_throttling():
+    assert is_throttling(421, '4.7.0 Try again later')
+    assert is_throttling(550, '5.7.1 Too many messages from this sender')
+    assert not is_throttling(550, '5.1.1 User unknown')
+    assert not is_throttling(None, '')
+
+def test_additive_increase_within_bounds():
+    rate = AIMDRate(120, min_delay=60, max_delay=600, step_per_hour=6)
+    assert rate.delay == 120
+    rate.on_success(1.0)
+    assert rate.delay == pytest.approx(3600 / 36)
+    for _ in range(50):
+        rate.on_success(1.0)
+    assert rate.delay == 60
+
+def test_throttle_cuts_multiplicatively_down_to_the_floor():
+    rate = AIMDRate(100, min_delay=60, max_delay=600)
+    rate.on_throttle(421, 'Too many connections')
+    assert rate.delay == pytest.approx(200)
+    rate.on_throttle(421, 'Too many connections')
+    rate.on_throttle(None, 'rate limit exceeded')
+    assert rate.delay == 600
+
+def test_climbing_latency_backs_off_before_refusals():
+    rate = AIMDRate(100, min_delay=10, max_delay=600, step_per_hour=0, alpha=1.0)
+    for _ in range(3):
+        rate.on_success(1.0)
+    assert rate.delay == pytest.approx(100)
+    rate.on_success(5.0)
+    assert rate.delay == pytest.approx(100 / 0.9)
+
+def test_send_loop_paces_with_the_adapted_delay():
+    replies = {'a@x.fr': [smtplib.SMTPSenderRefused(421, b'4.7.0 Too many messages', 'me@x.fr'), None],
+               'b@y.fr': [None]}
+
+    def send_one(job):
+        reply = replies[job['email']].pop(0)
+        if reply is not None:
+            raise reply
+        return job['email']
+
+    pauses = []
+    rate = AIMDRate(100, min_delay=10, max_delay=600, step_per_hour=0)
+    jobs = [{'email': email, 'domain': email.split('@')[1]} for email in replies]
+    run_send_loop(jobs, send_one, 100, lambda job, result: None, lambda job, kind, code, message: None,
+                  RetryQueue(base_delay=0, clock=lambda: 0), rate=rate, sleep=pauses.append)
+    # The throttled attempt halves the rate before anything else is sent
+    assert pauses[0] == pytest.approx(200)
+    assert rate.delay == pytest.approx(200)
@@ -0,0 +1,72 @@
+from lemlist_core.scheduling import CompanyCap, DomainQueues, build_queues, parse_domain_cooldowns
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def jobs_for(*emails):
+    return [{'email': email, 'domain': email.rsplit('@', 1)[1]} for email in emails]
+
+def drain(queues):
+    order = []
+    while True:
+        job = queues.pop()
+        if job is None:
+            return order
+        queues.mark_sent(job)
+        order.append(job['email'])
+
+def test_domains_are_served_round_robin():
+    queues = DomainQueues(jobs_for('a1@a.fr', 'a2@a.fr', 'a3@a.fr', 'b1@b.fr', 'c1@c.fr', 'b2@b.fr'))
+    assert len(queues) == 6
+    assert drain(queues) == ['a1@a.fr', 'b1@b.fr', 'c1@c.fr', 'a2@a.fr', 'b2@b.fr', 'a3@a.fr']
+    assert len(queues) == 0
+    assert queues.seconds_until_ready() is None
+
+def test_domain_waits_for_its_cooldown():
+    clock = FakeClock()
+    queues = DomainQueues(jobs_for('a1@a.fr', 'a2@a.fr', 'b1@b.fr'), cooldown=600, clock=clock)
+    assert drain(queues) == ['a1@a.fr', 'b1@b.fr']
+    assert queues.pop() is None
+    assert queues.seconds_until_ready() == 600
+    clock.now = 599
+    assert queues.pop() is None
+    clock.now = 600
+    assert queues.pop()['email'] == 'a2@a.fr'
+
+def test_per_domain_cooldown_overrides():
+    assert parse_domain_cooldowns('gmail.com=60, Orange.fr = 300,') == {'gmail.com': 60, 'orange.fr': 300}
+    assert parse_domain_cooldowns('') == {}
+    clock = FakeClock()
+    queues = DomainQueues(jobs_for('a@gmail.com', 'b@gmail.com', 'c@orange.fr', 'd@orange.fr'), cooldown=600,
+                          overrides={'gmail.com': 60}, clock=clock)
+    assert drain(queues) == ['a@gmail.com', 'c@orange.fr']
+    clock.now = 60
+    assert drain(queues) == ['b@gmail.com']
+    assert queues.seconds_until_ready() == 540
+
+def test_defaults_are_plain_round_robin():
+    cfg = {'SEND_WINDOW': '', 'SEND_WEEKDAYS': '0-4', 'DOMAIN_COOLDOWN': 0, 'DOMAIN_COOLDOWNS': '',
+           'DEFAULT_TIMEZONE': 'Europe/Paris'}
+    queues = build_queues(jobs_for('a1@a.fr', 'a2@a.fr'), cfg)
+    assert isinstance(queues, DomainQueues)
+    # No cooldown and no window: everything goes out back to back
+    assert drain(queues) == ['a1@a.fr', 'a2@a.fr']
+
+def test_company_cap_counts_prior_contacts():
+    cap = CompanyCap(2)
+    cap.count({'companyDomain': 'agence.fr'})
+    assert cap.allow({'companyDomain': 'Agence.fr'})
+    assert not cap.allow({'company_name': 'ignored', 'companyDomain': 'agence.fr'})
+    # Falls back to the company name, unknown companies are never capped
+    assert cap.allow({'company_name': 'Immo Sud'})
+    assert cap.allow({'companyName': 'immo sud'})
+    assert not cap.allow({'company_name': 'IMMO SUD'})
+    assert all(cap.allow({'email': f"x{i}@free.fr"}) for i in range(5))
+
+def test_company_cap_zero_means_no_cap():
+    cap = CompanyCap(0)
+    assert all(cap.allow({'companyDomain': 'agence.fr'}) for _ in range(10))
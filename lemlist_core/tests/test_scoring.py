@@ -0,0 +1,52 @@
+from lemlist_core.logs import SkipCounter
+from lemlist_core.scoring import prioritize, score_contact
+
+def test_quality_columns_add_up():
+    row = {'emailStatus': 'deliverable', 'lastState': 'emailsOpened', 'companySize': '11-50',
+           'jobTitle': 'Gérante'}
+    assert score_contact(row) == (50 + 15 + 15 + 20, None)
+
+def test_missing_columns_are_neutral():
+    assert score_contact({}) == (0, None)
+    # Present but empty emailStatus is penalized
+    assert score_contact({'emailStatus': ''}) == (-20, None)
+
+def test_job_title_and_company_size():
+    assert score_contact({'jobTitle': 'Assistante commerciale'})[0] == -10
+    assert score_contact({'jobTitle': 'CEO & Founder'})[0] == 20
+    assert score_contact({'companySize': '1-10'})[0] == 10
+    assert score_contact({'companySize': '5001-10000'})[0] == 5
+    assert score_contact({'companySize': 'n/a'})[0] == 0
+
+def test_unsendable_contacts_are_skipped():
+    assert score_contact({'emailStatus': 'Undeliverable'}) == (0, 'emailStatus undeliverable')
+    assert score_contact({'lastState': 'emailsBounced'})[1] == 'état lemlist emailsbounced'
+    assert score_contact({'status': 'unsubscribed'})[1] == 'état lemlist unsubscribed'
+
+def test_tracked_engagement_counts_like_last_state():
+    assert score_contact({}, {'opens': '2', 'clicks': ''})[0] == 15
+    assert score_contact({}, {'opens': '3', 'clicks': '1'})[0] == 20
+    assert score_contact({}, {'opens': '0', 'clicks': '0'})[0] == 0
+    # The higher of lastState and tracked engagement, not both
+    assert score_contact({'lastState': 'emailsClicked'}, {'opens': '1'})[0] == 20
+
+def test_prioritize_sorts_best_first_and_reports_skips():
+    rows = [{'emailStatus': 'risky'}, {'emailStatus': 'undeliverable'}, {'emailStatus': 'deliverable'},
+            {'emailStatus': 'risky'}]
+    jobs = [{'index': i, 'email': f"c{i}@x.fr", 'row': row} for i, row in enumerate(rows, 1)]
+    skips = SkipCounter('nudge1', len(jobs), {'score': "{email} - {cause}, saut"}, sample=0, interval=0)
+    kept = prioritize(jobs, skips)
+    # Ties keep their CSV order
+    assert [job['email'] for job in kept] == ['c3@x.fr', 'c1@x.fr', 'c4@x.fr']
+    assert [job['score'] for job in kept] == [50, 10, 10]
+    assert skips.counts == {'score': 1}
+
+def test_prioritize_skip_unverified():
+    jobs = [{'index': 1, 'email': 'a@x.fr', 'row': {'emailStatus': 'risky'}},
+            {'index': 2, 'email': 'b@x.fr', 'row': {'emailStatus': 'deliverable'}},
+            {'index': 3, 'email': 'c@x.fr', 'row': {}}]
+    skips = SkipCounter('initial', len(jobs), {'score': "{email} - {cause}, saut"}, sample=0, interval=0)
+    kept = prioritize(jobs, skips, skip_unverified=True)
+    # Files without an emailStatus column are not filtered
+    assert [job['email'] for job in kept] == ['b@x.fr', 'c@x.fr']
+    assert skips.counts == {'score': 1}
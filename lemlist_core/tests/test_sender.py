@@ -0,0 +1,107 @@
+import smtplib
+import socket
+
+from lemlist_core.sender import PERMANENT, REJECTED, TRANSIENT, RetryQueue, classify_smtp_error, run_send_loop
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def refused(code, message):
+    return smtplib.SMTPRecipientsRefused({'agent@agence.fr': (code, message)})
+
+def test_unknown_recipient_is_permanent():
+    kind, code, message = classify_smtp_error(refused(550, b'5.1.1 <agent@agence.fr>: User unknown'))
+    assert (kind, code) == (PERMANENT, 550)
+    assert message == '5.1.1 <agent@agence.fr>: User unknown'
+    assert classify_smtp_error(refused(553, b'mailbox name not allowed'))[0] == PERMANENT
+    # Enhanced 5.1.x status outside 550-553
+    assert classify_smtp_error(refused(554, b'5.1.2 bad destination domain'))[0] == PERMANENT
+
+def test_other_rcpt_refusal_keeps_the_contact():
+    assert classify_smtp_error(refused(554, b'5.7.1 relay access denied'))[0] == REJECTED
+
+def test_temporary_rcpt_refusal_is_retried():
+    assert classify_smtp_error(refused(450, b'4.2.0 greylisted'))[0] == TRANSIENT
+    assert classify_smtp_error(refused(452, b'4.5.3 too many recipients'))[0] == TRANSIENT
+
+def test_data_refusal_is_rejected_not_permanent():
+    kind, code, message = classify_smtp_error(smtplib.SMTPDataError(554, b'5.7.1 message content rejected'))
+    assert (kind, code, message) == (REJECTED, 554, '5.7.1 message content rejected')
+    assert classify_smtp_error(smtplib.SMTPDataError(451, b'4.3.0 try again later'))[0] == TRANSIENT
+
+def test_account_and_connection_errors_are_transient():
+    errors = [
+        smtplib.SMTPAuthenticationError(535, b'5.7.8 bad credentials'),
+        smtplib.SMTPSenderRefused(550, b'5.7.1 sender rejected', 'me@sender.fr'),
+        smtplib.SMTPConnectError(554, b'no service'),
+        smtplib.SMTPHeloError(501, b'bad helo'),
+    ]
+    for error in errors:
+        assert classify_smtp_error(error)[0] == TRANSIENT, error
+
+def test_network_errors_are_transient():
+    assert classify_smtp_error(socket.timeout('timed out')) == (TRANSIENT, None, 'timed out')
+    assert classify_smtp_error(smtplib.SMTPServerDisconnected())[:2] == (TRANSIENT, None)
+    assert classify_smtp_error(ConnectionResetError())[2] == 'ConnectionResetError'
+
+def test_backoff_doubles_and_is_capped(monkeypatch):
+    monkeypatch.setattr('lemlist_core.sender.random.uniform', lambda low, high: 0)
+    queue = RetryQueue(max_attempts=10, base_delay=60, max_delay=300)
+    assert [queue.backoff(attempts) for attempts in range(1, 6)] == [60, 120, 240, 300, 300]
+
+def test_backoff_jitter_stays_within_ten_percent():
+    queue = RetryQueue(base_delay=100, max_delay=1000)
+    for _ in range(200):
+        assert 200 <= queue.backoff(2) <= 220
+
+def test_retry_queue_serves_jobs_when_due_and_stops_after_max_attempts(monkeypatch):
+    monkeypatch.setattr('lemlist_core.sender.random.uniform', lambda low, high: 0)
+    clock = FakeClock()
+    queue = RetryQueue(max_attempts=2, base_delay=60, max_delay=600, clock=clock)
+    first, second = {'email': 'a@x.fr', 'attempts': 1}, {'email': 'b@y.fr', 'attempts': 1}
+    assert queue.push(first)
+    clock.now = 30
+    assert queue.push(second)
+    assert first['retry_in'] == 60
+    assert queue.pop_due() is None
+    assert queue.seconds_until_next() == 30
+    clock.now = 60
+    assert queue.pop_due() is first
+    assert queue.pop_due() is None
+    clock.now = 90
+    assert queue.pop_due() is second
+    assert queue.seconds_until_next() is None
+    assert not queue.push({'email': 'c@z.fr', 'attempts': 2})
+
+def test_send_loop_retries_then_reports_each_outcome(monkeypatch):
+    monkeypatch.setattr('lemlist_core.sender.random.uniform', lambda low, high: 0)
+    clock = FakeClock()
+    replies = {
+        'ok@a.fr': [None],
+        'flaky@b.fr': [smtplib.SMTPServerDisconnected('gone'), None],
+        'unknown@c.fr': [refused(550, b'5.1.1 user unknown')],
+        'spam@d.fr': [smtplib.SMTPDataError(554, b'5.7.1 spam')],
+        'down@e.fr': [socket.timeout('timed out')] * 3,
+    }
+
+    def send_one(job):
+        reply = replies[job['email']].pop(0)
+        if reply is not None:
+            raise reply
+        return f"<{job['email']}>"
+
+    def sleep(seconds):
+        clock.now += seconds
+
+    sent, failed = [], []
+    jobs = [{'email': email, 'domain': email.split('@')[1]} for email in replies]
+    counts = run_send_loop(jobs, send_one, 0, lambda job, result: sent.append(result),
+                           lambda job, kind, code, message: failed.append((job['email'], kind)),
+                           RetryQueue(max_attempts=3, base_delay=10, max_delay=60, clock=clock), sleep=sleep)
+    assert sorted(sent) == ['<flaky@b.fr>', '<ok@a.fr>']
+    assert sorted(failed) == [('down@e.fr', TRANSIENT), ('spam@d.fr', REJECTED), ('unknown@c.fr', PERMANENT)]
+    assert counts == {'sent': 2, 'permanent': 1, 'rejected': 1, 'gave_up': 1, 'retried': 3}
@@ -0,0 +1,65 @@
+import json
+import socket
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pytest
+
+from lemlist_core.status import SendStatus, start_status_server
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_snapshot_rates_and_eta():
+    clock = FakeClock(1_000_000.0)
+    status = SendStatus('agents_immo', 'nudge1', total=30, delay_seconds=120, clock=clock)
+    # Before any send the ETA comes from the configured pace: 29 more at 30/h after the first
+    snapshot = status.snapshot()
+    assert snapshot['state'] == 'sending'
+    assert snapshot['eta'] == datetime.fromtimestamp(clock.now + 29 * 120).isoformat(timespec='seconds')
+
+    for _ in range(10):
+        status.on_attempt(retried=False)
+        status.on_sent()
+        clock.now += 60
+    status.on_failed('transient')
+    status.on_attempt(retried=True)
+    status.on_wait(45, 'pace')
+    status.pending, status.retrying = 19, 1
+    snapshot = status.snapshot()
+    assert snapshot['sent'] == 10
+    assert snapshot['failures']['transient'] == 1
+    assert snapshot['retries'] == 1
+    assert snapshot['state'] == 'waiting'
+    assert (snapshot['waiting_for'], snapshot['next_send_in']) == ('pace', 45)
+    # 10 sends in the 10 minutes elapsed: 60/h on every window
+    assert snapshot['sends_per_hour'] == {'5m': 60.0, '15m': 60.0, '1h': 60.0, '24h': 60.0}
+    assert snapshot['eta'] == datetime.fromtimestamp(clock.now + 45 + 19 * 60).isoformat(timespec='seconds')
+
+    status.on_done()
+    snapshot = status.snapshot()
+    assert snapshot['state'] == 'finished'
+    assert snapshot['queue']['pending'] == 0
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def test_served_over_http_next_port_when_taken():
+    assert start_status_server({'STATUS_PORT': 0}, 'agents_immo', 'initial', 5, 60) is None
+    port = free_port()
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', port))
+        taken.listen(1)
+        status = start_status_server({'STATUS_PORT': port}, 'agents_immo', 'initial', 5, 60)
+    assert status.url != f"http://127.0.0.1:{port}/status"
+    with urllib.request.urlopen(status.url, timeout=5) as response:
+        assert json.load(response)['queue'] == {'total': 5, 'pending': 5, 'retrying': 0}
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(status.url.replace('/status', '/other'), timeout=5)
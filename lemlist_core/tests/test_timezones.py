@@ -0,0 +1,56 @@
+from datetime import datetime, time, timezone
+
+from lemlist_core.scheduling import WindowQueues
+from lemlist_core.timezones import SendWindow, contact_timezone
+
+# Monday 5 January 2026, 08:00 UTC = 09:00 in Paris, 03:00 in Toronto
+MONDAY_9H_PARIS = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+def test_parse():
+    window = SendWindow.parse('09:00-18:00', '0-4')
+    assert (window.start, window.end, window.weekdays) == (time(9), time(18), (0, 1, 2, 3, 4))
+    assert SendWindow.parse('08:30 - 12:00', '0,2,5-6').weekdays == (0, 2, 5, 6)
+    # No window at all (the default): sends any time
+    assert SendWindow.parse('', '0-4') is None
+    assert SendWindow.parse(None) is None
+
+def test_is_open_in_the_contact_zone():
+    window = SendWindow.parse('09:00-18:00', '0-4')
+    assert window.is_open('Europe/Paris', MONDAY_9H_PARIS)
+    assert not window.is_open('America/Toronto', MONDAY_9H_PARIS)
+    # End of the window is excluded
+    assert not window.is_open('Europe/Paris', datetime(2026, 1, 5, 17, 0, tzinfo=timezone.utc))
+    # Saturday
+    assert not window.is_open('Europe/Paris', datetime(2026, 1, 10, 10, 0, tzinfo=timezone.utc))
+
+def test_seconds_until_open():
+    window = SendWindow.parse('09:00-18:00', '0-4')
+    assert window.seconds_until_open('Europe/Paris', MONDAY_9H_PARIS) == 0
+    # Toronto opens at 14:00 UTC
+    assert window.seconds_until_open('America/Toronto', MONDAY_9H_PARIS) == 6 * 3600
+    # Friday 18:30 in Paris: next opening is Monday 09:00
+    friday_evening = datetime(2026, 1, 9, 17, 30, tzinfo=timezone.utc)
+    assert window.seconds_until_open('Europe/Paris', friday_evening) == (2 * 24 + 14.5) * 3600
+
+def test_contact_timezone():
+    assert contact_timezone({'timezone': 'America/Montreal'}) == 'America/Montreal'
+    assert contact_timezone({'timezone': 'Not/AZone', 'country': 'Belgique'}) == 'Europe/Brussels'
+    assert contact_timezone({'location': 'Vancouver, British Columbia, Canada'}) == 'America/Vancouver'
+    assert contact_timezone({'location': 'Saint-Denis, Réunion'}) == 'Indian/Reunion'
+    assert contact_timezone({'location': 'Genève, Suisse'}) == 'Europe/Zurich'
+    assert contact_timezone({}, default='Europe/Paris') == 'Europe/Paris'
+
+def test_window_queues_serve_only_open_zones():
+    jobs = [{'email': 'a@paris.fr', 'domain': 'paris.fr', 'tz': 'Europe/Paris'},
+            {'email': 'b@toronto.ca', 'domain': 'toronto.ca', 'tz': 'America/Toronto'},
+            {'email': 'c@paris.fr', 'domain': 'paris.fr', 'tz': ''}]
+    now = [MONDAY_9H_PARIS]
+    queues = WindowQueues(jobs, SendWindow.parse('09:00-18:00', '0-4'), now=lambda: now[0])
+    assert queues.pop()['email'] == 'a@paris.fr'
+    # Empty tz falls back to the default zone
+    assert queues.pop()['email'] == 'c@paris.fr'
+    assert queues.pop() is None
+    assert queues.seconds_until_ready() == 6 * 3600
+    now[0] = datetime(2026, 1, 5, 14, 0, tzinfo=timezone.utc)
+    assert queues.pop()['email'] == 'b@toronto.ca'
+    assert len(queues) == 0
@@ -0,0 +1,50 @@
+from lemlist_core.tracking import _b64, _signature, _unb64, load_engagement, make_token, read_token, write_engagement
+
+SECRET = 'secret'
+VIDEO_URL = 'https://www.youtube.com/watch?v=eS6VZm7rzeM'
+
+def test_round_trip():
+    token = make_token(SECRET, ' Agent@Agence.FR ', 'nudge1', VIDEO_URL)
+    assert read_token(SECRET, token) == ('agent@agence.fr', 'nudge1', VIDEO_URL)
+    # Open pixel: no URL, no stage
+    assert read_token(SECRET, make_token(SECRET, 'a@b.fr', None)) == ('a@b.fr', '', '')
+    # URL-safe, usable as a path segment
+    assert all(c.isalnum() or c in '-_.' for c in token)
+
+def test_non_ascii_payload():
+    token = make_token(SECRET, 'élodie@agence.fr', 'initial', 'https://exemple.fr/vidéo')
+    assert read_token(SECRET, token) == ('élodie@agence.fr', 'initial', 'https://exemple.fr/vidéo')
+
+def test_other_secret_is_rejected():
+    assert read_token('other', make_token(SECRET, 'a@b.fr', 'nudge1', VIDEO_URL)) is None
+
+def test_tampered_payload_is_rejected():
+    token = make_token(SECRET, 'a@b.fr', 'nudge1', VIDEO_URL)
+    payload, signature = token.split('.')
+    # Same signature on another target URL: no open redirect
+    forged = _b64(_unb64(payload).replace(b'youtube.com', b'evil.example'))
+    assert read_token(SECRET, f"{forged}.{signature}") is None
+
+def test_tampered_signature_is_rejected():
+    payload, signature = make_token(SECRET, 'a@b.fr', 'nudge1').split('.')
+    flipped = ('B' if signature[0] == 'A' else 'A') + signature[1:]
+    assert read_token(SECRET, f"{payload}.{flipped}") is None
+    assert read_token(SECRET, f"{payload}.{signature[:-2]}") is None
+    assert read_token(SECRET, payload) is None
+
+def test_malformed_tokens_are_rejected():
+    for token in ('', '.', 'abc', 'not base64!.xyz', '...'):
+        assert read_token(SECRET, token) is None
+
+def test_signed_payload_of_the_wrong_shape_is_rejected():
+    payload = _b64(b'["only-two","items"]')
+    assert read_token(SECRET, f"{payload}.{_b64(_signature(SECRET, payload))}") is None
+
+def test_engagement_file_round_trip(tmp_path):
+    path = tmp_path / 'tracking_engagement.csv'
+    assert load_engagement(str(path)) == {}
+    write_engagement(str(path), {'a@b.fr': {'opens': 2, 'clicks': 0, 'last_opened': '2026-01-05 10:00:00',
+                                            'last_clicked': 0}})
+    row = load_engagement(str(path))['a@b.fr']
+    assert (row['opens'], row['clicks'], row['last_opened'], row['last_clicked']) == ('2', '', '2026-01-05 10:00:00', '')
+    assert not (tmp_path / 'tracking_engagement.csv.tmp').exists()
@@ -0,0 +1,61 @@
+import email
+import mailbox
+import os
+
+import pytest
+
+from lemlist_core.mailer import send_email
+from lemlist_core.transports import (
+    FileSinkTransport, MaildirTransport, PickupDirTransport, SMTPTransport, get_transport,
+)
+
+DATA = b"Subject: Projet\r\nFrom: me@x.fr\r\nTo: agent@agence.fr\r\n\r\nBonjour\r\n"
+ENVELOPE = ('me@x.fr', ['agent@agence.fr', 'copie@x.fr'])
+
+def test_pickup_writes_complete_eml_files(tmp_path):
+    transport = PickupDirTransport(str(tmp_path / 'pickup'))
+    transport.send(DATA, *ENVELOPE)
+    transport.send(DATA, *ENVELOPE)
+    names = sorted(os.listdir(tmp_path / 'pickup'))
+    assert len(names) == 2 and all(name.endswith('.eml') for name in names)
+    with open(tmp_path / 'pickup' / names[0], 'rb') as f:
+        raw = f.read()
+    # Envelope first, CRLF kept, as pickup MTAs expect
+    assert raw.startswith(b"X-Sender: me@x.fr\r\nX-Receiver: agent@agence.fr\r\nX-Receiver: copie@x.fr\r\nSubject:")
+    assert raw.endswith(b"Bonjour\r\n")
+
+def test_maildir_spools_into_new(tmp_path):
+    path = tmp_path / 'spool'
+    path.mkdir()  # An existing empty directory is fine
+    MaildirTransport(str(path)).send(DATA, *ENVELOPE)
+    assert os.listdir(path / 'tmp') == []
+    messages = list(mailbox.Maildir(str(path), create=False))
+    assert len(messages) == 1
+    assert messages[0]['Return-Path'] == '<me@x.fr>'
+    assert messages[0].get_all('X-Envelope-To') == ENVELOPE[1]
+
+def test_file_sink_appends_to_one_mbox(tmp_path):
+    path = str(tmp_path / 'out' / 'sent.mbox')
+    transport = FileSinkTransport(path)
+    transport.send(DATA, *ENVELOPE)
+    transport.send(DATA.replace(b'Projet', b'Relance'), *ENVELOPE)
+    assert [message['Subject'] for message in mailbox.mbox(path)] == ['Projet', 'Relance']
+
+def test_get_transport_picks_and_caches(tmp_path):
+    assert isinstance(get_transport({'SMTP_HOST': 'relay'}), SMTPTransport)
+    cfg = {'TRANSPORT': ' Maildir ', 'TRANSPORT_PATH': str(tmp_path / 'spool')}
+    assert get_transport(cfg) is get_transport(dict(cfg))
+    with pytest.raises(ValueError):
+        get_transport({'TRANSPORT': 'pickup'})
+    with pytest.raises(ValueError):
+        get_transport({'TRANSPORT': 'carrier-pigeon', 'TRANSPORT_PATH': str(tmp_path)})
+
+def test_send_email_through_a_spool(tmp_path):
+    cfg = {'TRANSPORT': 'pickup', 'TRANSPORT_PATH': str(tmp_path / 'pickup'), 'SMTP_USER': 'me@x.fr',
+           'SENDER_NAME': 'Moi', 'REPLY_TO': 'me@x.fr', 'BCC_EMAIL': 'copie@x.fr'}
+    message_id = send_email(cfg, 'Projet', '<p>Bonjour</p>', {'email': 'agent@agence.fr'})
+    [name] = os.listdir(tmp_path / 'pickup')
+    with open(tmp_path / 'pickup' / name, 'rb') as f:
+        message = email.message_from_bytes(f.read())
+    assert message['Message-ID'] == message_id
+    assert message.get_all('X-Receiver') == ['agent@agence.fr', 'copie@x.fr']
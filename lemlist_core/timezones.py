@@ -0,0 +1,101 @@
+"""
+Contact time zones and local business-hour send windows
+The zone comes from the lemlist `timezone` column when it holds an IANA
+name, else from `country` / the last part of `location`.
+"""
+import functools
+from datetime import datetime, time as dtime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+COUNTRY_TIMEZONES = {
+    'france': 'Europe/Paris',
+    'belgium': 'Europe/Brussels', 'belgique': 'Europe/Brussels',
+    'switzerland': 'Europe/Zurich', 'suisse': 'Europe/Zurich',
+    'luxembourg': 'Europe/Luxembourg',
+    'monaco': 'Europe/Monaco',
+    'germany': 'Europe/Berlin', 'spain': 'Europe/Madrid', 'italy': 'Europe/Rome',
+    'united kingdom': 'Europe/London', 'portugal': 'Europe/Lisbon',
+    'morocco': 'Africa/Casablanca', 'maroc': 'Africa/Casablanca',
+    'algeria': 'Africa/Algiers', 'algérie': 'Africa/Algiers',
+    'tunisia': 'Africa/Tunis', 'tunisie': 'Africa/Tunis',
+    'senegal': 'Africa/Dakar', 'sénégal': 'Africa/Dakar',
+    'canada': 'America/Toronto',
+    'united states': 'America/New_York',
+}
+
+# Regions spanning several zones, matched anywhere in `location`
+REGION_TIMEZONES = {
+    'british columbia': 'America/Vancouver',
+    'alberta': 'America/Edmonton',
+    'saskatchewan': 'America/Regina',
+    'manitoba': 'America/Winnipeg',
+    'new brunswick': 'America/Moncton', 'nova scotia': 'America/Halifax',
+    'newfoundland': 'America/St_Johns',
+    'réunion': 'Indian/Reunion', 'reunion': 'Indian/Reunion',
+    'guadeloupe': 'America/Guadeloupe', 'martinique': 'America/Martinique',
+    'guyane': 'America/Cayenne', 'french guiana': 'America/Cayenne',
+    'nouvelle-calédonie': 'Pacific/Noumea', 'new caledonia': 'Pacific/Noumea',
+    'polynésie': 'Pacific/Tahiti', 'french polynesia': 'Pacific/Tahiti',
+}
+
+@functools.lru_cache(maxsize=None)
+def get_zone(name):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+def contact_timezone(row, default='Europe/Paris'):
+    """IANA zone name for a contact row"""
+    explicit = (row.get('timezone') or '').strip()
+    if explicit and get_zone(explicit):
+        return explicit
+    location = (row.get('location') or row.get('companyLocation') or '').strip().lower()
+    for region, zone in REGION_TIMEZONES.items():
+        if region in location:
+            return zone
+    for value in (row.get('country'), location.rsplit(',', 1)[-1]):
+        zone = COUNTRY_TIMEZONES.get((value or '').strip().lower())
+        if zone:
+            return zone
+    return default
+
+class SendWindow:
+    """Local business hours, e.g. SendWindow.parse('09:00-18:00', '0-4') for Mon-Fri 9h-18h"""
+
+    def __init__(self, start, end, weekdays=(0, 1, 2, 3, 4)):
+        self.start = start
+        self.end = end
+        self.weekdays = tuple(weekdays)
+
+    @classmethod
+    def parse(cls, hours, weekdays='0-4'):
+        """None when hours is empty (no window)"""
+        if not (hours or '').strip():
+            return None
+        start, end = (dtime.fromisoformat(part.strip()) for part in hours.split('-'))
+        days = set()
+        for part in (weekdays or '0-6').split(','):
+            first, _, last = part.partition('-')
+            days.update(range(int(first), int(last or first) + 1))
+        return cls(start, end, sorted(days))
+
+    def is_open(self, zone_name, now=None):
+        local = (now or datetime.now(timezone.utc)).astimezone(get_zone(zone_name))
+        return local.weekday() in self.weekdays and self.start <= local.time() < self.end
+
+    def seconds_until_open(self, zone_name, now=None):
+        """0 when open, else seconds until the next opening in that zone"""
+        now = now or datetime.now(timezone.utc)
+        if self.is_open(zone_name, now):
+            return 0.0
+        zone = get_zone(zone_name)
+        local = now.astimezone(zone)
+        for days_ahead in range(8):
+            day = (local + timedelta(days=days_ahead)).date()
+            if day.weekday() not in self.weekdays:
+                continue
+            opening = datetime.combine(day, self.start, tzinfo=zone)
+            if opening > local:
+                return (opening - local).total_seconds()
+        return 24 * 3600.0
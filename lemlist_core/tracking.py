@@ -0,0 +1,94 @@
+"""
+Per-recipient open/click links for the templates
+With TRACKING_BASE_URL (public address of AgentsImmo/tracking_server.py) and
+TRACKING_SECRET set, `{{ video_url | track }}` renders as <base>/c/<token>,
+a redirect to the video counted as a click, and `{{ tracking_pixel() }}` as a
+1x1 image on <base>/o/<token>.gif counted as an open. The token carries the
+recipient, the stage and the target URL, signed with HMAC-SHA256: the server
+keeps no link table and cannot be used as an open redirect. Unset, the filter
+returns the URL as is and the pixel renders as nothing.
+The server keeps per-contact totals in tracking_engagement.csv next to the
+master CSV (its only writer); campaign_manager.py reads them for the lead score.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+
+SIGNATURE_BYTES = 12
+ENGAGEMENT_FILE = 'tracking_engagement.csv'
+ENGAGEMENT_FIELDS = ['opens', 'clicks', 'last_opened', 'last_clicked']
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _signature(secret, payload):
+    return hmac.new(secret.encode('utf-8'), payload.encode('ascii'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def make_token(secret, email, stage, url=''):
+    payload = _b64(json.dumps([email.strip().lower(), stage or '', url], separators=(',', ':'),
+                              ensure_ascii=False).encode('utf-8'))
+    return f"{payload}.{_b64(_signature(secret, payload))}"
+
+def read_token(secret, token):
+    """(email, stage, url) from a token, None when malformed or not signed with secret"""
+    payload, _, signature = token.partition('.')
+    try:
+        if not hmac.compare_digest(_unb64(signature), _signature(secret, payload)):
+            return None
+        email, stage, url = json.loads(_unb64(payload))
+    except (ValueError, TypeError):
+        return None
+    return email, stage, url
+
+def tracking_settings():
+    """(base_url, secret), or None when tracking is off"""
+    base_url = os.getenv("TRACKING_BASE_URL", "").strip().rstrip('/')
+    secret = os.getenv("TRACKING_SECRET", "")
+    return (base_url, secret) if base_url and secret else None
+
+def track(context, url):
+    """Jinja filter: url behind the click redirect for the email/stage being rendered"""
+    settings = tracking_settings()
+    email = context.get('email')
+    if settings is None or not email or not url:
+        return url
+    base_url, secret = settings
+    return f"{base_url}/c/{make_token(secret, email, context.get('stage'), url)}"
+
+def tracking_pixel(context):
+    """Jinja global: <img> tag of the open pixel, empty when tracking is off"""
+    settings = tracking_settings()
+    email = context.get('email')
+    if settings is None or not email:
+        return ''
+    base_url, secret = settings
+    src = f"{base_url}/o/{make_token(secret, email, context.get('stage'))}.gif"
+    return f'<img src="{src}" width="1" height="1" alt="" style="display:block;border:0;" />'
+
+def engagement_path(csv_path):
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), ENGAGEMENT_FILE)
+
+def load_engagement(path):
+    """email -> {opens, clicks, last_opened, last_clicked}, empty when the server never ran"""
+    from .csv_io import read_csv_rows_with_dialect
+
+    if not os.path.exists(path):
+        return {}
+    rows, _, _ = read_csv_rows_with_dialect(path)
+    return {(row.get('email') or '').strip().lower(): row for row in rows if (row.get('email') or '').strip()}
+
+def write_engagement(path, totals):
+    """Rewrite the engagement file from email -> counts"""
+    import csv
+    from .csv_io import atomic_write
+
+    with atomic_write(path, newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['email'] + ENGAGEMENT_FIELDS, delimiter=';')
+        writer.writeheader()
+        for email, counts in totals.items():
+            writer.writerow({'email': email, **{field: counts[field] or '' for field in ENGAGEMENT_FIELDS}})
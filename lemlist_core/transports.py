@@ -0,0 +1,152 @@
+"""
+Where send_email hands a message: SMTP relay or a local spool
+TRANSPORT (per campaign .env) picks the backend, TRANSPORT_PATH its directory
+or file:
+  smtp     one SMTP dialogue per message with SMTP_HOST (default)
+  pickup   .eml files for a local MTA pickup directory (envelope in X-Sender /
+           X-Receiver headers, as IIS/Exchange and hMailServer pickup expect)
+  maildir  Maildir spool drained by a separate relay at its own pace
+           (envelope in Return-Path / X-Envelope-To)
+  file     mbox file, for tests and dry runs against real templates
+A spool consumer never picks up half a message: pickup files are renamed
+into place (csv_io.atomic_write), maildir ones moved from tmp/ to new/. An
+OSError while writing is raised as is and retried like an SMTP timeout.
+"""
+import logging
+import os
+import threading
+import time
+
+from .csv_io import atomic_write
+from .mailer import ssl_context
+
+TRANSPORTS = ('smtp', 'pickup', 'maildir', 'file')
+
+class SMTPTransport:
+    """The relay in SMTP_HOST, every protocol phase timed into lemlist_core.metrics"""
+
+    def __init__(self, smtp_cfg):
+        self.cfg = smtp_cfg
+
+    def send(self, data, from_addr, to_addrs):
+        import smtplib
+        import ssl
+        from .metrics import METRICS, PhaseTimer
+        from .smtp_timing import TimedSMTP, TimedSMTP_SSL
+
+        cfg = self.cfg
+        timer = PhaseTimer()
+        outcome = "failed"
+        context = ssl_context(cfg)
+        try:
+            try:
+                if cfg.get("SMTP_USE_SSL") or cfg.get("SMTP_PORT") == 465:
+                    with TimedSMTP_SSL(cfg["SMTP_HOST"], cfg["SMTP_PORT"], context=context, timer=timer) as server:
+                        if cfg.get("SMTP_DEBUG"):
+                            server.set_debuglevel(1)
+                        server.login(cfg["SMTP_USER"], cfg["SMTP_PASS"])
+                        refused = server.sendmail(from_addr, to_addrs, data)
+                else:
+                    with TimedSMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"], timer=timer) as server:
+                        if cfg.get("SMTP_DEBUG"):
+                            server.set_debuglevel(1)
+                        if cfg.get("SMTP_STARTTLS", True):
+                            server.starttls(context=context)
+                        server.login(cfg["SMTP_USER"], cfg["SMTP_PASS"])
+                        refused = server.sendmail(from_addr, to_addrs, data)
+            except ssl.SSLError as ssl_err:
+                # No silent downgrade: an unverified certificate is only accepted with SMTP_ALLOW_INSECURE_TLS
+                logging.error(f"❌ Erreur SSL : {ssl_err} (SMTP_CA_CERT ou SMTP_ALLOW_INSECURE_TLS=true pour un certificat auto-signé)")
+                raise
+            if to_addrs[0] in refused:
+                # Only the BCC copy was accepted: still a refusal of the recipient
+                raise smtplib.SMTPRecipientsRefused({to_addrs[0]: refused[to_addrs[0]]})
+            outcome = "sent"
+        finally:
+            METRICS.record(cfg.get("SMTP_USER"), to_addrs[0].rsplit("@", 1)[-1].lower(), timer.phases,
+                           outcome, failed_phase=timer.current if outcome == "failed" else None)
+            METRICS.export_if_due(cfg.get("SMTP_METRICS_PATH"), cfg.get("SMTP_METRICS_INTERVAL", 15))
+
+class PickupDirTransport:
+    """One .eml per message in a local MTA pickup directory"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def send(self, data, from_addr, to_addrs):
+        data = _with_envelope(data, f"X-Sender: {from_addr}", [f"X-Receiver: {addr}" for addr in to_addrs], '\r\n')
+        with self.lock:
+            self.counter += 1
+            name = f"{time.time_ns()}.{os.getpid()}.{self.counter}"
+        # The MTA only picks up *.eml: the file appears once complete
+        with atomic_write(os.path.join(self.path, name + '.eml'), 'wb') as f:
+            f.write(data)
+
+class MaildirTransport:
+    """Maildir spool (new/ holds the messages waiting for the relay)"""
+
+    def __init__(self, path):
+        import mailbox
+
+        for sub in ('tmp', 'new', 'cur'):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)  # create=True skips an existing empty dir
+        self.maildir = mailbox.Maildir(path, create=False)
+
+    def send(self, data, from_addr, to_addrs):
+        data = _with_envelope(data, f"Return-Path: <{from_addr}>", [f"X-Envelope-To: {addr}" for addr in to_addrs])
+        self.maildir.add(data)  # Written in tmp/ then moved to new/ by mailbox
+
+class FileSinkTransport:
+    """Every message appended to one mbox file"""
+
+    def __init__(self, path):
+        import mailbox
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.mbox = mailbox.mbox(path)
+        self.lock = threading.Lock()
+
+    def send(self, data, from_addr, to_addrs):
+        import mailbox
+
+        data = _with_envelope(data, f"Return-Path: <{from_addr}>", [f"X-Envelope-To: {addr}" for addr in to_addrs])
+        entry = mailbox.mboxMessage(data)
+        entry.set_from(from_addr, time.gmtime())
+        with self.lock:
+            self.mbox.lock()
+            try:
+                self.mbox.add(entry)
+                self.mbox.flush()
+            finally:
+                self.mbox.unlock()
+
+def _with_envelope(data, sender_header, recipient_headers, linesep='\n'):
+    """CRLF message bytes preceded by the envelope headers (BCC included) for whatever drains the spool"""
+    envelope = ''.join(header + linesep for header in [sender_header] + recipient_headers)
+    if linesep != '\r\n':
+        data = data.replace(b'\r\n', linesep.encode('ascii'))
+    return envelope.encode('utf-8') + data
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def get_transport(smtp_cfg):
+    """Transport for TRANSPORT / TRANSPORT_PATH, one instance per process and setting"""
+    kind = (smtp_cfg.get("TRANSPORT") or "smtp").strip().lower()
+    if kind == "smtp":
+        return SMTPTransport(smtp_cfg)
+    path = smtp_cfg.get("TRANSPORT_PATH") or ""
+    if not path:
+        raise ValueError(f"TRANSPORT={kind} needs TRANSPORT_PATH")
+    classes = {'pickup': PickupDirTransport, 'maildir': MaildirTransport, 'file': FileSinkTransport}
+    if kind not in classes:
+        raise ValueError(f"Unknown TRANSPORT {kind!r} (expected one of {', '.join(TRANSPORTS)})")
+    with _cache_lock:
+        key = (kind, os.path.abspath(path))
+        if key not in _cache:
+            _cache[key] = classes[kind](path)
+            logging.info(f"📤 Transport {kind} : {key[1]}")
+        return _cache[key]
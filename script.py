@@ -1,9 +1,8 @@
 # send_every_5min_zimbra_notaires.py
-import smtplib, ssl, csv, time, os, sys, logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-from jinja2 import Template
+import time, os, sys, logging
+from lemlist_core.env import load_env as load_campaign_env
+from lemlist_core.csv_io import read_csv_rows_with_dialect
+from lemlist_core.mailer import send_email
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,70 +10,21 @@ logging.basicConfig(
 )
 
 def load_env():
-    load_dotenv()
-    return {
-        "SMTP_HOST": os.getenv("SMTP_HOST"),
-        "SMTP_PORT": int(os.getenv("SMTP_PORT", 587)),
-        "SMTP_USER": os.getenv("SMTP_USER"),
-        "SMTP_PASS": os.getenv("SMTP_PASS"),
-        "SENDER_NAME": os.getenv("SENDER_NAME", os.getenv("SMTP_USER")),
-        "REPLY_TO": os.getenv("REPLY_TO", os.getenv("SMTP_USER")),
-        "SMTP_USE_SSL": os.getenv("SMTP_USE_SSL", "false").lower() in ("1", "true", "yes"),
-        "SMTP_ALLOW_INSECURE_TLS": os.getenv("SMTP_ALLOW_INSECURE_TLS", "false").lower() in ("1", "true", "yes"),
-        "SMTP_DEBUG": os.getenv("SMTP_DEBUG", "false").lower() in ("1", "true", "yes"),
-    }
+    return load_campaign_env(os.path.dirname(os.path.abspath(__file__)))
 
 def load_recipients(csv_path):
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        # Try to detect delimiter; many exports use ';'
-        sample = f.read(2048)
-        f.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
-        except Exception:
-            class _D: delimiter = ';'
-            dialect = _D()
-        reader = csv.DictReader(f, delimiter=getattr(dialect, 'delimiter', ';'))
-        for row in reader:
-            if row.get("email"):
-                first_name = (row.get("first_name") or row.get("firstName") or "").strip()
-                last_name = (row.get("last_name") or row.get("lastName") or "").strip()
-                company_name = (row.get("company_name") or row.get("companyName") or "").strip()
-                yield {
-                    "email": row["email"].strip(),
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "company_name": company_name,
-                }
-
-def send_email(smtp_cfg, subject, html_body, recipient):
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = f"{smtp_cfg['SENDER_NAME']} <{smtp_cfg['SMTP_USER']}>"
-    msg["To"] = recipient["email"]
-    msg["Reply-To"] = smtp_cfg["REPLY_TO"]
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-    # Build TLS/SSL context
-    context = ssl.create_default_context()
-    if smtp_cfg.get("SMTP_ALLOW_INSECURE_TLS"):
-        # WARNING: Disables certificate verification. Use only when you trust the server.
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-
-    if smtp_cfg.get("SMTP_USE_SSL") or smtp_cfg.get("SMTP_PORT") == 465:
-        with smtplib.SMTP_SSL(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"], context=context) as server:
-            if smtp_cfg.get("SMTP_DEBUG"):
-                server.set_debuglevel(1)
-            server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-            server.send_message(msg)
-    else:
-        with smtplib.SMTP(smtp_cfg["SMTP_HOST"], smtp_cfg["SMTP_PORT"]) as server:
-            if smtp_cfg.get("SMTP_DEBUG"):
-                server.set_debuglevel(1)
-            server.starttls(context=context)
-            server.login(smtp_cfg["SMTP_USER"], smtp_cfg["SMTP_PASS"])
-            server.send_message(msg)
+    rows, _, _ = read_csv_rows_with_dialect(csv_path)
+    for row in rows:
+        if row.get("email"):
+            first_name = (row.get("first_name") or row.get("firstName") or "").strip()
+            last_name = (row.get("last_name") or row.get("lastName") or "").strip()
+            company_name = (row.get("company_name") or row.get("companyName") or "").strip()
+            yield {
+                "email": row["email"].strip(),
+                "first_name": first_name,
+                "last_name": last_name,
+                "company_name": company_name,
+            }
 
 def mask_secret(secret, visible=2):
     if not secret:
@@ -131,6 +81,7 @@ def main(csv_path):
     </html>
     """
 
+    from jinja2 import Template
     tpl = Template(message_template)
     for i, r in enumerate(load_recipients(csv_path), 1):
         html_body = tpl.render(**r)
@@ -167,6 +118,7 @@ def send_template_to_single(email, first_name="", last_name="", company_name="")
       </body>
     </html>
     """
+    from jinja2 import Template
     tpl = Template(message_template)
     html_body = tpl.render(first_name=first_name, last_name=last_name, company_name=company_name)
     recipient = {"email": email, "first_name": first_name, "last_name": last_name, "company_name": company_name}
@@ -187,6 +139,9 @@ def send_first_from_csv(csv_path):
     raise RuntimeError('No valid recipient row found in CSV')
 
 if __name__ == "__main__":
+    from lemlist_core.profiling import start_profiling
+    start_profiling('script', output_dir=os.path.dirname(os.path.abspath(__file__)))  # --profile / PROFILE=1
+
     # Test mode: send a single email with the .env parameters
     if len(sys.argv) >= 2 and sys.argv[1] == "--send-test":
         to_email = "valentin.henryleo@gmail.com"